@@ -0,0 +1,68 @@
+'''
+    Helpers shared by the tests for building worlds and taking snapshots of them that can be compared
+'''
+
+import contextlib
+import io
+
+import worldsim.model as model
+from worldsim.model.checkpoint import WorldCheckpoint
+from worldsim.model.StatEngine import StatEngine
+
+PROPAGATION_MODES = StatEngine.PROPAGATION_MODES
+
+# A mix of agent types so that agents with different stats get compared
+AGENT_COUNTS = {"Human": 20, "Cow": 10, "Sheep": 10}
+SEED = 7
+
+
+# Build a seeded world that is ready to tick
+def make_world(propagation_mode: str = StatEngine.PROPAGATE_BATCH,
+               agent_counts: dict = None,
+               seed: int = SEED,
+               columnar: bool = False):
+
+    world = model.World("Test", propagation_mode, columnar)
+
+    # The map prints a summary of itself when it gets created
+    with contextlib.redirect_stdout(io.StringIO()):
+        world.initialise("Test", agent_counts if agent_counts is not None else AGENT_COUNTS, seed=seed)
+
+    world.run()
+
+    return world
+
+
+# Take all of the events off the world's event queue as strings
+def get_events(world: model.World):
+    return [str(event) for event in iter(world.get_next_event, None)]
+
+
+# Get the state of a stat including any internal state such as a ticking stat's last tick
+# but leaving out the attributes that wire it to other stats
+def get_stat_state(stat):
+    return {attribute_name: value for attribute_name, value in stat.get_state().items()
+            if attribute_name not in WorldCheckpoint.WIRING_ATTRIBUTES}
+
+
+# Get the state of every agent's stats keyed by agent name
+def get_agent_states(world: model.World):
+    return {name: (agent._state, agent._tick_count,
+                   {stat.name: get_stat_state(stat) for stat in agent._stats._stats.values()})
+            for name, agent in world.get_agents().items()}
+
+
+# Get the state of the world's calendar stats
+def get_world_stat_states(world: model.World):
+    return {stat.name: get_stat_state(stat) for stat in world._stats.get_all_stats()}
+
+
+# Get the values of the world's calendar stats
+def get_world_stat_values(world: model.World):
+    return {stat.name: stat.value for stat in world._stats.get_all_stats()}
+
+
+# Get the names of the agents whose states are different
+def get_different_agents(states: dict, other_states: dict):
+    assert states.keys() == other_states.keys()
+    return [name for name in states.keys() if states[name] != other_states[name]]
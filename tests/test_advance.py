@@ -0,0 +1,59 @@
+'''
+    World.advance(n) must leave a world in the same state and fire the same events as n calls to World.tick()
+
+    N.B. the world stats only get brought up to date at the end of an advance so the old values and update ticks
+    of the calendar stats are not the same as after ticking and only their values are compared
+'''
+
+import pytest
+
+from worldsim.model.world_stats import WorldCalendar
+from .helpers import *
+
+AGENT_COUNTS = {"Human": 5, "Cow": 5}
+
+# Long enough to go over a couple of year ends
+TICKS = WorldCalendar.get_calendar().ticks_per_year * 2 + 100
+
+
+# Build a world with the world stats and the agents both in the specified propagation mode
+def make_advance_world(propagation_mode: str, agent_counts: dict):
+    world = make_world(propagation_mode, agent_counts)
+    world._stats.propagation_mode = propagation_mode
+    return world
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_advance_matches_ticks(propagation_mode):
+
+    world = make_advance_world(propagation_mode, AGENT_COUNTS)
+    for i in range(TICKS):
+        world.tick()
+
+    # Advance from part way through a day in a few uneven steps
+    advanced_world = make_advance_world(propagation_mode, AGENT_COUNTS)
+    for i in range(3):
+        advanced_world.tick()
+    advanced_world.advance(TICKS // 2 - 3)
+    advanced_world.advance(TICKS - TICKS // 2)
+
+    assert advanced_world._tick_count == world._tick_count
+    assert advanced_world.time == world.time
+    assert get_world_stat_values(advanced_world) == get_world_stat_values(world)
+    assert get_events(advanced_world) == get_events(world)
+    assert get_different_agents(get_agent_states(world), get_agent_states(advanced_world)) == []
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_advance_calendar_only(propagation_mode):
+
+    world = make_advance_world(propagation_mode, {})
+    for i in range(TICKS):
+        world.tick()
+
+    advanced_world = make_advance_world(propagation_mode, {})
+    advanced_world.advance(TICKS)
+
+    assert advanced_world.time == world.time
+    assert get_world_stat_values(advanced_world) == get_world_stat_values(world)
+    assert get_events(advanced_world) == get_events(world)
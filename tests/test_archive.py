@@ -0,0 +1,30 @@
+'''
+    An agent retired to the archive must keep the final values of its stats in every propagation mode
+'''
+
+import pytest
+
+from .helpers import *
+
+AGENT_COUNTS = {"Human": 3, "Cow": 3}
+TICKS = 50
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_retired_values(propagation_mode):
+
+    # Nothing reads the stats of the agents in the world that gets retired before they are retired
+    world = make_world(propagation_mode, AGENT_COUNTS)
+    other_world = make_world(propagation_mode, AGENT_COUNTS)
+    for i in range(TICKS):
+        world.tick()
+        other_world.tick()
+
+    world.retirement_enabled = True
+
+    values = {name: {stat.name: stat.value for stat in agent._stats.get_all_stats()}
+              for name, agent in other_world.get_agents().items()}
+
+    assert world.archive.size == len(values)
+    for name, stat_values in values.items():
+        assert world.archive.get_agent(name).get_stat_values() == stat_values, name
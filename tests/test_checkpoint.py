@@ -0,0 +1,90 @@
+'''
+    A world restored from a checkpoint must carry on ticking exactly as the world that was saved
+'''
+
+import pytest
+
+from worldsim.model.checkpoint import WorldCheckpoint
+from .helpers import *
+
+TICKS_BEFORE_SAVE = 50
+TICKS_AFTER_LOAD = 150
+
+
+# Save a world part way through, load it back and tick both worlds on to compare them
+def check_round_trip(world, filename: str):
+
+    for i in range(TICKS_BEFORE_SAVE):
+        world.tick()
+
+    WorldCheckpoint.save(world, filename)
+    restored_world = WorldCheckpoint.load(filename)
+
+    assert restored_world._tick_count == world._tick_count
+    assert get_world_stat_states(restored_world) == get_world_stat_states(world)
+
+    for i in range(TICKS_AFTER_LOAD):
+        world.tick()
+        restored_world.tick()
+
+    if world.is_parallel is True:
+        world.stop_parallel()
+
+    assert get_different_agents(get_agent_states(world), get_agent_states(restored_world)) == []
+    assert get_world_stat_states(restored_world) == get_world_stat_states(world)
+    assert get_events(restored_world) == get_events(world)
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_round_trip(propagation_mode, tmp_path):
+
+    world = make_world(propagation_mode)
+
+    # Give one agent a different history from the rest of its type
+    world.tick()
+    world.get_agent("Human 1").eat(5)
+
+    check_round_trip(world, str(tmp_path / "world.ck"))
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_round_trip_parallel(propagation_mode, tmp_path):
+
+    world = make_world(propagation_mode)
+    world.start_parallel(2)
+
+    check_round_trip(world, str(tmp_path / "world.ck"))
+
+
+def test_round_trip_columnar(tmp_path):
+
+    world = make_world(columnar=True)
+
+    for i in range(TICKS_BEFORE_SAVE):
+        world.tick()
+
+    filename = str(tmp_path / "world.ck")
+    WorldCheckpoint.save(world, filename)
+    restored_world = WorldCheckpoint.load(filename)
+
+    for i in range(TICKS_AFTER_LOAD):
+        world.tick()
+        restored_world.tick()
+
+    population = world._population
+    restored_population = restored_world._population
+
+    assert restored_population.names == population.names
+    for stat_name in population._columns.keys():
+        assert restored_population.get_column(stat_name).tolist() == population.get_column(stat_name).tolist()
+    assert restored_population._state.tolist() == population._state.tolist()
+    assert get_events(restored_world) == get_events(world)
+
+
+def test_rejects_other_files(tmp_path):
+
+    filename = tmp_path / "world.ck"
+    filename.write_bytes(b"not a checkpoint")
+
+    with pytest.raises(Exception):
+        WorldCheckpoint.load(str(filename))
@@ -0,0 +1,47 @@
+'''
+    The same seed must give the same world whichever propagation mode is used and whether or not the agents
+    are ticked in parallel
+'''
+
+import pytest
+
+from .helpers import *
+
+TICKS = 200
+
+
+# Tick a new world and get the state of all of its agents and the events that it fired
+def run_world(propagation_mode: str, processes: int = None):
+
+    world = make_world(propagation_mode)
+
+    if processes is not None:
+        world.start_parallel(processes)
+
+    for i in range(TICKS):
+        world.tick()
+
+    if processes is not None:
+        world.stop_parallel()
+
+    return get_agent_states(world), get_events(world)
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_same_seed_repeats(propagation_mode):
+
+    states, events = run_world(propagation_mode)
+    other_states, other_events = run_world(propagation_mode)
+
+    assert get_different_agents(states, other_states) == []
+    assert events == other_events
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_serial_matches_parallel(propagation_mode):
+
+    states, events = run_world(propagation_mode)
+    parallel_states, parallel_events = run_world(propagation_mode, processes=3)
+
+    assert get_different_agents(states, parallel_states) == []
+    assert sorted(events) == sorted(parallel_events)
@@ -0,0 +1,77 @@
+'''
+    A dormant agent must only be used for agents whose stat classes do exactly what its replay of their ticks does
+'''
+
+import pytest
+
+from worldsim.model.agent_stats import *
+from worldsim.model.scheduler import DormantAgent, _get_stat_method_names
+from .helpers import *
+
+
+# A stat class that works out its value in a way that the replay doesn't know about
+class SlowHunger(Hunger):
+
+    __slots__ = ()
+
+    def tick_calculate(self):
+        return self._hunger
+
+
+# Make a batch mode agent that is supported as it is
+def make_agent():
+
+    world = make_world(StatEngine.PROPAGATE_BATCH, {"Human": 1})
+    world.tick()
+
+    agent = world.get_agent("Human 0")
+    assert DormantAgent.is_supported(agent) is True
+
+    return agent
+
+
+# Replace a stat class's tick calculation with one that does something else
+def replace_method(monkeypatch):
+    monkeypatch.setattr(Energy, "tick_calculate", lambda stat: stat._energy)
+
+
+# Give a stat class an extra method that changes how it gets updated
+def add_method(monkeypatch):
+    monkeypatch.setattr(Sleepiness, "update", lambda stat, changed_stat=None: None, raising=False)
+
+
+# Change the shared parent of the ticking stats
+def replace_parent_method(monkeypatch):
+    monkeypatch.setattr(TickingStat, "calculate", lambda stat: stat.tick_calculate())
+
+
+def test_stat_classes_are_modelled():
+
+    # Every stat class that an agent can have has its methods listed and nothing else
+    assert set(DormantAgent.MODELLED_METHODS.keys()) == set(DormantAgent.STAT_CLASSES.values()) | {AttributePercent}
+    for stat_class, method_names in DormantAgent.MODELLED_METHODS.items():
+        assert _get_stat_method_names(stat_class) == set(method_names), stat_class.__name__
+
+    assert DormantAgent.is_modelled() is True
+
+
+@pytest.mark.parametrize("change_class", [replace_method, add_method, replace_parent_method])
+def test_changed_stat_class(change_class, monkeypatch):
+
+    agent = make_agent()
+
+    change_class(monkeypatch)
+
+    assert DormantAgent.is_modelled() is False
+    assert DormantAgent.is_supported(agent) is False
+
+
+def test_stat_subclass():
+
+    agent = make_agent()
+
+    slow_hunger = SlowHunger()
+    agent._stats.add_stat(slow_hunger)
+
+    assert DormantAgent.is_modelled() is True
+    assert DormantAgent.is_supported(agent) is False
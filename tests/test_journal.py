@@ -0,0 +1,52 @@
+'''
+    A stat engine's journal must hold all of the changes made since the last tick, including the derived stats
+    that the changes were propagated to, in every propagation mode
+'''
+
+import pytest
+
+from worldsim.model.StatEngine import StatEngine, CoreStat, DerivedStat
+from .helpers import *
+
+
+class Double(DerivedStat):
+
+    def __init__(self):
+        super(Double, self).__init__("Double", "TEST")
+        self._input_slot = self.add_dependency("Input")
+
+    def calculate(self):
+        return self.get_slot_value(self._input_slot) * 2
+
+
+def make_engine(propagation_mode: str):
+
+    engine = StatEngine("Test", propagation_mode)
+    engine.add_stat(CoreStat("Input", "TEST", 1))
+    engine.add_stat(Double())
+    engine.journal_enabled = True
+    engine.tick()
+
+    return engine
+
+
+# Get the journal keyed by stat name
+def get_journal(engine: StatEngine):
+    return {engine.get_stat_name(stat_id): (old_value, new_value) for stat_id, old_value, new_value in
+            engine.get_journal()}
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_changes_between_ticks(propagation_mode):
+
+    engine = make_engine(propagation_mode)
+    engine.update_stat("Input", 3)
+
+    # Nothing reads the changes before the next tick and they don't spill over into the next tick's journal
+    engine.tick()
+    assert get_journal(engine) == {}
+
+    engine.update_stat("Input", 4)
+    engine.get_stat("Double").value
+
+    assert get_journal(engine) == {"Input": (3, 4), "Double": (6, 8)}
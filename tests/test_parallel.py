@@ -0,0 +1,49 @@
+'''
+    The worker processes that tick agents in parallel must stay in step with the world's ticks
+'''
+
+import pytest
+
+from .helpers import *
+
+AGENT_COUNTS = {"Human": 4}
+
+
+@pytest.mark.parametrize("tick_offset", [0, 2])
+def test_worker_refuses_tick_out_of_step(tick_offset):
+
+    world = make_world(agent_counts=AGENT_COUNTS)
+    world.tick()
+    world.start_parallel(2)
+    world.tick()
+
+    # A repeated or skipped tick fails without ticking the agents and the pool carries on from where it was
+    agent_states = get_agent_states(world)
+    with pytest.raises(Exception, match="can't tick"):
+        world._agent_pool.tick([], world._tick_count + tick_offset)
+    assert get_different_agents(agent_states, get_agent_states(world)) == []
+
+    world.tick()
+    world.stop_parallel()
+
+    assert world._tick_count == 3
+
+
+def test_advance_without_ticking_agents():
+
+    world = make_world(agent_counts=AGENT_COUNTS)
+    world.start_parallel(2)
+    world.tick()
+
+    agent_states = get_agent_states(world)
+    world.advance(5, tick_agents=False)
+    assert get_different_agents(agent_states, get_agent_states(world)) == []
+
+    # The workers carry on from the end of the skip
+    world.tick()
+    world.advance(3)
+    world.tick()
+    world.stop_parallel()
+
+    assert world._tick_count == 11
+    assert {agent._tick_count for agent in world.get_agents().values()} == {6}
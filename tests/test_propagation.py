@@ -0,0 +1,89 @@
+'''
+    However the agents' stats get worked out - change by change, in batches, lazily, all in one go in columns or
+    skipped over while the agents are dormant - a world must end up with the same stat values and fire the same events
+
+    N.B. only the stat values are compared between propagation modes as in immediate mode a stat can change more than
+    once in a tick and so can have a different old value and update tick
+'''
+
+import math
+
+import pytest
+
+from .helpers import *
+
+TICKS = 300
+
+
+# Tick a world and get the events that it fired
+def run_world(world, ticks: int = TICKS):
+
+    for i in range(ticks):
+        world.tick()
+
+    return get_events(world)
+
+
+# Get the state of every agent and the values of all of its stats keyed by agent name
+def get_agent_values(world: model.World):
+    return {name: (agent._state, agent._tick_count, {stat.name: stat.value for stat in agent._stats.get_all_stats()})
+            for name, agent in world.get_agents().items()}
+
+
+@pytest.mark.parametrize("propagation_mode", [StatEngine.PROPAGATE_BATCH, StatEngine.PROPAGATE_LAZY])
+def test_matches_immediate(propagation_mode):
+
+    world = make_world(StatEngine.PROPAGATE_IMMEDIATE)
+    events = run_world(world)
+
+    other_world = make_world(propagation_mode)
+    other_events = run_world(other_world)
+
+    assert get_different_agents(get_agent_values(world), get_agent_values(other_world)) == []
+    assert other_events == events
+
+
+def test_population_matches_agents():
+
+    world = make_world(StatEngine.PROPAGATE_BATCH)
+    events = run_world(world)
+
+    columnar_world = make_world(columnar=True)
+    columnar_events = run_world(columnar_world)
+
+    population = columnar_world._population
+    agents = world.get_agents()
+
+    assert population.names == list(agents.keys())
+
+    for index, (name, agent) in enumerate(agents.items()):
+
+        assert population._state[index] == agent._state, name
+
+        for stat in agent._stats.get_all_stats():
+            value = stat.value
+            population_value = population.get_stat_value(index, stat.name)
+
+            # The population has no value for a stat as a NaN
+            if value is None:
+                assert population_value is None or math.isnan(population_value), (name, stat.name)
+            else:
+                assert population_value == value, (name, stat.name)
+
+    assert columnar_events == events
+
+
+def test_scheduler_matches_ticking():
+
+    world = make_world(StatEngine.PROPAGATE_BATCH)
+    events = run_world(world)
+
+    scheduled_world = make_world(StatEngine.PROPAGATE_BATCH)
+    scheduled_world.scheduling_enabled = True
+    scheduled_events = run_world(scheduled_world)
+
+    # Make sure that the scheduler did take agents out of the tick loop
+    assert scheduled_world._scheduler.dormant_count > 0
+
+    assert get_different_agents(get_agent_states(world), get_agent_states(scheduled_world)) == []
+    assert scheduled_events == events
@@ -0,0 +1,57 @@
+'''
+    The real time loop must publish each event with the tick that it happened on even when it runs several ticks
+    together to catch up
+'''
+
+import asyncio
+import time
+
+from worldsim.controller.realtime import RealTimeLoop
+from worldsim.model.world_stats import DayOfYear
+from .helpers import *
+
+AGENT_COUNTS = {"Human": 2, "Cow": 2}
+TICKS_PER_SECOND = 20
+TICKS = 40
+
+# How many tick periods the loop gets held up for after its first frame
+LATE_TICKS = 20
+
+
+# Tick a world one tick at a time and get each event with the tick that it happened on
+def get_tick_events(world):
+
+    tick_events = [(world._tick_count, str(event)) for event in iter(world.get_next_event, None)]
+
+    for i in range(TICKS):
+        world.tick()
+        tick_events += [(world._tick_count, str(event)) for event in iter(world.get_next_event, None)]
+
+    return tick_events
+
+
+def test_coalesced_event_ticks():
+
+    tick_events = get_tick_events(make_world(agent_counts=AGENT_COUNTS))
+
+    loop = RealTimeLoop(make_world(agent_counts=AGENT_COUNTS), TICKS_PER_SECOND, RealTimeLoop.POLICY_COALESCE)
+    subscription = loop.subscribe()
+
+    async def run():
+
+        task = asyncio.create_task(loop.run(TICKS))
+
+        # Hold up the event loop once the first frame is done so that the next frame has to catch up
+        while loop.timings.frames == 0:
+            await asyncio.sleep(0)
+        time.sleep(LATE_TICKS / TICKS_PER_SECOND)
+
+        await task
+
+        return [(tick_count, str(event)) async for tick_count, event in subscription]
+
+    loop_events = asyncio.run(run())
+
+    # Make sure that the loop did run a day change together with other ticks
+    assert loop.timings.coalesced_ticks >= DayOfYear.TICKS_PER_DAY
+    assert loop_events == tick_events
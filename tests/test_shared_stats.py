@@ -0,0 +1,78 @@
+'''
+    A stat bound to a shared stat must read the shared stat whenever it is used so that one change to the shared
+    stat is seen by every container without being copied into each of them
+'''
+
+import pytest
+
+from worldsim.model.StatEngine import StatEngine, CoreStat, DerivedStat, BoundStat
+from .helpers import *
+
+COPIES = 3
+
+
+class TickDouble(DerivedStat):
+
+    IS_STATEFUL = True
+
+    def __init__(self):
+        super(TickDouble, self).__init__("Double", "TEST")
+        self._tick_slot = self.add_dependency("Tick")
+        self._input_slot = self.add_dependency("Input")
+
+    def calculate(self):
+        return self.get_slot_value(self._input_slot) * 2
+
+
+def make_engines(propagation_mode: str, shared_stat: CoreStat):
+
+    engine = StatEngine("Test", propagation_mode)
+    engine.add_stat(CoreStat("Tick", "TEST", 0))
+    engine.add_stat(CoreStat("Input", "TEST", 1))
+    engine.add_stat(TickDouble())
+    engine.bind_shared_stat(shared_stat)
+
+    return engine.clone_many(["Test {0}".format(i) for i in range(COPIES)])
+
+
+# Move each engine on a tick so that its stats get calculated
+def tick_engines(engines: list):
+    for engine in engines:
+        engine.tick()
+        engine.increment_stat("Tick", 1)
+        engine.flush()
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_bound_stat_reads_shared_stat(propagation_mode):
+
+    shared_stat = CoreStat("Input", "SHARED", None)
+    engines = make_engines(propagation_mode, shared_stat)
+
+    # Until the shared stat has a value the bound stats use their own
+    tick_engines(engines)
+    assert [engine.get_stat("Double").value for engine in engines] == [2] * COPIES
+
+    shared_stat.set_value(5)
+    tick_engines(engines)
+
+    for engine in engines:
+        input_stat = engine.get_stat("Input")
+        assert isinstance(input_stat, BoundStat)
+        assert input_stat.value == 5
+        assert engine.get_stat("Double").value == 10
+
+        # Nothing got copied into the engine
+        assert input_stat._value == 1
+        assert input_stat.update_tick == 0
+
+
+def test_rebind_shared_stat():
+
+    engines = make_engines(StatEngine.PROPAGATE_BATCH, CoreStat("Input", "SHARED", 5))
+
+    new_shared_stat = CoreStat("Input", "SHARED", 7)
+    engines[0].bind_shared_stat(new_shared_stat)
+    tick_engines(engines)
+
+    assert [engine.get_stat("Double").value for engine in engines] == [14] + [10] * (COPIES - 1)
@@ -0,0 +1,76 @@
+'''
+    Agent.sleep() must leave an agent in the same state as ticking it while it is asleep one tick at a time
+'''
+
+import pytest
+
+from worldsim.model.agent import Agent
+from worldsim.model.agent_stats import AgentStats
+from .helpers import *
+
+AGENT_COUNTS = {"Human": 3, "Cow": 2}
+
+# Long enough for the agents to wake up or die part way through
+SLEEP_TICKS = 400
+
+
+# Get the state of an agent including all of its stats
+def get_agent_state(agent):
+    return agent._state, agent._tick_count, {stat.name: get_stat_state(stat) for stat in agent._stats._stats.values()}
+
+
+# Build a world part way through a day
+def make_sleep_world(propagation_mode: str):
+
+    world = make_world(propagation_mode, AGENT_COUNTS)
+    for i in range(15):
+        world.tick()
+
+    return world
+
+
+# Make it colder so that the agents are out of date with the world until they next tick
+def set_temperature(world, temperature: float):
+    world._agent_inputs[AgentStats.INPUT_AMBIENT_TEMPERATURE].set_value(temperature)
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_sleep_matches_ticks(propagation_mode, monkeypatch):
+
+    # Put the agents to sleep for a bit and then let them sleep on after it has got colder
+    world = make_sleep_world(propagation_mode)
+    for agent in world.get_agents().values():
+        agent._state = AgentStats.STATE_ASLEEP
+        for i in range(3):
+            agent.tick()
+    set_temperature(world, 5)
+    for agent in world.get_agents().values():
+        agent._state = AgentStats.STATE_ASLEEP
+        for i in range(SLEEP_TICKS):
+            agent.tick()
+        agent._state = AgentStats.STATE_AWAKE
+
+    # Count the ticks that don't get done in a jump
+    tick_calls = []
+    tick = Agent.tick
+
+    def count_tick(agent):
+        tick_calls.append(agent.name)
+        tick(agent)
+
+    slept_world = make_sleep_world(propagation_mode)
+    for agent in slept_world.get_agents().values():
+        agent.sleep(3, awaken=False)
+    set_temperature(slept_world, 5)
+    monkeypatch.setattr(Agent, "tick", count_tick)
+    for agent in slept_world.get_agents().values():
+        agent.sleep(SLEEP_TICKS)
+
+    for name, agent in world.get_agents().items():
+        assert get_agent_state(slept_world.get_agent(name)) == get_agent_state(agent)
+
+    # Only the ticks while an agent is awake or changing state get done one at a time
+    if propagation_mode == StatEngine.PROPAGATE_BATCH:
+        assert len(tick_calls) < sum(AGENT_COUNTS.values()) * SLEEP_TICKS // 10
+    else:
+        assert len(tick_calls) == sum(AGENT_COUNTS.values()) * SLEEP_TICKS
@@ -0,0 +1,52 @@
+'''
+    Every agent in a world must have its own name including the agents that have been retired
+'''
+
+import pytest
+
+from .helpers import *
+
+AGENT_COUNTS = {"Human": 2, "Cow": 2}
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_refuses_used_names(columnar):
+
+    world = make_world(agent_counts=AGENT_COUNTS, columnar=columnar)
+    names = world.get_agent_names()
+
+    with pytest.raises(Exception, match="already used"):
+        world.spawn("Cow", 1, names=["Human 0"])
+    with pytest.raises(Exception, match="already used"):
+        world.spawn("Cow", 2, names=["Cow A", "Cow A"])
+
+    assert world.get_agent_names() == names
+
+    # Numbered names skip over the names that are already used
+    world.spawn("Cow", 1, names=["Cow 3"])
+    assert world.spawn("Cow", 2) == ["Cow 4", "Cow 5"]
+    assert world.get_agent_names() == names + ["Cow 3", "Cow 4", "Cow 5"]
+
+
+def test_refuses_retired_names():
+
+    world = make_world(agent_counts=AGENT_COUNTS)
+    world.retirement_enabled = True
+    for i in range(50):
+        world.tick()
+
+    assert "Human 0" in world.archive.get_agent_names()
+    with pytest.raises(Exception, match="already used"):
+        world.spawn("Human", 1, names=["Human 0"])
+
+
+def test_refuses_used_names_parallel():
+
+    world = make_world(agent_counts=AGENT_COUNTS)
+    world.start_parallel(2)
+
+    with pytest.raises(Exception, match="already used"):
+        world.spawn("Cow", 1, names=["Human 1"])
+
+    world.stop_parallel()
+    assert world.get_agent("Human 1").type == "Human"
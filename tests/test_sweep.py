@@ -0,0 +1,48 @@
+'''
+    A sweep must only override constants in worker processes where they can't leak into anything else
+'''
+
+import pytest
+
+from worldsim.model.agent_stats import NextState, Temperature
+from worldsim.sweep import SweepConfig, SweepRunner
+
+BASE = {"ticks": 20, "agents": {"Human": 2}, "propagation_mode": "batch"}
+
+
+def test_in_process_refuses_overrides():
+
+    delta_rate = Temperature.TEMP_DELTA_RATE
+
+    config = SweepConfig("Test", BASE, seeds=[1], constants=[{}, {"Temperature.TEMP_DELTA_RATE": 0.5}])
+    runner = SweepRunner(config, processes=1)
+
+    with pytest.raises(Exception, match="overrides constants"):
+        runner.run()
+
+    assert runner.results == []
+    assert Temperature.TEMP_DELTA_RATE == delta_rate
+
+
+def test_in_process_without_overrides():
+
+    config = SweepConfig("Test", BASE, seeds=[1, 2])
+    runner = SweepRunner(config, processes=1)
+    runner.run()
+
+    assert [result[SweepRunner.COLUMN_RUN] for result in runner.results] == [0, 1]
+    assert [result[SweepRunner.COLUMN_SEED] for result in runner.results] == [1, 2]
+
+
+def test_worker_processes_apply_overrides():
+
+    threshold = NextState.TEMPERATURE_THRESHOLD
+
+    config = SweepConfig("Test", BASE, seeds=[1], constants=[{}, {"NextState.TEMPERATURE_THRESHOLD": -100}])
+    runner = SweepRunner(config, processes=2)
+    runner.run()
+
+    # Every agent dies straight away when the temperature threshold for dying is below any temperature
+    assert runner.results[0][SweepRunner.COLUMN_DEAD] < 2
+    assert runner.results[1][SweepRunner.COLUMN_DEAD] == 2
+    assert NextState.TEMPERATURE_THRESHOLD == threshold
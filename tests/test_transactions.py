@@ -0,0 +1,187 @@
+'''
+    A stat engine transaction must either propagate all of its changes or leave every stat as it was before the
+    transaction began, in every propagation mode
+'''
+
+import pytest
+
+from worldsim.model.StatEngine import StatEngine, CoreStat, DerivedStat
+from worldsim.model.agent_stats import AgentStats
+from .helpers import *
+
+LIMIT = 10
+
+
+class Double(DerivedStat):
+
+    def __init__(self):
+        super(Double, self).__init__("Double", "TEST")
+        self._input_slot = self.add_dependency("Input")
+
+    def calculate(self):
+        return self.get_slot_value(self._input_slot) * 2
+
+
+class Checked(DerivedStat):
+
+    def __init__(self):
+        super(Checked, self).__init__("Checked", "TEST")
+        self._double_slot = self.add_dependency("Double")
+
+    def calculate(self):
+        double = self.get_slot_value(self._double_slot)
+        if double > LIMIT * 2:
+            raise Exception("Double is over the limit")
+        return double + 1
+
+
+# Build an engine with an input that has some history so that its old value and update tick are set
+def make_engine(propagation_mode: str):
+
+    engine = StatEngine("Test", propagation_mode)
+    engine.add_stat(CoreStat("Input", "TEST", 1))
+    engine.add_stat(CoreStat("Other", "TEST", 0))
+    engine.add_stat(Double())
+    engine.add_stat(Checked())
+
+    engine.tick()
+    engine.update_stat("Input", 2)
+    engine.tick()
+
+    return engine
+
+
+# Get the values and the internal state of every stat in the engine
+def get_engine_states(engine: StatEngine):
+    engine.flush()
+    return {stat.name: (stat.value, get_stat_state(stat)) for stat in engine.get_all_stats()}
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_commit(propagation_mode):
+
+    engine = make_engine(propagation_mode)
+
+    with engine.transaction():
+        engine.update_stat("Input", 3)
+        with engine.transaction():
+            engine.update_stat("Input", 4)
+        assert engine._transaction_depth == 1
+
+    assert engine._transaction_depth == 0
+    assert engine.get_stat("Double").value == 8
+    assert engine.get_stat("Checked").value == 9
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_rollback_on_calculate_error(propagation_mode):
+
+    engine = make_engine(propagation_mode)
+    states = get_engine_states(engine)
+
+    with pytest.raises(Exception):
+        with engine.transaction():
+            engine.update_stat("Other", 5)
+            engine.update_stat("Input", LIMIT + 1)
+
+    assert engine._transaction_depth == 0
+    assert get_engine_states(engine) == states
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_rollback_on_body_error(propagation_mode):
+
+    engine = make_engine(propagation_mode)
+    states = get_engine_states(engine)
+
+    with pytest.raises(KeyError):
+        with engine.transaction():
+            engine.update_stat("Input", 3)
+            raise KeyError("Input")
+
+    assert engine._transaction_depth == 0
+    assert get_engine_states(engine) == states
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_rollback_inner_transaction(propagation_mode):
+
+    engine = make_engine(propagation_mode)
+
+    with engine.transaction():
+        engine.update_stat("Input", 3)
+
+        # Only the inner transaction's changes get rolled back and the outer one carries on
+        with pytest.raises(KeyError):
+            with engine.transaction():
+                engine.update_stat("Input", 4)
+                engine.update_stat("Other", 5)
+                raise KeyError("Input")
+
+        assert engine._transaction_depth == 1
+        assert engine.get_stat("Input").value == 3
+        assert engine.get_stat("Other").value == 0
+
+    assert engine._transaction_depth == 0
+    assert engine.get_stat("Double").value == 6
+    assert engine.get_stat("Other").value == 0
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_rollback_outer_transaction(propagation_mode):
+
+    engine = make_engine(propagation_mode)
+    states = get_engine_states(engine)
+
+    # Changes committed by an inner transaction are still rolled back with the outer one
+    engine.begin()
+    engine.update_stat("Input", 3)
+    with engine.transaction():
+        engine.update_stat("Input", 4)
+        engine.update_stat("Other", 5)
+    engine.rollback()
+
+    assert engine._transaction_depth == 0
+    assert get_engine_states(engine) == states
+
+
+@pytest.mark.parametrize("propagation_mode", PROPAGATION_MODES)
+def test_agent_eat_rollback(propagation_mode, monkeypatch):
+
+    world = make_world(propagation_mode, {"Human": 2})
+    world.tick()
+
+    # Give both agents a stat that expires on the tick when they eat
+    agent = world.get_agent("Human 0")
+    other_agent = world.get_agent("Human 1")
+    for each_agent in (agent, other_agent):
+        each_agent._stats.add_stat(CoreStat("Full", "TEST", 1, lifetime=1))
+
+    # Make eating fail part way through
+    update_stat = agent._stats.update_stat
+
+    def fail_food(stat_name, new_value):
+        update_stat(stat_name, new_value)
+        if stat_name == AgentStats.INPUT_FOOD_CONSUMED:
+            raise KeyError(stat_name)
+
+    monkeypatch.setattr(agent._stats, "update_stat", fail_food)
+
+    # The agents' temperatures move towards the new ambient temperature as part of their next tick
+    world._agent_inputs[AgentStats.INPUT_AMBIENT_TEMPERATURE].set_value(-5)
+
+    with pytest.raises(KeyError):
+        agent.eat(5)
+
+    # The tick that the agent was on when it ate stays done but none of the eating does
+    other_agent.start_tick()
+    for each_agent in (agent, other_agent):
+        each_agent._stats.flush()
+
+    assert agent._stats._transaction_depth == 0
+    assert agent._stats.get_stat("Full") is None
+    assert agent._stats.get_stat(AgentStats.INPUT_FOOD_CONSUMED).value == 0
+    assert agent._stats._tick_number == other_agent._stats._tick_number
+    assert agent._tick_count == other_agent._tick_count
+    assert {stat.name: get_stat_state(stat) for stat in agent._stats.get_all_stats()} == \
+           {stat.name: get_stat_state(stat) for stat in other_agent._stats.get_all_stats()}
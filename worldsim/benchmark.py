@@ -0,0 +1,425 @@
+'''
+    Benchmark suite for the simulation hot paths:
+    - World.tick throughput versus the number of agents
+    - Agent construction and World.spawn/load_agents spawn rate
+    - StatEngine.add_stat scaling versus the size of the stat graph
+    - DerivedStat propagation through deep chains and wide fan-outs
+    - WorldMap.generate_topology versus map size
+    - CSVStatFactory.load versus the number of rows
+
+    Results are written out as JSON and can be compared against the JSON from an earlier run e.g.
+    python -m worldsim.benchmark --output baseline.json
+    python -m worldsim.benchmark --baseline baseline.json
+'''
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy
+
+import worldsim.model as model
+from worldsim.model.StatEngine import StatEngine, CoreStat, DerivedStat, CSVStatFactory
+from worldsim.model.agent import Agent
+from worldsim.model.map import WorldMap
+from worldsim.model.rng import RandomStreams
+
+
+# A derived stat that adds up all of its dependencies
+class SumStat(DerivedStat):
+    __slots__ = ("_slots",)
+
+    def __init__(self, name: str, dependency_names: list):
+        super(SumStat, self).__init__(name, "BENCHMARK")
+
+        self._slots = [self.add_dependency(dependency_name) for dependency_name in dependency_names]
+
+    def calculate(self):
+        total = 0
+        for slot in self._slots:
+            total += self.get_slot_value(slot)
+        return total
+
+
+class BenchmarkSuite:
+
+    SEED = 1234
+
+    # The sizes to run each benchmark at for a full run and for a quick run
+    SIZES = {
+        "world_tick": ([10, 100, 1000], [10, 50]),
+        "agent_construction": ([1000], [100]),
+        "spawn": ([100, 1000, 10000], [100, 1000]),
+        "add_stat": ([100, 1000, 10000], [100, 1000]),
+        "propagation_depth": ([10, 100, 500], [10, 100]),
+        "propagation_fan_out": ([10, 100, 1000], [10, 100]),
+        "map_topology": ([25, 50, 100], [25, 50]),
+        "csv_load": ([100, 1000, 10000], [100, 1000]),
+    }
+
+    # How many times each measurement is repeated with the fastest time being kept
+    REPEATS = 3
+
+    AGENT_TYPE = "Human"
+
+    def __init__(self, propagation_mode: str = StatEngine.PROPAGATE_IMMEDIATE, quick: bool = False,
+                 benchmarks: list = None):
+
+        self.propagation_mode = propagation_mode
+        self.quick = quick
+        self.benchmarks = benchmarks if benchmarks is not None else list(BenchmarkSuite.SIZES.keys())
+        self.results = {}
+
+        for benchmark in self.benchmarks:
+            if benchmark not in BenchmarkSuite.SIZES:
+                raise Exception("{0} is not a known benchmark.".format(benchmark))
+
+    # Get the sizes to run a benchmark at
+    def get_sizes(self, benchmark: str):
+        full_sizes, quick_sizes = BenchmarkSuite.SIZES[benchmark]
+        return quick_sizes if self.quick is True else full_sizes
+
+    # Record a result keyed by benchmark name and size
+    def add_result(self, benchmark: str, size: int, value: float, unit: str, higher_is_better: bool = True):
+
+        key = "{0}[{1}]".format(benchmark, size)
+        self.results[key] = {"benchmark": benchmark,
+                             "size": size,
+                             "value": value,
+                             "unit": unit,
+                             "higher_is_better": higher_is_better}
+
+        logging.info("%s.add_result(): %s = %.3f %s", __class__, key, value, unit)
+
+    # Time how long a function takes keeping the fastest of a number of repeats
+    # An optional setup function is called before each repeat and what it returns is passed to the function
+    def time_best(self, function, setup=None):
+
+        best_time = None
+
+        for i in range(BenchmarkSuite.REPEATS):
+            random.seed(BenchmarkSuite.SEED)
+            argument = setup() if setup is not None else None
+
+            start_time = time.perf_counter()
+            if setup is not None:
+                function(argument)
+            else:
+                function()
+            elapsed = time.perf_counter() - start_time
+
+            if best_time is None or elapsed < best_time:
+                best_time = elapsed
+
+        return best_time
+
+    # Run all of the selected benchmarks and return the results
+    def run(self):
+
+        for benchmark in self.benchmarks:
+            logging.info("%s.run(): Running benchmark %s", __class__, benchmark)
+            getattr(self, "benchmark_" + benchmark)()
+
+        return self.results
+
+    # Create an initialised world with no output
+    def create_world(self):
+
+        random.seed(BenchmarkSuite.SEED)
+        world = model.World("Benchmark", self.propagation_mode)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            world.initialise("Benchmark", seed=BenchmarkSuite.SEED)
+
+        world.run()
+
+        return world
+
+    def benchmark_world_tick(self):
+
+        ticks = 10 if self.quick is True else 20
+
+        for size in self.get_sizes("world_tick"):
+
+            world = self.create_world()
+            spawn_count = size - len(world.get_agent_names())
+            if spawn_count > 0:
+                world.spawn(BenchmarkSuite.AGENT_TYPE, spawn_count)
+
+            def tick():
+                for i in range(ticks):
+                    world.tick()
+
+            elapsed = self.time_best(tick)
+            world._event_queue.events.clear()
+
+            self.add_result("world_tick", size, ticks / elapsed, "ticks/s")
+            self.add_result("world_agent_ticks", size, ticks * len(world.get_agent_names()) / elapsed,
+                            "agent ticks/s")
+
+    def benchmark_agent_construction(self):
+
+        world = self.create_world()
+        factory = world._agent_factory
+
+        for size in self.get_sizes("agent_construction"):
+
+            def construct():
+                for i in range(size):
+                    new_agent = Agent("Agent {0}".format(i), BenchmarkSuite.AGENT_TYPE, self.propagation_mode)
+                    new_agent.add_stats(factory.get_stats_by_name(BenchmarkSuite.AGENT_TYPE))
+
+            elapsed = self.time_best(construct)
+
+            self.add_result("agent_construction", size, size / elapsed, "agents/s")
+
+    def benchmark_spawn(self):
+
+        # Time how long it takes to load the default agents into a world
+        def load_agents(world):
+            world.load_agents()
+
+        elapsed = self.time_best(load_agents, setup=self.create_world)
+        self.add_result("load_agents", len(self.create_world().get_agent_names()), elapsed * 1000, "ms",
+                        higher_is_better=False)
+
+        for size in self.get_sizes("spawn"):
+
+            def spawn(world):
+                world.spawn(BenchmarkSuite.AGENT_TYPE, size)
+
+            elapsed = self.time_best(spawn, setup=self.create_world)
+
+            self.add_result("spawn", size, size / elapsed, "agents/s")
+
+    def benchmark_add_stat(self):
+
+        for size in self.get_sizes("add_stat"):
+
+            # Half of the stats are core stats and the other half each depend on two random core stats
+            def create_stats():
+                core_stats = [CoreStat("Core {0}".format(i), "BENCHMARK", i) for i in range(size // 2)]
+                derived_stats = [SumStat("Derived {0}".format(i),
+                                         [stat.name for stat in random.sample(core_stats, 2)])
+                                 for i in range(size - len(core_stats))]
+                return core_stats + derived_stats
+
+            def add_stat(stats):
+                engine = StatEngine("Benchmark", self.propagation_mode)
+                for stat in stats:
+                    engine.add_stat(stat)
+                engine.flush()
+
+            elapsed = self.time_best(add_stat, setup=create_stats)
+
+            self.add_result("add_stat", size, elapsed * 1000000 / size, "us/stat", higher_is_better=False)
+
+            def add_stats(stats):
+                engine = StatEngine("Benchmark", self.propagation_mode)
+                engine.add_stats(stats)
+
+            elapsed = self.time_best(add_stats, setup=create_stats)
+
+            self.add_result("add_stats", size, elapsed * 1000000 / size, "us/stat", higher_is_better=False)
+
+    # Time how many updates per second of a core stat can be pushed through a set of derived stats
+    def time_updates(self, engine: StatEngine, updates: int):
+
+        def update():
+            for i in range(updates):
+                engine.update_stat("Root", i)
+                engine.flush()
+
+        return updates / self.time_best(update)
+
+    def benchmark_propagation_depth(self):
+
+        updates = 100 if self.quick is True else 200
+
+        for size in self.get_sizes("propagation_depth"):
+
+            # A chain of derived stats each depending on the one before it
+            engine = StatEngine("Benchmark", self.propagation_mode)
+            stats = [CoreStat("Root", "BENCHMARK", 0)]
+            for i in range(size):
+                stats.append(SumStat("Depth {0}".format(i + 1), [stats[-1].name]))
+            engine.add_stats(stats)
+
+            self.add_result("propagation_depth", size, self.time_updates(engine, updates), "updates/s")
+
+    def benchmark_propagation_fan_out(self):
+
+        updates = 100 if self.quick is True else 200
+
+        for size in self.get_sizes("propagation_fan_out"):
+
+            # Lots of derived stats all depending on the same core stat
+            engine = StatEngine("Benchmark", self.propagation_mode)
+            stats = [CoreStat("Root", "BENCHMARK", 0)]
+            for i in range(size):
+                stats.append(SumStat("Listener {0}".format(i), ["Root"]))
+            engine.add_stats(stats)
+
+            self.add_result("propagation_fan_out", size, self.time_updates(engine, updates), "updates/s")
+
+    def benchmark_map_topology(self):
+
+        for size in self.get_sizes("map_topology"):
+
+            def create_map():
+                return WorldMap("Benchmark", size, size,
+                                RandomStreams(BenchmarkSuite.SEED).get_stream(RandomStreams.MAP))
+
+            def generate(world_map):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    world_map.generate_topology()
+
+            elapsed = self.time_best(generate, create_map)
+
+            self.add_result("map_topology", size, size * size / elapsed, "squares/s")
+
+    def benchmark_csv_load(self):
+
+        columns = ["Name"] + ["Stat {0}".format(i) for i in range(10)] + ["Description"]
+
+        for size in self.get_sizes("csv_load"):
+
+            # Write out a CSV file with the specified number of rows
+            with tempfile.TemporaryDirectory() as directory:
+
+                file_name = os.path.join(directory, "benchmark.csv")
+
+                random.seed(BenchmarkSuite.SEED)
+                with open(file_name, "w", newline="") as csv_file:
+                    writer = csv.writer(csv_file)
+                    writer.writerow(columns)
+                    for i in range(size):
+                        writer.writerow(["Object {0}".format(i)] +
+                                        [random.randint(0, 100) for column in range(10)] +
+                                        ["Object number {0}".format(i)])
+
+                def load():
+                    factory = CSVStatFactory("Benchmark", file_name)
+                    factory.load()
+
+                elapsed = self.time_best(load)
+
+            self.add_result("csv_load", size, size / elapsed, "rows/s")
+
+
+# Get details of where the benchmarks were run so that results can be compared like for like
+def get_environment(suite: BenchmarkSuite):
+
+    return {"python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "numpy": numpy.__version__,
+            "propagation_mode": suite.propagation_mode,
+            "quick": suite.quick,
+            "repeats": BenchmarkSuite.REPEATS,
+            "seed": BenchmarkSuite.SEED,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+#
+# Compare a set of results against a baseline set of results
+# Returns a list of (key, baseline value, new value, % change) and a list of the keys that regressed
+# A result has regressed if it has got worse by more than the tolerance e.g. 0.1 = 10%
+#
+def compare(results: dict, baseline: dict, tolerance: float = 0.1):
+
+    comparison = []
+    regressions = []
+
+    for key, result in results.items():
+
+        baseline_result = baseline.get(key)
+        if baseline_result is None or baseline_result["value"] == 0:
+            continue
+
+        change = (result["value"] - baseline_result["value"]) / baseline_result["value"]
+        comparison.append((key, baseline_result["value"], result["value"], change * 100))
+
+        is_worse = change < -tolerance if result["higher_is_better"] is True else change > tolerance
+        if is_worse is True:
+            regressions.append(key)
+
+    return comparison, regressions
+
+
+def print_results(results: dict):
+
+    output_width = 70
+
+    print(" Benchmark results ".center(output_width, "-"))
+    for key, result in results.items():
+        print("{0:<40}{1:>16.3f} {2}".format(key, result["value"], result["unit"]))
+
+
+def print_comparison(comparison: list, regressions: list):
+
+    output_width = 90
+
+    print(" Comparison with baseline ".center(output_width, "-"))
+    print("{0:<40}{1:>16}{2:>16}{3:>10}".format("Benchmark", "Baseline", "Current", "Change"))
+    for key, baseline_value, value, change in comparison:
+        print("{0:<40}{1:>16.3f}{2:>16.3f}{3:>9.1f}%{4}".format(key, baseline_value, value, change,
+                                                              " REGRESSED" if key in regressions else ""))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Run the World Sim benchmark suite.")
+    parser.add_argument("--quick", action="store_true", help="run the benchmarks at smaller sizes")
+    parser.add_argument("--mode", default=StatEngine.PROPAGATE_IMMEDIATE, choices=StatEngine.PROPAGATION_MODES,
+                        help="stat propagation mode to use")
+    parser.add_argument("--benchmark", action="append", choices=list(BenchmarkSuite.SIZES.keys()),
+                        help="benchmark to run (can be repeated, default is all of them)")
+    parser.add_argument("--output", help="file to write the JSON results to (default is stdout)")
+    parser.add_argument("--baseline", help="JSON results from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="how much worse than the baseline a result can get before it counts as a regression")
+    args = parser.parse_args()
+
+    # Stats warn about missing dependencies while agents are being built so only show errors
+    logging.basicConfig(level=logging.ERROR)
+
+    suite = BenchmarkSuite(args.mode, args.quick, args.benchmark)
+    results = suite.run()
+
+    output = {"environment": get_environment(suite), "results": results}
+
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(output, output_file, indent=2)
+        print_results(results)
+    else:
+        print(json.dumps(output, indent=2))
+
+    if args.baseline is not None:
+
+        with open(args.baseline, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+
+        comparison, regressions = compare(results, baseline["results"], args.tolerance)
+
+        # Keep stdout as pure JSON if that is where the results went
+        with contextlib.redirect_stdout(sys.stderr if args.output is None else sys.stdout):
+            print_comparison(comparison, regressions)
+
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
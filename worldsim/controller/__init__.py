@@ -1 +1,2 @@
-from .cli import WSCLI
\ No newline at end of file
+from .cli import WSCLI
+from .realtime import RealTimeLoop
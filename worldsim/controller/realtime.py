@@ -0,0 +1,382 @@
+'''
+    Runs a world against the clock at a fixed number of ticks per second using asyncio:
+    - TickTimings - how long the ticks took, how late they started and how many were coalesced or skipped
+    - EventSubscription - a queue of the world's events that a consumer can await
+    - RealTimeLoop - ticks a world on a fixed schedule and hands out the events from each tick to the subscribers
+
+    Every tick has a deadline on a fixed grid so a slow tick doesn't push back the ticks after it.  If the loop
+    falls behind then the ticks that it has missed are either run together as one World.advance() (coalesced) or
+    dropped (skipped) so that it gets back onto the grid straight away rather than trying to catch up tick by tick.
+    A frame only coalesces as many ticks as it can run in one tick period going by how long ticks have been taking
+    so that catching up never makes the loop fall further behind.
+    A subscriber that doesn't keep up loses its oldest events rather than holding up the simulation.
+
+    N.B. the loop takes all of the events off the world's event queue so read them from a subscription e.g.
+
+    loop = RealTimeLoop(world, ticks_per_second=20)
+    subscription = loop.subscribe()
+    task = asyncio.create_task(loop.run())
+    async for tick_count, event in subscription:
+        print(tick_count, event)
+
+    The tick count that goes with each event is the tick that the event happened on.
+
+    python -m worldsim.controller.realtime --tps 20 --ticks 200
+'''
+
+import argparse
+import asyncio
+import logging
+import time
+
+import worldsim.model as model
+
+
+class TickTimings:
+
+    def __init__(self):
+
+        # How many times the loop has woken up to tick and how many world ticks it has done
+        self.frames = 0
+        self.ticks = 0
+
+        # Frames that started a whole tick period or more after their deadline
+        self.overruns = 0
+
+        # Missed ticks that were run as part of a later frame and missed ticks that were dropped
+        self.coalesced_ticks = 0
+        self.skipped_ticks = 0
+
+        # Seconds spent ticking the world and how late each frame started after its deadline
+        self.total_tick_time = 0.0
+        self.max_tick_time = 0.0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+
+    # Record how a frame went
+    def add_frame(self, ticks: int, tick_time: float, lateness: float, is_overrun: bool, coalesced: int, skipped: int):
+        self.frames += 1
+        self.ticks += ticks
+        self.total_tick_time += tick_time
+        self.max_tick_time = max(self.max_tick_time, tick_time)
+        self.total_lateness += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        self.coalesced_ticks += coalesced
+        self.skipped_ticks += skipped
+        if is_overrun is True:
+            self.overruns += 1
+
+    @property
+    def mean_tick_time(self):
+        return self.total_tick_time / self.frames if self.frames > 0 else None
+
+    @property
+    def mean_lateness(self):
+        return self.total_lateness / self.frames if self.frames > 0 else None
+
+    def print(self):
+
+        output_width = 70
+
+        print(" Real time loop ".center(output_width, "-"))
+        print("{0:<30}{1:>16}".format("Frames", self.frames))
+        print("{0:<30}{1:>16}".format("World ticks", self.ticks))
+        print("{0:<30}{1:>16}".format("Overruns", self.overruns))
+        print("{0:<30}{1:>16}".format("Coalesced ticks", self.coalesced_ticks))
+        print("{0:<30}{1:>16}".format("Skipped ticks", self.skipped_ticks))
+        if self.frames > 0:
+            print("{0:<30}{1:>16.3f}".format("Mean tick ms", self.mean_tick_time * 1000))
+            print("{0:<30}{1:>16.3f}".format("Max tick ms", self.max_tick_time * 1000))
+            print("{0:<30}{1:>16.3f}".format("Mean lateness ms", self.mean_lateness * 1000))
+            print("{0:<30}{1:>16.3f}".format("Max lateness ms", self.max_lateness * 1000))
+
+
+class EventSubscription:
+    '''
+    A bounded queue of (tick count, event) for one consumer of a real time loop's events
+    '''
+
+    # How many events a subscription holds before it starts dropping the oldest ones
+    DEFAULT_MAX_EVENTS = 10000
+
+    def __init__(self, max_events: int = DEFAULT_MAX_EVENTS):
+        self._queue = asyncio.Queue(max_events)
+        self.dropped = 0
+        self.is_closed = False
+
+    # Add an event without ever waiting - if the queue is full then the oldest event is dropped to make room
+    def put(self, tick_count: int, event):
+
+        if self.is_closed is True:
+            return
+
+        if self._queue.full() is True:
+            self._queue.get_nowait()
+            self.dropped += 1
+
+        self._queue.put_nowait((tick_count, event))
+
+    # Wait for the next (tick count, event) or None once the subscription has been closed and emptied
+    async def get(self):
+
+        if self.is_closed is True and self._queue.empty() is True:
+            return None
+
+        item = await self._queue.get()
+
+        # The end marker goes back in so that anybody else waiting on the queue also sees it
+        if item is None:
+            self._queue.put_nowait(None)
+
+        return item
+
+    # Stop taking events and let anybody waiting know that there are no more to come
+    def close(self):
+
+        if self.is_closed is True:
+            return
+
+        self.is_closed = True
+
+        if self._queue.full() is True:
+            self._queue.get_nowait()
+            self.dropped += 1
+
+        self._queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self.get()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+
+class RealTimeLoop:
+
+    DEFAULT_TICKS_PER_SECOND = 10
+
+    # What to do with the ticks that have been missed when the loop falls behind
+    # Coalesce - run them together with the next tick as one World.advance()
+    # Skip - drop them so that the world runs slower than the clock
+    POLICY_COALESCE = "coalesce"
+    POLICY_SKIP = "skip"
+    POLICIES = (POLICY_COALESCE, POLICY_SKIP)
+
+    # The most ticks that one frame will run when coalescing - any more missed ticks than this get skipped
+    MAX_COALESCED_TICKS = 100
+
+    # How much each new measurement of the time per tick counts towards the running average
+    TICK_COST_WEIGHT = 0.2
+
+    def __init__(self, world: model.World,
+                 ticks_per_second: float = DEFAULT_TICKS_PER_SECOND,
+                 policy: str = POLICY_COALESCE,
+                 max_coalesced_ticks: int = MAX_COALESCED_TICKS,
+                 use_thread: bool = False):
+
+        if policy not in RealTimeLoop.POLICIES:
+            raise Exception("{0} is not a valid real time loop policy.".format(policy))
+
+        self.world = world
+        self.ticks_per_second = ticks_per_second
+        self.policy = policy
+        self.max_coalesced_ticks = max(1, max_coalesced_ticks)
+
+        # Tick the world in a worker thread so that the event loop stays responsive while a tick runs
+        # N.B. nothing else should use the world while a tick is running
+        self.use_thread = use_thread
+
+        self.timings = TickTimings()
+
+        # Running average of the seconds that each world tick takes
+        self._tick_cost = None
+
+        self._subscriptions = []
+        self._stop_event = None
+        self.is_running = False
+
+    @property
+    def ticks_per_second(self):
+        return self._ticks_per_second
+
+    # The tick rate can be changed while the loop is running and the new rate starts from the next frame
+    @ticks_per_second.setter
+    def ticks_per_second(self, new_rate: float):
+
+        if new_rate <= 0:
+            raise Exception("Ticks per second must be more than zero not {0}.".format(new_rate))
+
+        self._ticks_per_second = new_rate
+
+    # Start getting the events from every tick
+    def subscribe(self, max_events: int = EventSubscription.DEFAULT_MAX_EVENTS):
+        subscription = EventSubscription(max_events)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription):
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+        subscription.close()
+
+    # Ask the loop to stop once the current frame is done
+    def stop(self):
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    #
+    # Tick the world at the target rate until the loop is stopped or the specified number of world ticks are done
+    # The subscriptions are closed when the loop finishes
+    #
+    async def run(self, ticks: int = None):
+
+        if self.is_running is True:
+            raise Exception("Real time loop for {0} is already running.".format(self.world.name))
+
+        self.is_running = True
+        self._stop_event = asyncio.Event()
+
+        event_loop = asyncio.get_running_loop()
+        frame_time = event_loop.time()
+
+        logging.info("%s.run(): Running %s at %.1f ticks per second", __class__, self.world.name,
+                     self._ticks_per_second)
+
+        try:
+            # Hand out anything that happened before we started
+            self._publish_events()
+
+            while self._stop_event.is_set() is False and (ticks is None or self.timings.ticks < ticks):
+
+                # Wait for the frame's deadline unless somebody stops us first
+                delay = frame_time - event_loop.time()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._stop_event.wait(), delay)
+                        break
+                    except asyncio.TimeoutError:
+                        pass
+
+                period = 1 / self._ticks_per_second
+                lateness = max(0.0, event_loop.time() - frame_time)
+
+                # Work out how many whole tick periods we have missed and what to do about them
+                missed = int(lateness / period)
+                if self.policy == RealTimeLoop.POLICY_COALESCE:
+                    coalesced = min(missed, self.max_coalesced_ticks - 1)
+                    if self._tick_cost is not None:
+                        coalesced = min(coalesced, max(0, int(period / self._tick_cost) - 1))
+                else:
+                    coalesced = 0
+                skipped = missed - coalesced
+
+                frame_ticks = 1 + coalesced
+                if ticks is not None:
+                    frame_ticks = min(frame_ticks, ticks - self.timings.ticks)
+
+                tick_time = await self._tick(event_loop, frame_ticks)
+
+                tick_cost = tick_time / frame_ticks
+                if self._tick_cost is None:
+                    self._tick_cost = tick_cost
+                else:
+                    self._tick_cost += (tick_cost - self._tick_cost) * RealTimeLoop.TICK_COST_WEIGHT
+
+                self.timings.add_frame(frame_ticks, tick_time, lateness, missed > 0, frame_ticks - 1, skipped)
+
+                if missed > 0:
+                    logging.debug("%s.run(): Frame %i was %.1fms late so coalesced %i ticks and skipped %i",
+                                  __class__, self.timings.frames, lateness * 1000, coalesced, skipped)
+
+                self._publish_events()
+
+                # The next deadline is on the grid after all of the ticks that this frame covered
+                frame_time += (missed + 1) * period
+
+                # Give the subscribers a chance to run even if we are behind
+                await asyncio.sleep(0)
+
+        finally:
+            self.is_running = False
+            self._stop_event = None
+            for subscription in self._subscriptions:
+                subscription.close()
+            self._subscriptions = []
+
+    # Tick the world once or run several ticks as one advance and return how long it took
+    async def _tick(self, event_loop, ticks: int):
+
+        if ticks == 1:
+            function, arguments = self.world.tick, ()
+        else:
+            function, arguments = self.world.advance, (ticks,)
+
+        start_time = time.perf_counter()
+
+        if self.use_thread is True:
+            await event_loop.run_in_executor(None, function, *arguments)
+        else:
+            function(*arguments)
+
+        return time.perf_counter() - start_time
+
+    # Take the events off the world's event queue and give them to every subscriber
+    # Each event goes out with the tick that it happened on even if several ticks were run together in one frame
+    def _publish_events(self):
+
+        while True:
+            event = self.world.get_next_event()
+            if event is None:
+                break
+            tick_count = event.tick_count if event.tick_count is not None else self.world._tick_count
+            for subscription in self._subscriptions:
+                subscription.put(tick_count, event)
+
+
+def main():
+
+    # Import here so that the controller doesn't depend on the headless runner unless it is run directly
+    from worldsim.runner import RunConfig, Runner
+
+    parser = argparse.ArgumentParser(description="Run a World Sim world against the clock.")
+    parser.add_argument("--config", help="JSON file with the settings for the world")
+    parser.add_argument("--tps", type=float, default=RealTimeLoop.DEFAULT_TICKS_PER_SECOND, help="ticks per second")
+    parser.add_argument("--ticks", type=int, help="number of world ticks to run for (default is until interrupted)")
+    parser.add_argument("--policy", choices=RealTimeLoop.POLICIES, default=RealTimeLoop.POLICY_COALESCE,
+                        help="what to do with missed ticks when the loop falls behind")
+    parser.add_argument("--thread", action="store_true", help="tick the world in a worker thread")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    config = RunConfig.load(args.config) if args.config is not None else RunConfig()
+
+    runner = Runner(config)
+    runner.setup()
+
+    loop = RealTimeLoop(runner.world, args.tps, args.policy, use_thread=args.thread)
+
+    async def print_events(subscription: EventSubscription):
+        async for tick_count, event in subscription:
+            print("{0}\t{1}".format(tick_count, str(event)))
+
+    async def run():
+        printer = asyncio.create_task(print_events(loop.subscribe()))
+        try:
+            await loop.run(args.ticks)
+        finally:
+            await printer
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+    loop.timings.print()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,25 @@
     This module contains the framework classes for the stat engine:
     - BaseStat - basic stat details
     - CoreStat - a core stat that auto updates listeners when its value changes
+    - BoundStat - a core stat that takes its value from a stat shared with other containers
     - DerivedStat - a stat derived from other stats
     - StatEngine - the container for all of the stats and manages stat listeners
+    - StatProfiler - optional counters and timings of how much work each stat does
 '''
 
 import logging
 import datetime
 import csv
-from copy import deepcopy
+import heapq
+import time
+from collections import deque
+from contextlib import contextmanager
+from copy import copy, deepcopy
 from .utils import is_numeric
 
+# Cache of the names of all of the slots defined by a stat class and its parents
+_slot_names_by_class = {}
+
 '''
 The basic details of a stat
 '''
@@ -20,6 +29,13 @@ class BaseStat(object):
     EVERGREEN = -1
     DEAD = 0
 
+    # Set to True to record the wall clock time when each stat is created and updated
+    RECORD_WALL_CLOCK = False
+
+    # Stats use slots rather than a dictionary to keep the memory used per stat down
+    __slots__ = ("name", "category", "description", "_value", "_old_value", "owner", "_lifetime",
+                 "update_tick", "create_time", "update_time")
+
     # Initiation of BaseStat, and parameters
     def __init__(self, name: str, category: str, value: float,
                  description : str = "", owner:int = 0, lifetime: int = EVERGREEN):
@@ -30,12 +46,18 @@ class BaseStat(object):
         self._old_value = value
         self.owner = owner
         self._lifetime = lifetime
-        self.create_time = datetime.datetime.now()
-        self.update_time = datetime.datetime.now()
+
+        # The tick number when the stat was last updated
+        self.update_tick = 0
+
+        if BaseStat.RECORD_WALL_CLOCK is True:
+            self.create_time = self.update_time = datetime.datetime.now()
+        else:
+            self.create_time = self.update_time = None
 
     # convert to string
     def __str__(self):
-        _str = self.name + "(" + self.category + ")" + "=" + str(self._value)
+        _str = self.name + "(" + self.category + ")" + "=" + str(self.value)
         if self.description is not "":
             _str + " (" + self.description + ")"
 
@@ -51,7 +73,45 @@ class BaseStat(object):
     def value(self, new_value: float):
         self._old_value = self._value
         self._value = (new_value)
-        self.update_time = datetime.datetime.now()
+        if BaseStat.RECORD_WALL_CLOCK is True:
+            self.update_time = datetime.datetime.now()
+
+    # Take a copy of the current state of the stat so that it can be restored later
+    def get_state(self):
+
+        state = {}
+        for slot_name in self.get_slot_names():
+            if hasattr(self, slot_name):
+                state[slot_name] = getattr(self, slot_name)
+
+        # Derived classes that don't define slots store their attributes in a dictionary
+        if hasattr(self, "__dict__"):
+            state.update(self.__dict__)
+
+        return state
+
+    # Restore the stat to a state previously returned by get_state()
+    def set_state(self, state: dict):
+        for attribute_name, attribute_value in state.items():
+            setattr(self, attribute_name, attribute_value)
+
+    # Get the names of all of the slots defined by this stat's class and its parents
+    @classmethod
+    def get_slot_names(cls):
+
+        slot_names = _slot_names_by_class.get(cls)
+
+        if slot_names is None:
+            slot_names = []
+            for klass in cls.__mro__:
+                slots = klass.__dict__.get("__slots__", ())
+                if isinstance(slots, str):
+                    slots = (slots,)
+                slot_names += [slot_name for slot_name in slots if slot_name not in ("__dict__", "__weakref__")]
+            slot_names = tuple(slot_names)
+            _slot_names_by_class[cls] = slot_names
+
+        return slot_names
 
 
 class CoreStat(BaseStat):
@@ -59,6 +119,8 @@ class CoreStat(BaseStat):
     A core stat is one that is not derived from other stats but other stats can listen to it for updates
     """
 
+    __slots__ = ("_listeners", "_baseStatNames", "_engine", "_stat_id", "_expiry_tick")
+
     # Constructor
     def __init__(self, name: str, category: str, value: float,
                  description : str = "", owner=0, lifetime=BaseStat.EVERGREEN):
@@ -66,12 +128,21 @@ class CoreStat(BaseStat):
         # Initialise the parent class
         super(CoreStat, self).__init__(name, category, value, description, owner, lifetime)
 
-        # Define an protected empty set that will contain the listeners for this stat
-        self._listeners = set()
+        # The stats that are listening to this stat
+        # A dictionary with no values is used as an ordered set so that the listeners are always told about a change
+        # in the order that they were added whatever the process or the memory layout
+        self._listeners = {}
 
         # There are no stats that a core stat is dependent on
         self._baseStatNames = None
 
+        # The stat engine that this stat has been added to (if any) and the ID that the engine gave it
+        self._engine = None
+        self._stat_id = None
+
+        # The engine tick number on which a time limited stat expires
+        self._expiry_tick = None
+
     # Convert to a string
     def __str__(self):
         text = super(CoreStat, self).__str__()
@@ -83,15 +154,25 @@ class CoreStat(BaseStat):
             text += ", owner(" + str(self.owner) + ")"
 
         if self._lifetime != BaseStat.EVERGREEN:
-            text += ", lifetime(" + str(self._lifetime) + ")"
+            text += ", lifetime(" + str(self.lifetime) + ")"
 
         return text
 
+    # How many more ticks this stat has to live
+    @property
+    def lifetime(self):
+
+        # If an engine is tracking when we expire then work out how long is left from the engine's tick number
+        if self._engine is not None and self._expiry_tick is not None:
+            return max(self._expiry_tick - self._engine._tick_number, BaseStat.DEAD)
+
+        return self._lifetime
+
     # Registers a derived stat as being dependent on this stat by adding it to the list of listeners
     def add_listener(self, new_listener):
 
         # add the new listener to the list for this stat
-        self._listeners.add(new_listener)
+        self._listeners[new_listener] = None
 
         # and then ping the new listener with the latest details of this stat by calling the update method
         new_listener.update(self)
@@ -108,8 +189,37 @@ class CoreStat(BaseStat):
     def set_value(self, new_value: float):
 
         if new_value != self._value:
+
+            # If our engine has a transaction open then it needs our state from before the change to roll back to
+            engine = self._engine
+            if engine is not None and engine._transaction_depth > 0:
+                engine.save_transaction_state(self)
+
+            self._old_value = self._value
             self._value = new_value
+            self.touch()
+            self.notify_listeners()
+
+    # Record when the value of this stat last changed and add the change to our engine's journal if it has one
+    def touch(self):
+
+        if self._engine is not None:
+            self.update_tick = self._engine._tick_number
+            if self._engine._journal is not None:
+                self._engine.journal_change(self)
 
+        if BaseStat.RECORD_WALL_CLOCK is True:
+            self.update_time = datetime.datetime.now()
+
+    # Let all listeners know that the value of this stat has changed
+    # If our engine is deferring propagation then just tell the engine that we are dirty
+    def notify_listeners(self):
+
+        if self._engine is not None and self._engine._deferred is True:
+            self._engine.mark_dirty(self)
+        else:
+            if self._engine is not None and self._engine._profiler is not None:
+                self._engine._profiler.count_notifications(self, len(self._listeners))
             for listener in self._listeners:
                 listener.update(self)
 
@@ -143,6 +253,38 @@ class CoreStat(BaseStat):
         return self._lifetime
 
 
+class BoundStat(CoreStat):
+    """
+    A core stat that is bound to a stat shared with other containers e.g. a world input that is the same for every
+    agent.  Reading the value reads the shared stat so a change to the shared stat is seen by every container without
+    being copied into each of them.  The stat's own value is used while the shared stat has no value.
+    N.B. the listeners are not told when the shared stat changes so only bind stats whose listeners get calculated
+    anyway e.g. the inputs of ticking stats.
+    """
+
+    __slots__ = ("_shared_stat",)
+
+    # Constructor
+    def __init__(self, name: str, category: str, value: float, shared_stat: CoreStat,
+                 description : str = "", owner=0, lifetime=BaseStat.EVERGREEN):
+
+        # Initialise the parent class
+        super(BoundStat, self).__init__(name, category, value, description, owner, lifetime)
+
+        self._shared_stat = shared_stat
+
+    # A property style getter
+    @property
+    def value(self):
+        shared_value = self._shared_stat._value
+        return self._value if shared_value is None else shared_value
+
+    # a property style setter
+    @value.setter
+    def value(self, new_value: float):
+        self.set_value(new_value)
+
+
 '''
 A derived stat is one that is based on one or more other base stats.
 Base stats can be core stats or other derived stats
@@ -153,6 +295,14 @@ This class is an abstract class so you need to inherit from it and:-
 
 
 class DerivedStat(CoreStat):
+
+    # Set to True in a derived class if calculate() depends on how many times it is called and not just on the
+    # values of its dependencies e.g. it accumulates a value.  Stateful stats are never evaluated lazily.
+    IS_STATEFUL = False
+
+    __slots__ = ("_baseStats", "_baseStatDefaults", "_dependency_slots", "_dependency_names", "_dependency_stats",
+                 "_missing_count", "_is_lazy", "_is_dirty")
+
     # Constructor
     def __init__(self, name: str, category: str, description : str = ""):
 
@@ -168,6 +318,31 @@ class DerivedStat(CoreStat):
         # This dictionary stores any defaults for optional dependencies
         self._baseStatDefaults = {}
 
+        # Each dependency also gets a numbered slot so that calculate() can get it without looking it up by name
+        self._dependency_slots = {}
+        self._dependency_names = []
+        self._dependency_stats = []
+
+        # How many of the required dependencies are not in the local dictionary yet
+        self._missing_count = 0
+
+        # Lazy stats only calculate their value when it is read and a dependency has changed since the last read
+        self._is_lazy = False
+        self._is_dirty = False
+
+    # A property style getter that calculates the value of a lazy stat if it is out of date
+    @property
+    def value(self):
+        if self._is_dirty is True:
+            self._is_dirty = False
+            self.recalculate()
+        return self._value
+
+    # a property style setter
+    @value.setter
+    def value(self, new_value: float):
+        self.set_value(new_value)
+
     # Convert to string
     def __str__(self):
         text = super(DerivedStat, self).__str__()
@@ -198,51 +373,150 @@ class DerivedStat(CoreStat):
     # The input parameter is the actual stat object that has changed which is optional
     def update(self, changed_stat=None):
 
+        if self._engine is not None and self._engine._profiler is not None:
+            self._engine._profiler.count_update(self)
+
+        # If we are a lazy stat then just record that we are out of date
+        if self._is_lazy is True:
+            if changed_stat is not None:
+                self.set_dependency(changed_stat)
+            self.invalidate()
+            return
+
+        # Only build debug messages if someone is going to see them
+        is_debug = logging.root.isEnabledFor(logging.DEBUG)
+
         # If we got an update because of a change to a specific stat then log this
         if changed_stat is not None:
 
-            logging.debug("%s.update(): %s got an update to %s.", __class__, self.name, changed_stat.name)
+            if is_debug is True:
+                logging.debug("%s.update(): %s got an update to %s.", __class__, self.name, changed_stat.name)
 
             # Store the new stat in the local dictionary
-            self._baseStats[changed_stat.name] = changed_stat
+            self.set_dependency(changed_stat)
 
         # Else log a generic update request
-        else:
+        elif is_debug is True:
             logging.debug("%s.update(): %s got a general update request.", __class__, self.name)
 
         # If we have all of the dependent stats in the local dictionary then go ahead and recalculate the value
         # of the derived stat
-        if len(self.get_missing_dependencies()) == 0:
+        if self._missing_count == 0:
 
             try:
 
-                logging.debug("%s.update(): Calculating %s from %s", __class__, self.name, str(self._baseStatNames))
+                if is_debug is True:
+                    logging.debug("%s.update(): Calculating %s from %s", __class__, self.name, str(self._baseStatNames))
 
                 # calculate the new value and call the parent set_value to make sure all derived stats are updated
-                super(DerivedStat,self).set_value(self.calculate())
+                if self._engine is not None and self._engine._profiler is not None:
+                    super(DerivedStat,self).set_value(self._engine._profiler.time_calculate(self))
+                else:
+                    super(DerivedStat,self).set_value(self.calculate())
 
-                logging.debug("%s.update(): New calculated value=%s", __class__, str(self._value))
+                if is_debug is True:
+                    logging.debug("%s.update(): New calculated value=%s", __class__, str(self._value))
 
             except Exception as err:
 
                 logging.warning("%s.update(): Calculating %s exception (%s).", __class__, self.name, str(err))
 
-        else:
+        elif logging.root.isEnabledFor(logging.INFO):
             logging.info("%s.update(): Not got all of the dependencies yet for stat %s - missing %s.", \
                          __class__, self.name, str(self.get_missing_dependencies()))
 
+    # Mark a lazy stat as out of date and pass this on to any listeners
+    def invalidate(self):
+
+        # If we are already out of date then our listeners already know about it
+        if self._is_dirty is True:
+            return
+
+        self._is_dirty = True
+
+        if self._engine is not None and self._engine._profiler is not None:
+            self._engine._profiler.count_notifications(self, len(self._listeners))
+
+        # Lazy listeners just need to know that we are out of date...
+        eager_listeners = []
+        for listener in self._listeners:
+            if listener._is_lazy is True:
+                listener.update(self)
+            else:
+                eager_listeners.append(listener)
+
+        # ...but eager listeners need to know our new value straight away if it has changed
+        if len(eager_listeners) > 0:
+            old_value = self._value
+            if self.value != old_value:
+                for listener in eager_listeners:
+                    listener.update(self)
+
+    # Recalculate the value of this stat without notifying any listeners
+    # Used by the stat engine when it is propagating changes in topological order
+    # Returns True if the value of the stat changed
+    # If raise_errors is True then any exception raised by calculate() is passed on to the caller
+    def recalculate(self, raise_errors: bool = False):
+
+        if self._missing_count > 0:
+            return False
+
+        try:
+            if self._engine is not None and self._engine._profiler is not None:
+                new_value = self._engine._profiler.time_calculate(self)
+            else:
+                new_value = self.calculate()
+
+        except Exception as err:
+            logging.warning("%s.recalculate(): Calculating %s exception (%s).", __class__, self.name, str(err))
+            if raise_errors is True:
+                raise
+            return False
+
+        if new_value != self._value:
+            self._old_value = self._value
+            self._value = new_value
+            self.touch()
+            return True
+
+        return False
+
     # This method is called when a dependent stat is being destroyed
     def remove(self, removed_stat):
 
         logging.debug("%s.remove(): Removing %s from %s.", __class__, removed_stat.name, self.name)
 
         # Remove the stat entry from the local dictionary
-        if removed_stat.name in self._baseStats.keys():
+        if removed_stat.name in self._baseStats:
             del self._baseStats[removed_stat.name]
+            self._dependency_stats[self._dependency_slots[removed_stat.name]] = None
+
+            # If it was a required dependency then we are now missing it
+            if removed_stat.name not in self._baseStatDefaults:
+                self._missing_count += 1
 
         # Recalculate this derived stat using a generic update request
         self.update()
 
+    # Store a dependency stat in the local dictionary
+    def set_dependency(self, dependency_stat):
+
+        name = dependency_stat.name
+
+        # If this is the first time that we have got a required dependency then we are missing one less
+        if name not in self._baseStats and name in self._baseStatNames and name not in self._baseStatDefaults:
+            self._missing_count -= 1
+
+        self._baseStats[name] = dependency_stat
+
+        slot = self._dependency_slots.get(name)
+        if slot is not None:
+            self._dependency_stats[slot] = dependency_stat
+
+    # Have we got all of the required dependencies in the local dictionary?
+    def is_ready(self):
+        return self._missing_count == 0
+
     # return a set of the stat names that we are still waiting for in our local dictionary
     def get_missing_dependencies(self):
         # Look at what are required stats and see if these are either in the local dictionary of in teh default list
@@ -257,12 +531,50 @@ class DerivedStat(CoreStat):
 
     # Add the name of a dependency stat to the list of stat names
     # If the stat is optional then load in a default stat into the local dictionary with the specified default
-    def add_dependency(self, dependent_stat, optional: bool=False, default_value: float=0) -> object:
+    # Returns the slot number that can be used to get the value of the dependency with get_slot_value()
+    # N.B. the dependency wiring is replaced rather than changed in place as cloned stats share it
+    def add_dependency(self, dependent_stat, optional: bool=False, default_value: float=0) -> int:
+
+        # Keep count of the required dependencies that we don't have yet
+        is_missing = dependent_stat not in self._baseStats and dependent_stat not in self._baseStatDefaults
+
+        if dependent_stat not in self._baseStatNames:
+            self._baseStatNames = self._baseStatNames | {dependent_stat}
+            if optional is False and is_missing is True:
+                self._missing_count += 1
+
+        # A required dependency that has now been made optional is no longer missing
+        elif optional is True and is_missing is True:
+            self._missing_count -= 1
 
-        self._baseStatNames.add(dependent_stat)
         if optional is True:
+            self._baseStatDefaults = dict(self._baseStatDefaults)
             self._baseStatDefaults[dependent_stat] = default_value
 
+        # Give the dependency a slot if it hasn't got one already
+        slot = self._dependency_slots.get(dependent_stat)
+        if slot is None:
+            slot = len(self._dependency_names)
+            self._dependency_slots = dict(self._dependency_slots)
+            self._dependency_slots[dependent_stat] = slot
+            self._dependency_names = self._dependency_names + [dependent_stat]
+            self._dependency_stats.append(self._baseStats.get(dependent_stat))
+
+        return slot
+
+    # Retrieve the value of a dependency stat using the slot number returned by add_dependency()
+    def get_slot_value(self, slot: int):
+
+        dependency_stat = self._dependency_stats[slot]
+
+        if dependency_stat is not None:
+            stat_value = dependency_stat.value
+            if stat_value is not None:
+                return stat_value
+
+        # Fall back to looking up the dependency by name to get any default value or to report that it is missing
+        return self.get_dependency_value(self._dependency_names[slot])
+
     # Retrieve the value of a specified dependency stat
     # Try the local dictionary, then defaults list else raise exception
     def get_dependency_value(self, dependency_stat_name):
@@ -270,11 +582,13 @@ class DerivedStat(CoreStat):
         stat_value = None
 
         # Firstly see if we have the requested stat in our local dictionary
-        if dependency_stat_name in self._baseStats.keys():
-            stat_value = self._baseStats[dependency_stat_name].value
+        dependency_stat = self._baseStats.get(dependency_stat_name)
+        if dependency_stat is not None:
+            stat_value = dependency_stat.value
 
-            logging.debug("%s.get_dependency_value(): Found local value %s=%s.", \
-                          __class__, dependency_stat_name, str(stat_value))
+            if logging.root.isEnabledFor(logging.DEBUG):
+                logging.debug("%s.get_dependency_value(): Found local value %s=%s.", \
+                              __class__, dependency_stat_name, str(stat_value))
 
         # We have a non-None value
         if stat_value is not None:
@@ -283,8 +597,9 @@ class DerivedStat(CoreStat):
         elif dependency_stat_name in self._baseStatDefaults:
             stat_value = self._baseStatDefaults[dependency_stat_name]
 
-            logging.debug("%s.get_dependency_value(): Found default value %s=%s.", \
-                          __class__, dependency_stat_name, str(stat_value))
+            if logging.root.isEnabledFor(logging.DEBUG):
+                logging.debug("%s.get_dependency_value(): Found default value %s=%s.", \
+                              __class__, dependency_stat_name, str(stat_value))
 
         # Can't find it so see if the requested stat was ever registered as a dependency
         elif dependency_stat_name not in self._baseStatNames:
@@ -314,31 +629,112 @@ The main container for stats.
 
 
 class StatEngine:
+
+    # Propagation modes
+    # Immediate - a stat change is pushed to all listeners straight away
+    # Batch - stat changes mark stats as dirty and a flush recalculates each affected stat once in topological order
+    # Lazy - stateless derived stats are only recalculated when they are read after a dependency has changed
+    PROPAGATE_IMMEDIATE = "immediate"
+    PROPAGATE_BATCH = "batch"
+    PROPAGATE_LAZY = "lazy"
+
+    PROPAGATION_MODES = (PROPAGATE_IMMEDIATE, PROPAGATE_BATCH, PROPAGATE_LAZY)
+
     # Initialises to create a name and empty dictionary
-    def __init__(self, name):
+    def __init__(self, name, propagation_mode: str = PROPAGATE_IMMEDIATE):
         self.name = name
 
         # Create an empty dictionary that will store all of the stats
         self._stats = {}
 
+        # The set of stats that have changed since the last flush
+        self._dirty = set()
+
+        # Cache of the topological rank of each stat in the dependency graph
+        self._topological_ranks = None
+
+        # Reverse dependency index - the stats in the container that depend on each stat name
+        self._dependents = {}
+
+        # Symbol table that gives each stat name a small integer ID and the stat currently using each ID
+        self._stat_ids = {}
+        self._stat_names = []
+        self._stats_by_id = []
+
+        # Secondary indexes of the stats in the container keyed by owner and by category
+        self._stats_by_owner = {}
+        self._stats_by_category = {}
+
+        # How many times the engine has ticked and a min-heap of (expiry tick, sequence, stat) for time limited stats
+        self._tick_number = 0
+        self._expiry_queue = []
+        self._expiry_sequence = 0
+
+        # Optional journal of the stats that have changed this tick - {stat id: (value at start of tick, new value)}
+        self._journal = None
+
+        # Optional profiler that counts the work done by each stat
+        self._profiler = None
+
+        # How many transactions are open and for each open transaction the state of each stat before the
+        # transaction first changed it - {stat: state} with the innermost transaction last
+        self._transaction_depth = 0
+        self._transaction_levels = []
+
+        self._propagation_mode = None
+        self._deferred = False
+        self.propagation_mode = propagation_mode
+
+    @property
+    def propagation_mode(self):
+        return self._propagation_mode
+
+    # Change how stat changes are propagated to listeners
+    @propagation_mode.setter
+    def propagation_mode(self, new_mode: str):
+
+        if new_mode not in StatEngine.PROPAGATION_MODES:
+            raise Exception("{0} is not a valid propagation mode.".format(new_mode))
+
+        self._propagation_mode = new_mode
+        self._deferred = (new_mode == StatEngine.PROPAGATE_BATCH or self._transaction_depth > 0)
+
+        # Make sure nothing is left pending if we are no longer deferring propagation
+        if self._deferred is False:
+            self.flush()
+
+        for stat in self._stats.values():
+            self._set_lazy(stat)
+
+    # Make a derived stat lazy if we are in lazy mode and it is safe to do so
+    def _set_lazy(self, stat):
+
+        if isinstance(stat, DerivedStat) is False:
+            return
+
+        stat._is_lazy = (self._propagation_mode == StatEngine.PROPAGATE_LAZY and stat.IS_STATEFUL is False)
+
+        # If the stat is no longer lazy then make sure that it is up to date
+        if stat._is_lazy is False and stat._is_dirty is True:
+            stat.value
+
     # Add a new stat to the container and sync up all listeners
     def add_stat(self, new_stat):
 
         logging.debug("%s.add_stat(): Adding new stat %s.", __class__, new_stat.name)
 
-        # Adds a new stat to the dictionary using the stat name as the key
-        self._stats[new_stat.name] = new_stat
+        self._insert_stat(new_stat)
 
         # If there are some dependencies for the new stat....
         if new_stat._baseStatNames is not None:
 
             # Look at the dependencies, retrieve each one from the dictionary
-            # and register the new stat as a listener on each
-            for base_stat_name in new_stat._baseStatNames:
+            # and register the new stat as a listener on each in the order that the dependencies were added
+            for base_stat_name in new_stat._dependency_names:
 
                 logging.debug("%s.add_stat(): Adding listener %s to %s.", __class__, new_stat.name, base_stat_name)
 
-                base_stat = self.get_stat(base_stat_name)
+                base_stat = self._stats.get(base_stat_name)
 
                 if base_stat is not None:
                     base_stat.add_listener(new_stat)
@@ -346,12 +742,133 @@ class StatEngine:
                     logging.warning("%s.add_stat(): Couldn't find dependency %s for stat %s.", \
                                     __class__, base_stat_name, new_stat.name)
 
-        # Look through all stats in the container and see if any are dependent on the new stat
-        # If they are then add the existing stat as a listener to the new stat
-        for stat in self._stats.values():
-            if stat._baseStatNames is not None and new_stat.name in stat._baseStatNames:
-                logging.debug("%s.add_stat(): Adding listener %s to %s.", __class__, stat.name, new_stat.name)
-                new_stat.add_listener(stat)
+        # Use the reverse dependency index to find any stats that are dependent on the new stat
+        # and add them as listeners to the new stat
+        for stat in list(self._dependents.get(new_stat.name, ())):
+            logging.debug("%s.add_stat(): Adding listener %s to %s.", __class__, stat.name, new_stat.name)
+            new_stat.add_listener(stat)
+
+    # Add a list of new stats to the container in one go
+    # All of the listeners are wired up first and then each affected stat is calculated once in dependency order
+    def add_stats(self, stat_list: list):
+
+        if stat_list is None:
+            return
+
+        for new_stat in stat_list:
+            self._insert_stat(new_stat)
+
+        # If the list had more than one stat with the same name then only the last one counts
+        new_stats = [new_stat for new_stat in stat_list if self._stats.get(new_stat.name) is new_stat]
+        new_stat_set = set(new_stats)
+
+        stale_stats = set()
+
+        for new_stat in new_stats:
+
+            # Register the new stat as a listener on each of its dependencies
+            if new_stat._baseStatNames is not None:
+                for base_stat_name in new_stat._dependency_names:
+                    base_stat = self._stats.get(base_stat_name)
+                    if base_stat is not None:
+                        base_stat._listeners[new_stat] = None
+                        new_stat.set_dependency(base_stat)
+                        stale_stats.add(new_stat)
+                    else:
+                        logging.warning("%s.add_stats(): Couldn't find dependency %s for stat %s.", \
+                                        __class__, base_stat_name, new_stat.name)
+
+            # Register any existing stats that depend on the new stat as listeners
+            for stat in self._dependents.get(new_stat.name, ()):
+                if stat not in new_stat_set:
+                    new_stat._listeners[stat] = None
+                    stat.set_dependency(new_stat)
+                    stale_stats.add(stat)
+
+        self._propagate(stale_stats=stale_stats)
+
+    # Put a new stat into the container and the indexes replacing any existing stat with the same name
+    def _insert_stat(self, new_stat):
+
+        # If we are replacing an existing stat then it no longer belongs to this engine
+        old_stat = self._stats.get(new_stat.name)
+        if old_stat is not None:
+            old_stat._engine = None
+            self._dirty.discard(old_stat)
+            self._unindex_stat(old_stat)
+
+        # Adds a new stat to the dictionary using the stat name as the key
+        self._stats[new_stat.name] = new_stat
+        new_stat._engine = self
+        new_stat._stat_id = self.get_stat_id(new_stat.name)
+        self._stats_by_id[new_stat._stat_id] = new_stat
+        self._topological_ranks = None
+        self._set_lazy(new_stat)
+        self._index_stat(new_stat)
+
+        # If the new stat is time limited then schedule when it is going to expire
+        if new_stat._lifetime != BaseStat.EVERGREEN:
+            new_stat._expiry_tick = self._tick_number + new_stat._lifetime
+            self._expiry_sequence += 1
+            heapq.heappush(self._expiry_queue, (new_stat._expiry_tick, self._expiry_sequence, new_stat))
+
+    # Take a stat out of the container and stop it publishing to or listening to any other stats
+    def _remove_stat(self, stat):
+
+        stat.remove_all_listeners()
+        del self._stats[stat.name]
+        self._stats_by_id[stat._stat_id] = None
+        stat._engine = None
+        self._dirty.discard(stat)
+        self._unindex_stat(stat)
+        self._topological_ranks = None
+
+        # Stop listening to our dependencies
+        if stat._baseStatNames is not None:
+            for base_stat in stat._baseStats.values():
+                base_stat._listeners.pop(stat, None)
+
+    # Add a stat to the reverse dependency, owner and category indexes
+    def _index_stat(self, stat):
+
+        # Record the stats that the stat depends on in the reverse dependency index
+        # Like listeners the dependents of each stat are kept in the order that they were added
+        if stat._baseStatNames is not None:
+            for base_stat_name in stat._dependency_names:
+                if base_stat_name not in self._dependents:
+                    self._dependents[base_stat_name] = {}
+                self._dependents[base_stat_name][stat] = None
+
+        if stat.owner not in self._stats_by_owner:
+            self._stats_by_owner[stat.owner] = {}
+        self._stats_by_owner[stat.owner][stat.name] = stat
+
+        if stat.category not in self._stats_by_category:
+            self._stats_by_category[stat.category] = {}
+        self._stats_by_category[stat.category][stat.name] = stat
+
+    # Remove a stat from the reverse dependency, owner and category indexes
+    def _unindex_stat(self, stat):
+
+        if stat._baseStatNames is not None:
+            for base_stat_name in stat._dependency_names:
+                dependents = self._dependents.get(base_stat_name)
+                if dependents is not None:
+                    dependents.pop(stat, None)
+                    if len(dependents) == 0:
+                        del self._dependents[base_stat_name]
+
+        owner_stats = self._stats_by_owner.get(stat.owner)
+        if owner_stats is not None and owner_stats.get(stat.name) is stat:
+            del owner_stats[stat.name]
+            if len(owner_stats) == 0:
+                del self._stats_by_owner[stat.owner]
+
+        category_stats = self._stats_by_category.get(stat.category)
+        if category_stats is not None and category_stats.get(stat.name) is stat:
+            del category_stats[stat.name]
+            if len(category_stats) == 0:
+                del self._stats_by_category[stat.category]
 
     # Load in stats from a provided list
     # Default is to overwrite what is there already with option to increment
@@ -360,22 +877,462 @@ class StatEngine:
         if stat_list is None:
             return
 
+        # If we are overwriting then add all of the stats in one go
+        if overwrite is True:
+            self.add_stats(stat_list)
+            return
+
         for stat in stat_list:
-            # If we are overwriting or the stat does not exist then add the stat
-            if overwrite is True or self.get_stat(stat.name) is None:
+            # If the stat does not exist then add the stat
+            if self.get_stat(stat.name) is None:
                 self.add_stat(stat)
             # Else increment the existing stat
             else:
                 self.increment_stat(stat.name, stat.value)
 
+    # Mark a stat as having changed so that its listeners get recalculated at the next flush
+    def mark_dirty(self, stat):
+        self._dirty.add(stat)
+
+    # Remember the state of a stat before the innermost open transaction first changes it
+    def save_transaction_state(self, stat):
+
+        states = self._transaction_levels[-1]
+        if stat not in states:
+            states[stat] = stat.get_state()
+
+    # Start a transaction - stat changes are collected up and only propagated when the transaction is committed
+    # Transactions can be nested in which case changes are propagated when the outermost one is committed
+    def begin(self):
+
+        # Make sure anything changed before the transaction is propagated first
+        if self._transaction_depth == 0:
+            self.flush()
+
+        self._transaction_levels.append({})
+        self._transaction_depth += 1
+        self._deferred = True
+
+    # Commit a transaction by propagating all of the changes made since it began in one go
+    # If calculating any of the affected stats fails then the whole transaction is rolled back and the error raised.
+    # Lazy stats affected by the transaction are calculated straight away so that their errors are caught too.
+    def commit(self):
+
+        if self._transaction_depth == 0:
+            raise Exception("{0} has no transaction to commit.".format(self.name))
+
+        states = self._transaction_levels.pop()
+        self._transaction_depth -= 1
+
+        # Committing a nested transaction just hands its changes to the transaction that it is inside
+        if self._transaction_depth > 0:
+            outer_states = self._transaction_levels[-1]
+            for stat, state in states.items():
+                outer_states.setdefault(stat, state)
+            return
+
+        self._deferred = (self._propagation_mode == StatEngine.PROPAGATE_BATCH)
+
+        snapshots = {}
+
+        try:
+            self._propagate(raise_errors=True, snapshots=snapshots)
+
+        except Exception as err:
+            logging.warning("%s.commit(): Rolling back transaction on %s (%s).", __class__, self.name, str(err))
+            for stat, state in snapshots.items():
+                stat.set_state(state)
+            self._rejournal(snapshots.keys())
+            self._restore_states(states)
+            raise
+
+    # Abandon the innermost transaction and put the stats that it changed back to how they were when it began
+    # Any transactions that it is inside stay open with their own changes
+    def rollback(self):
+
+        if self._transaction_depth == 0:
+            raise Exception("{0} has no transaction to roll back.".format(self.name))
+
+        states = self._transaction_levels.pop()
+        self._transaction_depth -= 1
+
+        if self._transaction_depth == 0:
+            self._deferred = (self._propagation_mode == StatEngine.PROPAGATE_BATCH)
+
+        self._restore_states(states)
+
+    # Put the stats changed in a transaction back to their saved states
+    def _restore_states(self, states: dict):
+
+        for stat, state in states.items():
+            stat.set_state(state)
+
+        self._rejournal(states.keys())
+
+        # Stats that the outer transactions haven't changed no longer need propagating
+        for stat in states.keys():
+            if not any(stat in outer_states for outer_states in self._transaction_levels):
+                self._dirty.discard(stat)
+
+    # Are changes to stats being recorded in the journal?
+    @property
+    def journal_enabled(self):
+        return self._journal is not None
+
+    # Switch the journal of stat changes on or off
+    @journal_enabled.setter
+    def journal_enabled(self, is_enabled: bool):
+        if is_enabled is True and self._journal is None:
+            self._journal = {}
+        elif is_enabled is False:
+            self._journal = None
+
+    # Record a change to the value of a stat in the journal
+    # A stat only has one journal entry per tick which holds its value at the start of the tick and its latest value
+    def journal_change(self, stat):
+
+        entry = self._journal.get(stat._stat_id)
+
+        if entry is None:
+            self._journal[stat._stat_id] = (stat._old_value, stat._value)
+        else:
+            self._journal[stat._stat_id] = (entry[0], stat._value)
+
+    # Bring the journal entries of stats that have been put back to earlier values up to date
+    def _rejournal(self, stats):
+
+        if self._journal is None:
+            return
+
+        for stat in stats:
+            entry = self._journal.get(stat._stat_id)
+            if entry is not None:
+                self._journal[stat._stat_id] = (entry[0], stat._value)
+
+    # Get the journal of changes made since the last tick as a list of (stat id, old value, new value)
+    # Stats that have changed and then changed back again are left out
+    # N.B. lazy stats only appear in the journal once they have been read and recalculated or the engine has ticked
+    def get_journal(self):
+
+        if self._journal is None:
+            return []
+
+        self.flush()
+
+        return [(stat_id, old_value, new_value) for stat_id, (old_value, new_value) in self._journal.items()
+                if old_value != new_value]
+
+    # Is the work done by each stat being profiled?
+    @property
+    def profiling_enabled(self):
+        return self._profiler is not None
+
+    # Switch profiling on or off - switching it off throws away the profile collected so far
+    @profiling_enabled.setter
+    def profiling_enabled(self, is_enabled: bool):
+        if is_enabled is True and self._profiler is None:
+            self._profiler = StatProfiler(self.name)
+        elif is_enabled is False:
+            self._profiler = None
+
+    # Get the profiler for this container or None if profiling is switched off
+    def get_profiler(self):
+        return self._profiler
+
+    # Context manager that wraps a block of stat changes in a transaction e.g.
+    # with engine.transaction():
+    #     engine.update_stat(...)
+    @contextmanager
+    def transaction(self):
+
+        self.begin()
+        depth = self._transaction_depth
+
+        try:
+            yield self
+
+        except Exception:
+            # Only roll back our own transaction if it hasn't been rolled back already
+            if self._transaction_depth >= depth:
+                self.rollback()
+            raise
+
+        self.commit()
+
+    # Make a copy of the container and all of its stats under a new name
+    def clone(self, name: str):
+        return self.clone_many([name])[0]
+
+    # Make a copy of the container and all of its stats for each of the specified names
+    # Each stat gets its own copy of its values but shares the dependency wiring of the original stat
+    # and the listeners and indexes are mapped across to the copies rather than being wired up again.
+    # How to copy each stat is worked out once up front so that making lots of copies is cheap.
+    def clone_many(self, names: list):
+
+        if self._transaction_depth > 0:
+            raise Exception("Can't clone {0} while it has a transaction open.".format(self.name))
+
+        self.flush()
+
+        # Give each stat a position and record its state and wiring in terms of positions
+        stats = list(self._stats.values())
+        positions = {stat: position for position, stat in enumerate(stats)}
+
+        classes = [stat.__class__ for stat in stats]
+        states = [tuple(stat.get_state().items()) for stat in stats]
+        listeners = [[positions[listener] for listener in stat._listeners if listener in positions]
+                     for stat in stats]
+
+        # Dependencies are (name, position, stat) - stats that are not in the container are shared with the copies
+        dependencies = {}
+        for position, stat in enumerate(stats):
+            if stat._baseStatNames is not None:
+                dependencies[position] = ([(base_stat_name, positions.get(base_stat), base_stat)
+                                           for base_stat_name, base_stat in stat._baseStats.items()],
+                                          [(positions.get(base_stat), base_stat)
+                                           for base_stat in stat._dependency_stats])
+
+        dependents = {stat_name: [positions[stat] for stat in dependent_stats if stat in positions]
+                      for stat_name, dependent_stats in self._dependents.items()}
+        stats_by_id = [positions.get(stat) for stat in self._stats_by_id]
+        stats_by_owner = {owner: [positions[stat] for stat in owner_stats.values()]
+                          for owner, owner_stats in self._stats_by_owner.items()}
+        stats_by_category = {category: [positions[stat] for stat in category_stats.values()]
+                             for category, category_stats in self._stats_by_category.items()}
+        expiry_queue = [(expiry_tick, sequence, positions[stat])
+                        for expiry_tick, sequence, stat in self._expiry_queue if stat in positions]
+        ranks = [self.get_topological_ranks()[stat] for stat in stats]
+
+        new_engines = []
+
+        for name in names:
+
+            new_engine = copy(self)
+            new_engine.name = name
+
+            # Make a copy of each stat without calling its constructor
+            new_stats = [stat_class.__new__(stat_class) for stat_class in classes]
+            for new_stat, state in zip(new_stats, states):
+                for attribute_name, attribute_value in state:
+                    setattr(new_stat, attribute_name, attribute_value)
+                new_stat._engine = new_engine
+
+            # Point the copies at each other instead of at the original stats
+            for position, new_stat in enumerate(new_stats):
+                new_stat._listeners = dict.fromkeys(new_stats[listener] for listener in listeners[position])
+
+            for position, (base_stats, dependency_stats) in dependencies.items():
+                new_stat = new_stats[position]
+                new_stat._baseStats = {base_stat_name: base_stat if base_position is None else new_stats[base_position]
+                                       for base_stat_name, base_position, base_stat in base_stats}
+                new_stat._dependency_stats = [base_stat if base_position is None else new_stats[base_position]
+                                              for base_position, base_stat in dependency_stats]
+
+            new_engine._stats = {new_stat.name: new_stat for new_stat in new_stats}
+            new_engine._dirty = set()
+            new_engine._dependents = {stat_name: dict.fromkeys(new_stats[position] for position in dependent_positions)
+                                      for stat_name, dependent_positions in dependents.items()}
+            new_engine._stat_ids = dict(self._stat_ids)
+            new_engine._stat_names = list(self._stat_names)
+            new_engine._journal = None if self._journal is None else {}
+            new_engine._profiler = None if self._profiler is None else StatProfiler(name)
+            new_engine._stats_by_id = [None if position is None else new_stats[position] for position in stats_by_id]
+            new_engine._stats_by_owner = {owner: {new_stats[position].name: new_stats[position]
+                                                  for position in owner_positions}
+                                          for owner, owner_positions in stats_by_owner.items()}
+            new_engine._stats_by_category = {category: {new_stats[position].name: new_stats[position]
+                                                        for position in category_positions}
+                                             for category, category_positions in stats_by_category.items()}
+            new_engine._expiry_queue = [(expiry_tick, sequence, new_stats[position])
+                                        for expiry_tick, sequence, position in expiry_queue]
+            heapq.heapify(new_engine._expiry_queue)
+            new_engine._transaction_levels = []
+            new_engine._topological_ranks = dict(zip(new_stats, ranks))
+
+            new_engines.append(new_engine)
+
+        return new_engines
+
+    # Propagate all pending stat changes to their listeners
+    # Each affected derived stat is recalculated at most once and in dependency order
+    def flush(self):
+
+        # Changes made in a transaction wait until the transaction is committed
+        if self._transaction_depth > 0:
+            return
+
+        self._propagate()
+
+    # Recalculate the listeners of all dirty stats plus any specified stale stats in topological order
+    # Optionally raise any calculation errors and record a snapshot of each stat before it is changed
+    def _propagate(self, raise_errors: bool = False, snapshots: dict = None, stale_stats: set = None):
+
+        if len(self._dirty) == 0 and not stale_stats:
+            return
+
+        ranks = self.get_topological_ranks()
+
+        changed_stats = self._dirty
+        self._dirty = set()
+
+        logging.debug("%s.flush(): Propagating changes to %i stats in %s.", __class__, len(changed_stats), self.name)
+
+        # Queue up the listeners of the changed stats in topological order
+        queued = set()
+        pending = []
+        profiler = self._profiler
+        for stat in changed_stats:
+            if profiler is not None:
+                profiler.count_notifications(stat, len(stat._listeners))
+            for listener in stat._listeners:
+                if listener not in queued:
+                    queued.add(listener)
+                    heapq.heappush(pending, (ranks[listener], listener))
+
+        if stale_stats is not None:
+            for stat in stale_stats:
+                if stat not in queued:
+                    queued.add(stat)
+                    heapq.heappush(pending, (ranks[stat], stat))
+
+        # Recalculate each queued stat once and if it changed then queue up its listeners too
+        while len(pending) > 0:
+            rank, stat = heapq.heappop(pending)
+
+            # If we might need to roll back then take a copy of the stat before we change it
+            if snapshots is not None and stat not in snapshots:
+                snapshots[stat] = stat.get_state()
+
+            # Lazy stats just get marked as out of date along with their listeners
+            # unless we are passing on errors in which case they need calculating now to find any errors
+            if stat._is_lazy is True and raise_errors is False:
+                stat._is_dirty = True
+                is_changed = True
+            else:
+                stat._is_dirty = False
+                is_changed = stat.recalculate(raise_errors)
+
+            if is_changed is True:
+                if profiler is not None:
+                    profiler.count_notifications(stat, len(stat._listeners))
+                for listener in stat._listeners:
+                    if listener not in queued:
+                        queued.add(listener)
+                        heapq.heappush(pending, (ranks[listener], listener))
+
+    # Get the topological rank of every stat in the dependency graph keyed by stat
+    # A stat always has a higher rank than all of the stats that it depends on
+    def get_topological_ranks(self):
+
+        if self._topological_ranks is not None:
+            return self._topological_ranks
+
+        # Count how many stats each stat is listening to
+        in_degree = {}
+        for stat in self._stats.values():
+            in_degree.setdefault(stat, 0)
+            for listener in stat._listeners:
+                in_degree[listener] = in_degree.get(listener, 0) + 1
+
+        # Start with the stats that are not listening to anything and work our way through the listeners
+        ranks = {}
+        ready = deque([stat for stat, degree in in_degree.items() if degree == 0])
+        while len(ready) > 0:
+            stat = ready.popleft()
+            ranks[stat] = len(ranks)
+            for listener in stat._listeners:
+                in_degree[listener] -= 1
+                if in_degree[listener] == 0:
+                    ready.append(listener)
+
+        # Anything left over is part of a cycle so just rank it after everything else
+        if len(ranks) < len(in_degree):
+            logging.warning("%s.get_topological_ranks(): Found a dependency cycle in %s.", __class__, self.name)
+            for stat in in_degree.keys():
+                if stat not in ranks:
+                    ranks[stat] = len(ranks)
+
+        self._topological_ranks = ranks
+
+        return ranks
+
+    # Get the names of the dependencies that are missing for each derived stat in the container keyed by stat name
+    def get_missing_dependencies(self):
+
+        missing = {}
+        for stat in self._stats.values():
+            if stat._baseStatNames is not None and stat.is_ready() is False:
+                missing[stat.name] = stat.get_missing_dependencies()
+
+        return missing
+
     # Get a named stat from the container
     def get_stat(self, stat_name: str):
+        self.flush()
         if stat_name not in self._stats.keys():
             logging.info("%s.get_stat(): Couldn't find stat %s in the container.", __class__, stat_name)
             return None
         else:
             return self._stats[stat_name]
 
+    # Get the ID for a stat name adding it to the symbol table if it is not already there
+    # IDs are never reused so they stay valid even if the stat is removed or replaced
+    def get_stat_id(self, stat_name: str):
+
+        stat_id = self._stat_ids.get(stat_name)
+
+        if stat_id is None:
+            stat_id = len(self._stats_by_id)
+            self._stat_ids[stat_name] = stat_id
+            self._stat_names.append(stat_name)
+            self._stats_by_id.append(None)
+
+        return stat_id
+
+    # Get the stat name that has the specified ID
+    def get_stat_name(self, stat_id: int):
+        return self._stat_names[stat_id]
+
+    # Get the stat with the specified ID or None if there isn't one in the container
+    def get_stat_by_id(self, stat_id: int):
+        self.flush()
+        return self._stats_by_id[stat_id]
+
+    # Update the stat with the specified ID
+    def update_stat_by_id(self, stat_id: int, new_value: float):
+
+        stat = self._stats_by_id[stat_id]
+        if stat is not None:
+            stat.set_value(new_value)
+        else:
+            logging.warning("%s.update_stat_by_id(): Couldn't find stat %i in the container", __class__, stat_id)
+
+    #
+    # Bind the stat in the container with the same name as a shared stat to that shared stat
+    # The stat gets replaced by a BoundStat that reads the shared stat so nothing needs copying when it changes.
+    # Binding a stat that is already bound just points it at the new shared stat.
+    #
+    def bind_shared_stat(self, shared_stat: CoreStat):
+
+        stat = self._stats.get(shared_stat.name)
+        if stat is None:
+            logging.warning("%s.bind_shared_stat(): Couldn't find stat %s in the container", __class__,
+                            shared_stat.name)
+            return
+
+        if isinstance(stat, BoundStat) is True:
+            stat._shared_stat = shared_stat
+            return
+
+        if stat._baseStatNames is not None:
+            raise Exception("Can't bind derived stat {0} to a shared stat.".format(stat.name))
+
+        bound_stat = BoundStat(stat.name, stat.category, stat._value, shared_stat, stat.description, stat.owner,
+                               stat.lifetime)
+        bound_stat._old_value = stat._old_value
+        bound_stat.update_tick = stat.update_tick
+        self.add_stat(bound_stat)
+
     # Update a named stat in the container
     def update_stat(self, stat_name: str, new_value: float):
         # Look to see if the specified stat exists in the local dictionary and update if it is found
@@ -398,21 +1355,16 @@ class StatEngine:
 
     # Get all of the stats for a specified category
     def get_stats_by_category(self, category_name: str):
-        stats = set()
-        for stat in self._stats.values():
-            if stat.category == category_name:
-                stats.add(stat)
-        return stats
+        self.flush()
+        return set(self._stats_by_category.get(category_name, {}).values())
 
     def get_all_stats(self):
+        self.flush()
         return list(self._stats.values())
 
     # Get a list of all of the stat categories currently in the container
     def get_category_names(self):
-        categories = set()
-        for stat in self._stats.values():
-            categories.add(stat.category)
-        return categories
+        return set(self._stats_by_category.keys())
 
     # Get a list of all of the stat names currently in the container
     def get_stat_names(self):
@@ -421,51 +1373,79 @@ class StatEngine:
     # Create a new dictionary
     def remove_all(self):
         self._stats = {}
+        self._dirty = set()
+        self._topological_ranks = None
+        self._dependents = {}
+        self._stats_by_owner = {}
+        self._stats_by_category = {}
+        self._expiry_queue = []
+        self._stats_by_id = [None] * len(self._stats_by_id)
+
+    # Break the links between the stats in the container so that they get freed as soon as they are no longer used
+    # rather than waiting for the garbage collector to find them.  The container is empty afterwards.
+    def release(self):
+
+        for stat in self._stats.values():
+            stat._listeners = {}
+            stat._engine = None
+            if stat._baseStatNames is not None:
+                stat._baseStats = {}
+                stat._dependency_stats = []
+
+        self.remove_all()
 
     # Remove all stats that are owned by a specified owner
     def remove_stats_by_owner(self, owner: int):
 
         logging.debug("%s.remove_stats_by_owner(): Going to remove stats owned by %s.", __class__, str(owner))
 
-        stat_names_to_delete = set()
-        for stat in self._stats.values():
-            if stat.owner == owner:
-                stat_names_to_delete.add(stat.name)
+        stats_to_delete = list(self._stats_by_owner.get(owner, {}).values())
 
-        logging.debug("%s.remove_stats_by_owner(): About to remove %s.", __class__, str(stat_names_to_delete))
+        logging.debug("%s.remove_stats_by_owner(): About to remove %i stats.", __class__, len(stats_to_delete))
 
-        for stat_name in stat_names_to_delete:
-            stat = self._stats[stat_name]
-            stat.remove_all_listeners()
-            del self._stats[stat_name]
+        for stat in stats_to_delete:
+            self._remove_stat(stat)
 
     #
-    # Do a tick on all stats in the container and remove any dead ones
+    # Do a tick on the container and remove any stats that have come to the end of their life
+    # Only time limited stats are tracked so evergreen stats cost nothing here
+    # Several ticks can be done in one go if the container is being fast forwarded
     #
-    def tick(self):
+    def tick(self, ticks: int = 1):
 
-        logging.debug("%s.tick(): Doing a tick on all stats in %s.", __class__, self.name)
+        # Changes made since the last tick belong in its journal so propagate them before the journal is started again
+        # Lazy stats don't get recalculated by a flush so any that are out of date have to be read too
+        if self._journal is not None:
+            self.flush()
+            for stat in self._stats.values():
+                if isinstance(stat, DerivedStat) is True and stat._is_dirty is True:
+                    stat.value
 
-        # Set to collect the names of dead stats
-        dead_stat_names = set()
+        self._tick_number += ticks
 
-        # Loop through all stats doing a tick and recording dead ones
-        for stat in self._stats.values():
+        # Start a new journal for the new tick
+        if self._journal is not None:
+            self._journal = {}
+
+        if self._profiler is not None:
+            self._profiler.ticks += ticks
 
-            life_left = stat.tick
+        # Pop all of the stats from the expiry queue that are due to expire on or before this tick
+        dead_stats = []
+        while len(self._expiry_queue) > 0 and self._expiry_queue[0][0] <= self._tick_number:
+            expiry_tick, sequence, stat = heapq.heappop(self._expiry_queue)
 
-            # If a stat is dead then remove it
-            if life_left == BaseStat.DEAD:
-                dead_stat_names.add(stat.name)
+            # Ignore stats that have since been removed or replaced
+            if self._stats.get(stat.name) is stat:
+                dead_stats.append(stat)
 
-        if len(dead_stat_names) > 0:
-            logging.debug("%s.tick(): Removing dead stats %s", __class__, str(dead_stat_names))
+        if len(dead_stats) > 0:
+            logging.debug("%s.tick(): Removing %i dead stats from %s", __class__, len(dead_stats), self.name)
 
         # Go through the collection of dead stats and remove them from the container
-        for stat_name in dead_stat_names:
-            stat = self._stats[stat_name]
-            stat.remove_all_listeners()
-            del self._stats[stat.name]
+        for stat in dead_stats:
+            stat._lifetime = BaseStat.DEAD
+            self._remove_stat(stat)
 
     #
     # Print out the contents of the container
@@ -474,31 +1454,18 @@ class StatEngine:
 
         output_width = 70
 
-        print((" " + self.name + " ").center(output_width, "-"))
-
-        # Create an empty dictionary that will hold the stats keyed by category
-        stats_by_category = {}
-
-        # Loop through all of the stats in the container...
-        for stat in self._stats.values():
-
-            # Get the category of the stat...
-            category = stat.category
+        self.flush()
 
-            # If there is not already an entry in the dictionary then add one with an empty list
-            if category not in stats_by_category.keys():
-                stats_by_category[category] = []
+        print((" " + self.name + " ").center(output_width, "-"))
 
-            # Add the stat to the appropriate category stat list
-            stats_by_category[category].append(stat)
+        # Use the category index to get the stats keyed by category
+        stats_by_category = self._stats_by_category
 
         # Now loop through the categories in alphabetical order...
         for key in sorted(stats_by_category.keys()):
             # Print the category and the stats that belong to it
             print((" " + key + " (" + str(len(stats_by_category[key])) + ") ").center(output_width, "-"))
-            stats = {}
-            for stat in stats_by_category[key]:
-                stats[stat.name] = stat
+            stats = stats_by_category[key]
 
             for stat_name in sorted(stats.keys()):
                 stat = stats[stat_name]
@@ -506,6 +1473,118 @@ class StatEngine:
 
 
 
+class StatProfiler(object):
+    '''
+    Counts how many times each stat is updated, calculated and notifies its listeners
+    and how long its calculate() method takes
+    '''
+
+    # The position of each counter in the list of counters kept for each stat
+    UPDATES = 0
+    CALCULATIONS = 1
+    NOTIFICATIONS = 2
+    CALCULATE_TIME = 3
+
+    TABLE_COLUMNS = ("Stat", "Updates", "Calculations", "Notifications", "Calculate ms",
+                     "Updates/tick", "Calculations/tick", "Notifications/tick", "Calculate us/tick")
+
+    def __init__(self, name: str):
+        self.name = name
+
+        # How many ticks the profile covers
+        self.ticks = 0
+
+        # The counters for each stat keyed by stat name
+        self._counters = {}
+
+    # Get the counters for a stat creating them if this is the first time that we have seen it
+    def _get_counters(self, stat_name: str):
+
+        counters = self._counters.get(stat_name)
+
+        if counters is None:
+            counters = [0, 0, 0, 0]
+            self._counters[stat_name] = counters
+
+        return counters
+
+    def count_update(self, stat):
+        self._get_counters(stat.name)[StatProfiler.UPDATES] += 1
+
+    def count_notifications(self, stat, count: int):
+        self._get_counters(stat.name)[StatProfiler.NOTIFICATIONS] += count
+
+    # Calculate the value of a derived stat and record how long it took
+    def time_calculate(self, stat):
+
+        start_time = time.perf_counter_ns()
+
+        try:
+            return stat.calculate()
+
+        finally:
+            counters = self._get_counters(stat.name)
+            counters[StatProfiler.CALCULATIONS] += 1
+            counters[StatProfiler.CALCULATE_TIME] += time.perf_counter_ns() - start_time
+
+    # Add the counters from another profiler to this one
+    # Profiles of engines that tick together cover the same ticks so the tick count is not added up
+    def merge(self, other):
+
+        for stat_name, other_counters in other._counters.items():
+            counters = self._get_counters(stat_name)
+            for i in range(len(counters)):
+                counters[i] += other_counters[i]
+
+        self.ticks = max(self.ticks, other.ticks)
+
+    def reset(self):
+        self.ticks = 0
+        self._counters = {}
+
+    # Get the profile as a list of rows with one dictionary per stat keyed by the table column names
+    # The rows are sorted with the stats that have taken the longest to calculate first
+    def get_table(self):
+
+        ticks = max(self.ticks, 1)
+
+        rows = []
+        for stat_name, counters in sorted(self._counters.items(),
+                                          key=lambda item: (-item[1][StatProfiler.CALCULATE_TIME], item[0])):
+            values = (stat_name,
+                      counters[StatProfiler.UPDATES],
+                      counters[StatProfiler.CALCULATIONS],
+                      counters[StatProfiler.NOTIFICATIONS],
+                      counters[StatProfiler.CALCULATE_TIME] / 1000000,
+                      counters[StatProfiler.UPDATES] / ticks,
+                      counters[StatProfiler.CALCULATIONS] / ticks,
+                      counters[StatProfiler.NOTIFICATIONS] / ticks,
+                      counters[StatProfiler.CALCULATE_TIME] / 1000 / ticks)
+            rows.append(dict(zip(StatProfiler.TABLE_COLUMNS, values)))
+
+        return rows
+
+    #
+    # Print out the profile as a table
+    #
+    def print(self):
+
+        output_width = 110
+
+        print((" " + self.name + " profile over " + str(self.ticks) + " ticks ").center(output_width, "-"))
+        print("{0:<24}{1:>10}{2:>14}{3:>15}{4:>14}{5:>14}{6:>19}".format("Stat", "Updates", "Calculations",
+                                                                         "Notifications", "Calculate ms",
+                                                                         "Calcs/tick", "Calculate us/tick"))
+        for row in self.get_table():
+            print("{0:<24}{1:>10}{2:>14}{3:>15}{4:>14.3f}{5:>14.2f}{6:>19.2f}".format(row["Stat"],
+                                                                                    row["Updates"],
+                                                                                    row["Calculations"],
+                                                                                    row["Notifications"],
+                                                                                    row["Calculate ms"],
+                                                                                    row["Calculations/tick"],
+                                                                                    row["Calculate us/tick"]))
+
+
 class CSVStatFactory(object):
     '''
     Factory class for loading in all of the stats associated with a class
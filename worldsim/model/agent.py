@@ -1,66 +1,131 @@
 from .agent_stats import *
+import logging
+from copy import copy
 
 class Agent:
 
-    def __init__(self, name : str, type : str):
+    def __init__(self, name : str, type : str, propagation_mode : str = StatEngine.PROPAGATE_IMMEDIATE):
         self.name = name
         self.type = type
         self._state = AgentStats.STATE_AWAKE
         self._tick_count = 0
-        self._stats = AgentStats(name)
+        self._stats = AgentStats(name, propagation_mode)
 
         self._stats.initialise()
 
+        # IDs of the input stats that get updated every tick so that they don't need to be looked up by name
+        self._state_id = self._stats.get_stat_id(AgentStats.INPUT_CURRENT_STATE)
+        self._tick_count_id = self._stats.get_stat_id(AgentStats.INPUT_TICK_COUNT)
+
     def tick(self):
-        self._tick_count += 1
-        self._stats.update_stat(AgentStats.INPUT_CURRENT_STATE, self._state)
-        self._stats.update_stat(AgentStats.INPUT_TICK_COUNT, self._tick_count)
+        self.tick_inputs()
         self._state = self._stats.get_stat(NextState.NAME).value
 
+    # Move the tick count on and update the tick inputs without reading back the next state
+    def tick_inputs(self):
+        self.start_tick()
+        self.update_tick_inputs()
+
+    # Move the agent and its stat engine on to the next tick
+    # N.B. ticking the stat engine expires stats which can't be rolled back so this must not be done in a transaction
+    def start_tick(self):
+        self._tick_count += 1
+        self._stats.tick()
+
+    # Update the state and tick count inputs for the tick that the agent is on
+    def update_tick_inputs(self):
+        self._stats.update_stat_by_id(self._state_id, self._state)
+        self._stats.update_stat_by_id(self._tick_count_id, self._tick_count)
+
+    # Bind the agent's input stats to world input stats that are shared by all of the agents in a world
+    # The agent's stats read the latest values of the world inputs whenever they are calculated
+    def bind_world_inputs(self, world_inputs : list):
+        for world_input in world_inputs:
+            self._stats.bind_shared_stat(world_input)
+
     def update_stat(self, stat : BaseStat):
         self._stats.update_stat(stat.name, stat.value)
 
+    # Update several stats as a single change so that they are only propagated once
+    def update_stats(self, stat_list : list):
+        with self._stats.transaction():
+            for stat in stat_list:
+                self._stats.update_stat(stat.name, stat.value)
+
     def add_stats(self, stat_list: list, overwrite: bool = True):
         # Load in stats from a provided list
         # Default is to overwrite what is there already with option to increment
+        self._stats.load_stats(stat_list, overwrite)
 
-        if stat_list is None:
-            return
-
-        for stat in stat_list:
-            # If we are overwriting or the stat does not exist then add the stat
-            if overwrite is True or self._stats.get_stat(stat.name) is None:
-                self._stats.add_stat(stat)
-            # Else increment the existing stat
-            else:
-                self._stats.increment_stat(stat.name, stat.value)
+    # Make a new agent with a copy of this agent's current state and stats
+    def clone(self, name : str):
+        new_agent = copy(self)
+        new_agent.name = name
+        new_agent._stats = self._stats.clone(name)
+        return new_agent
 
     def eat(self, food_amount : int = 1):
 
-        self._stats.update_stat(AgentStats.INPUT_FOOD_CONSUMED, food_amount)
-        self._stats.update_stat(AgentStats.INPUT_ENERGY_GAINED, int(food_amount / 3))
-        self.tick()
-        self._stats.update_stat(AgentStats.INPUT_FOOD_CONSUMED, 0)
-        self._stats.update_stat(AgentStats.INPUT_ENERGY_GAINED, 0)
+        # Only the changes to the inputs are part of the transaction as the tick itself can't be rolled back
+        self.start_tick()
+
+        with self._stats.transaction():
+            self.update_tick_inputs()
+            self._stats.update_stat(AgentStats.INPUT_FOOD_CONSUMED, food_amount)
+            self._stats.update_stat(AgentStats.INPUT_ENERGY_GAINED, int(food_amount / 3))
+
+        self._state = self._stats.get_stat(NextState.NAME).value
+
+        with self._stats.transaction():
+            self._stats.update_stat(AgentStats.INPUT_FOOD_CONSUMED, 0)
+            self._stats.update_stat(AgentStats.INPUT_ENERGY_GAINED, 0)
 
     def drink(self, fluid_amount : int = 1):
 
-        self._stats.update_stat(AgentStats.INPUT_FLUID_CONSUMED, fluid_amount)
-        self._stats.update_stat(AgentStats.INPUT_ENERGY_GAINED, int(fluid_amount / 3))
-        self.tick()
-        self._stats.update_stat(AgentStats.INPUT_FLUID_CONSUMED, 0)
-        self._stats.update_stat(AgentStats.INPUT_ENERGY_GAINED, 0)
+        # Only the changes to the inputs are part of the transaction as the tick itself can't be rolled back
+        self.start_tick()
+
+        with self._stats.transaction():
+            self.update_tick_inputs()
+            self._stats.update_stat(AgentStats.INPUT_FLUID_CONSUMED, fluid_amount)
+            self._stats.update_stat(AgentStats.INPUT_ENERGY_GAINED, int(fluid_amount / 3))
+
+        self._state = self._stats.get_stat(NextState.NAME).value
 
+        with self._stats.transaction():
+            self._stats.update_stat(AgentStats.INPUT_FLUID_CONSUMED, 0)
+            self._stats.update_stat(AgentStats.INPUT_ENERGY_GAINED, 0)
+
+    # Put the agent to sleep for a number of ticks with the world inputs staying as they are
+    # Whenever the agent is asleep or dead with nothing else happening to it the ticks are done in one jump
+    # in the same way as a dormant agent in a world.  The ticks around any change of state are done one at a time.
     def sleep(self, ticks : int = 1, awaken : bool = True):
 
-        print("Sleeping for {0} ticks...".format(ticks))
+        # The scheduler module imports this module
+        from .scheduler import DormantAgent
+
+        logging.info("%s.sleep(): %s sleeping for %i ticks", __class__, self.name, ticks)
 
         # Set state to be asleep
         self._state = AgentStats.STATE_ASLEEP
 
         # Perform the number of specified ticks
-        for i in range(0, ticks):
-            self.tick()
+        while ticks > 0:
+
+            ticks_done = 0
+
+            if DormantAgent.is_idle(self) is True and DormantAgent.is_supported(self) is True:
+                dormant_agent = DormantAgent(self)
+                ticks_done = dormant_agent.run(None, 0, ticks)
+                if ticks_done > 0:
+                    dormant_agent.write(self)
+
+            # The next tick changes the agent's state or it can't be done in a jump
+            if ticks_done == 0:
+                self.tick()
+                ticks_done = 1
+
+            ticks -= ticks_done
 
         # Awaken after the sleep is flag is set
         if awaken is True:
@@ -80,4 +145,37 @@ class Agent:
             if stat is not None:
                 _str += "\n\t{0}={1}".format(stat_name, stat.value)
 
-        return _str
\ No newline at end of file
+        return _str
+
+class AgentPrototype:
+    '''
+    A fully wired and checked set of stats for a type of agent that new agents of that type are cloned from
+    '''
+
+    def __init__(self, type : str, stat_list : list, propagation_mode : str = StatEngine.PROPAGATE_IMMEDIATE):
+        self.type = type
+        self._agent = Agent(type, type, propagation_mode)
+        self._agent.add_stats(stat_list)
+
+        # Check the stats once here rather than every time that an agent is created
+        missing = self._agent._stats.get_missing_dependencies()
+        for stat_name, missing_stats in missing.items():
+            logging.warning("%s.__init__(): Stat %s for agent type %s is missing dependencies %s",
+                            __class__, stat_name, type, str(missing_stats))
+
+    # Create a new agent of this type
+    def create_agent(self, name : str):
+        return self.create_agents([name])[0]
+
+    # Create a new agent of this type for each of the specified names
+    def create_agents(self, names : list):
+
+        new_agents = []
+
+        for name, new_stats in zip(names, self._agent._stats.clone_many(names)):
+            new_agent = copy(self._agent)
+            new_agent.name = name
+            new_agent._stats = new_stats
+            new_agents.append(new_agent)
+
+        return new_agents
@@ -3,14 +3,18 @@ from .StatEngine import *
 
 class TickingStat(DerivedStat):
 
+    # Ticking stats change once per tick so they always need to be calculated when the tick count changes
+    IS_STATEFUL = True
+    __slots__ = ("_last_tick", "_tick_slot")
+
     def __init__(self, name : str, category : str):
         super(TickingStat, self).__init__(name, category)
 
-        self.add_dependency(AgentStats.INPUT_TICK_COUNT)
+        self._tick_slot = self.add_dependency(AgentStats.INPUT_TICK_COUNT)
         self._last_tick = -999
 
     def calculate(self):
-        new_tick = self.get_dependency_value(AgentStats.INPUT_TICK_COUNT)
+        new_tick = self.get_slot_value(self._tick_slot)
         if self._last_tick < new_tick:
             self._last_tick = new_tick
             return self.tick_calculate()
@@ -22,6 +26,7 @@ class TickingStat(DerivedStat):
         raise Exception("need to override TickStat class method tick_calculate()!")
 
 class AttributePercent(DerivedStat):
+    __slots__ = ("attribute_name", "_attribute_slot", "_max_slot")
 
     def __init__(self, attribute_name : str):
 
@@ -29,52 +34,68 @@ class AttributePercent(DerivedStat):
 
         super(AttributePercent, self).__init__("{0} Percent".format(attribute_name), "AGENT")
 
-        self.add_dependency(attribute_name)
-        self.add_dependency("Maximum {0}".format(attribute_name))
+        self._attribute_slot = self.add_dependency(attribute_name)
+        self._max_slot = self.add_dependency("Maximum {0}".format(attribute_name))
 
     def calculate(self):
 
-        attribute = self.get_dependency_value(self.attribute_name)
-        attribute_max = self.get_dependency_value("Maximum {0}".format(self.attribute_name))
+        attribute = self.get_slot_value(self._attribute_slot)
+        attribute_max = self.get_slot_value(self._max_slot)
+
+        return AttributePercent.get_percent(attribute, attribute_max)
 
+    @staticmethod
+    def get_percent(attribute: float, attribute_max: float):
         return attribute * 100/attribute_max
 
-class Age(DerivedStat):
+class Age(TickingStat):
     NAME = "Age"
+    __slots__ = ("_age",)
 
     def __init__(self):
         super(Age, self).__init__(Age.NAME, "AGENT")
 
-        self.add_dependency(AgentStats.INPUT_TICK_COUNT)
         self._age = 0
 
-    def calculate(self):
-        self._age += 1
+    def tick_calculate(self):
+        self._age = Age.get_age(self._age)
 
         return self._age
 
+    @staticmethod
+    def get_age(age: int):
+        return age + 1
+
 class Temperature(TickingStat):
     NAME = "Temperature"
     TEMP_DELTA_RATE = 0.2
     MINIMUM_TEMP_DELTA = 1.0
+    __slots__ = ("_temperature", "_ambient_slot")
 
     def __init__(self):
         super(Temperature, self).__init__(Temperature.NAME, "AGENT")
 
-        self.add_dependency(AgentStats.INPUT_AMBIENT_TEMPERATURE)
+        self._ambient_slot = self.add_dependency(AgentStats.INPUT_AMBIENT_TEMPERATURE)
         self._temperature = -999
 
     def tick_calculate(self):
 
-        ambient_temp = self.get_dependency_value(AgentStats.INPUT_AMBIENT_TEMPERATURE)
+        ambient_temp = self.get_slot_value(self._ambient_slot)
+
+        self._temperature = Temperature.get_temperature(self._temperature, ambient_temp)
+
+        return self._temperature
+
+    @staticmethod
+    def get_temperature(temperature: float, ambient_temp: float):
 
-        if self._temperature == -999:
-            self._temperature = ambient_temp
+        if temperature == -999:
+            temperature = ambient_temp
 
         else:
 
             # Find difference between agent temperature and the ambient temperature
-            temp_diff = abs(self._temperature - ambient_temp)
+            temp_diff = abs(temperature - ambient_temp)
 
             # Calculate how much the agent's temperature will change by
             temp_delta = temp_diff * Temperature.TEMP_DELTA_RATE
@@ -86,32 +107,40 @@ class Temperature(TickingStat):
                 temp_delta = min(Temperature.MINIMUM_TEMP_DELTA, temp_diff)
 
             # Adjust the agent temperature by the calculated amount to get closer to the ambient temperature
-            if self._temperature < ambient_temp:
-                self._temperature += temp_delta
+            if temperature < ambient_temp:
+                temperature += temp_delta
             else:
-                self._temperature -= temp_delta
+                temperature -= temp_delta
 
-        return self._temperature
+        return temperature
 
 
 class Sleepiness(TickingStat):
     NAME = "Sleepiness"
     MIN_SLEEPINESS = 0
     ENERGY_LEVEL_THRESHOLD = 20
+    __slots__ = ("_sleepiness", "_state_slot", "_max_slot", "_energy_slot")
 
     def __init__(self):
         super(Sleepiness, self).__init__(Sleepiness.NAME, "AGENT")
 
-        self.add_dependency(AgentStats.INPUT_CURRENT_STATE)
-        self.add_dependency("Maximum {0}".format(self.name))
-        self.add_dependency(Energy.NAME)
+        self._state_slot = self.add_dependency(AgentStats.INPUT_CURRENT_STATE)
+        self._max_slot = self.add_dependency("Maximum {0}".format(self.name))
+        self._energy_slot = self.add_dependency(Energy.NAME)
         self._sleepiness = 0
 
     def tick_calculate(self):
 
-        max_value = self.get_dependency_value("Maximum {0}".format(self.name))
-        state = self.get_dependency_value(AgentStats.INPUT_CURRENT_STATE)
-        energy = self.get_dependency_value(Energy.NAME)
+        max_value = self.get_slot_value(self._max_slot)
+        state = self.get_slot_value(self._state_slot)
+        energy = self.get_slot_value(self._energy_slot)
+
+        self._sleepiness = Sleepiness.get_sleepiness(self._sleepiness, state, energy, max_value)
+
+        return self._sleepiness
+
+    @staticmethod
+    def get_sleepiness(sleepiness: float, state: int, energy: float, max_value: float):
 
         # If we are asleep then sleepiness decreases
         if state == AgentStats.STATE_ASLEEP:
@@ -123,61 +152,71 @@ class Sleepiness(TickingStat):
             else:
                 sleep_delta = 1
 
-        self._sleepiness += sleep_delta
+        sleepiness += sleep_delta
 
         # Cap and floor sleepiness
-        self._sleepiness = max(Sleepiness.MIN_SLEEPINESS, min(self._sleepiness , max_value))
-
-        return self._sleepiness
+        return max(Sleepiness.MIN_SLEEPINESS, min(sleepiness , max_value))
 
 
 class Hunger(TickingStat):
     NAME = "Hunger"
     MAX_HUNGER = 100
     MIN_HUNGER = 0
+    __slots__ = ("_hunger", "_max_slot", "_food_slot")
 
     def __init__(self):
         super(Hunger, self).__init__(Hunger.NAME, "AGENT")
 
-        self.add_dependency("Maximum {0}".format(self.name))
-        self.add_dependency(AgentStats.INPUT_FOOD_CONSUMED)
+        self._max_slot = self.add_dependency("Maximum {0}".format(self.name))
+        self._food_slot = self.add_dependency(AgentStats.INPUT_FOOD_CONSUMED)
         self._hunger = 0
 
     def tick_calculate(self):
 
-        max_value = self.get_dependency_value("Maximum {0}".format(self.name))
-        food = self.get_dependency_value(AgentStats.INPUT_FOOD_CONSUMED)
+        max_value = self.get_slot_value(self._max_slot)
+        food = self.get_slot_value(self._food_slot)
 
-        if food == 0 and self._hunger < max_value:
-            self._hunger += 1
-        else:
-            self._hunger = max(Hunger.MIN_HUNGER, self._hunger - food)
+        self._hunger = Hunger.get_hunger(self._hunger, food, max_value)
 
         return self._hunger
 
+    @staticmethod
+    def get_hunger(hunger: int, food: int, max_value: int):
+
+        if food == 0 and hunger < max_value:
+            return hunger + 1
+        else:
+            return max(Hunger.MIN_HUNGER, hunger - food)
+
 class Thirst(TickingStat):
     NAME = "Thirst"
     MIN_THIRST = 0
+    __slots__ = ("_thirst", "_max_slot", "_fluid_slot")
 
     def __init__(self):
         super(Thirst, self).__init__(Thirst.NAME, "AGENT")
 
-        self.add_dependency("Maximum {0}".format(self.name))
-        self.add_dependency(AgentStats.INPUT_FLUID_CONSUMED)
+        self._max_slot = self.add_dependency("Maximum {0}".format(self.name))
+        self._fluid_slot = self.add_dependency(AgentStats.INPUT_FLUID_CONSUMED)
         self._thirst = 0
 
     def tick_calculate(self):
 
-        max_value = self.get_dependency_value("Maximum {0}".format(self.name))
-        fluid = self.get_dependency_value(AgentStats.INPUT_FLUID_CONSUMED)
+        max_value = self.get_slot_value(self._max_slot)
+        fluid = self.get_slot_value(self._fluid_slot)
 
-        if fluid == 0 and self._thirst < max_value:
-            self._thirst += 1
-        else:
-            self._thirst = max(Thirst.MIN_THIRST, self._thirst - fluid)
+        self._thirst = Thirst.get_thirst(self._thirst, fluid, max_value)
 
         return self._thirst
 
+    @staticmethod
+    def get_thirst(thirst: int, fluid: int, max_value: int):
+
+        if fluid == 0 and thirst < max_value:
+            return thirst + 1
+        else:
+            return max(Thirst.MIN_THIRST, thirst - fluid)
+
 
 class Energy(TickingStat):
     NAME = "Energy"
@@ -185,21 +224,30 @@ class Energy(TickingStat):
     MIN_ENERGY = 0
     MAX_ENERGY = 200
     SLEEP_ENERGY_REDUCTION_FACTOR = 0.3
+    __slots__ = ("_energy", "_gained_slot", "_state_slot", "_hunger_slot")
 
     def __init__(self):
         super(Energy, self).__init__(Energy.NAME, "AGENT")
 
-        self.add_dependency(AgentStats.INPUT_ENERGY_GAINED)
-        self.add_dependency(AgentStats.INPUT_CURRENT_STATE)
+        self._gained_slot = self.add_dependency(AgentStats.INPUT_ENERGY_GAINED)
+        self._state_slot = self.add_dependency(AgentStats.INPUT_CURRENT_STATE)
         #self.add_dependency(AgentStats.INPUT_MAX_ENERGY)
-        self.add_dependency(Hunger.NAME)
+        self._hunger_slot = self.add_dependency(Hunger.NAME)
         self._energy = Energy.INITIAL_ENERGY
 
-    def calculate(self):
+    def tick_calculate(self):
+
+        state = self.get_slot_value(self._state_slot)
+        energy = self.get_slot_value(self._gained_slot)
+        hunger = self.get_slot_value(self._hunger_slot)
+
+        self._energy = Energy.get_energy(self._energy, energy, state, hunger)
+
+        return self._energy
+
+    @staticmethod
+    def get_energy(energy: float, energy_gained: float, state: int, hunger: int):
 
-        state = self.get_dependency_value(AgentStats.INPUT_CURRENT_STATE)
-        energy = self.get_dependency_value(AgentStats.INPUT_ENERGY_GAINED)
-        hunger = self.get_dependency_value(Hunger.NAME)
         max_energy = Energy.MAX_ENERGY
 
         # The more hungry you are the more energy you consume
@@ -213,32 +261,38 @@ class Energy(TickingStat):
         if state == AgentStats.STATE_ASLEEP:
             energy_delta *= Energy.SLEEP_ENERGY_REDUCTION_FACTOR
 
-        self._energy = max(Energy.MIN_ENERGY, min(self._energy + energy - energy_delta, max_energy))
-
-        return self._energy
+        return max(Energy.MIN_ENERGY, min(energy + energy_gained - energy_delta, max_energy))
 
 
 class ChangeState(TickingStat):
     NAME = "Change State"
+    __slots__ = ("_current_state", "_state_slot")
 
     def __init__(self):
         super(ChangeState, self).__init__(ChangeState.NAME, "AGENT")
 
-        self.add_dependency(AgentStats.INPUT_CURRENT_STATE)
+        self._state_slot = self.add_dependency(AgentStats.INPUT_CURRENT_STATE)
         self.add_dependency(AgentStats.INPUT_TICK_COUNT)
 
         self._current_state = AgentStats.STATE_AWAKE
 
     def tick_calculate(self):
-        current_state = self.get_dependency_value(AgentStats.INPUT_CURRENT_STATE)
+        current_state = self.get_slot_value(self._state_slot)
+
+        is_changed = ChangeState.is_changed(self._current_state, current_state)
+
+        self._current_state = current_state
+
+        return is_changed
+
+    @staticmethod
+    def is_changed(last_state: int, current_state: int):
 
         is_changed = False
 
-        if self._current_state != current_state:
+        if last_state != current_state:
             is_changed = True
-            #print("State changed from {0} to {1}".format(self._current_state, current_state))
-
-        self._current_state = current_state
+            #print("State changed from {0} to {1}".format(last_state, current_state))
 
         return is_changed
 
@@ -251,28 +305,37 @@ class NextState(DerivedStat):
     DEHYDRATION_THRESHOLD = 100
     ENERGY_THRESHOLD = 100
     TEMPERATURE_THRESHOLD = 50
+    __slots__ = ("_state_slot", "_sleepiness_slot", "_energy_slot", "_hunger_slot", "_thirst_slot",
+                 "_temperature_slot", "_age_slot")
 
     def __init__(self):
         super(NextState, self).__init__(NextState.NAME, "AGENT")
 
-        self.add_dependency(AgentStats.INPUT_CURRENT_STATE)
-        self.add_dependency("{0} Percent".format(Sleepiness.NAME))
-        self.add_dependency("{0} Percent".format(Energy.NAME))
-        self.add_dependency("{0} Percent".format(Hunger.NAME))
-        self.add_dependency("{0} Percent".format(Thirst.NAME))
-        self.add_dependency(Temperature.NAME)
-        self.add_dependency("{0} Percent".format(Age.NAME))
+        self._state_slot = self.add_dependency(AgentStats.INPUT_CURRENT_STATE)
+        self._sleepiness_slot = self.add_dependency("{0} Percent".format(Sleepiness.NAME))
+        self._energy_slot = self.add_dependency("{0} Percent".format(Energy.NAME))
+        self._hunger_slot = self.add_dependency("{0} Percent".format(Hunger.NAME))
+        self._thirst_slot = self.add_dependency("{0} Percent".format(Thirst.NAME))
+        self._temperature_slot = self.add_dependency(Temperature.NAME)
+        self._age_slot = self.add_dependency("{0} Percent".format(Age.NAME))
         self.add_dependency("{0} Percent".format(Age.NAME))
 
     def calculate(self):
 
-        current_state = self.get_dependency_value(AgentStats.INPUT_CURRENT_STATE)
-        sleepiness = self.get_dependency_value("{0} Percent".format(Sleepiness.NAME))
-        hunger = self.get_dependency_value("{0} Percent".format(Hunger.NAME))
-        thirst = self.get_dependency_value("{0} Percent".format(Thirst.NAME))
-        energy = self.get_dependency_value("{0} Percent".format(Energy.NAME))
-        temperature = self.get_dependency_value(Temperature.NAME)
-        age = self.get_dependency_value("{0} Percent".format(Age.NAME))
+        current_state = self.get_slot_value(self._state_slot)
+        sleepiness = self.get_slot_value(self._sleepiness_slot)
+        hunger = self.get_slot_value(self._hunger_slot)
+        thirst = self.get_slot_value(self._thirst_slot)
+        energy = self.get_slot_value(self._energy_slot)
+        temperature = self.get_slot_value(self._temperature_slot)
+        age = self.get_slot_value(self._age_slot)
+
+        return NextState.get_next_state(current_state, sleepiness, hunger, thirst, energy, temperature, age)
+
+    @staticmethod
+    def get_next_state(current_state: int, sleepiness: float, hunger: float, thirst: float, energy: float,
+                       temperature: float, age: float):
+
         new_state = current_state
 
         if hunger >= 100 or \
@@ -333,17 +396,15 @@ class AgentStats(StatEngine):
 
     STATE_TO_STATE_NAME = {STATE_ASLEEP: "Asleep", STATE_AWAKE: "Awake", STATE_DEAD: "Dead"}
 
-    def __init__(self, name: str):
-        super(AgentStats, self).__init__(name)
+    def __init__(self, name: str, propagation_mode: str = StatEngine.PROPAGATE_IMMEDIATE):
+        super(AgentStats, self).__init__(name, propagation_mode)
 
     def initialise(self):
 
         # Add the base and input stats
-        for core_stat_name in (AgentStats.CORE_STATS):
-            self.add_stat(CoreStat(core_stat_name, "BASE STATS", 0))
-
-        for core_stat_name in (AgentStats.INPUT_STATS):
-            self.add_stat(CoreStat(core_stat_name, "INPUTS", 0))
+        core_stats = [CoreStat(core_stat_name, "BASE STATS", 0) for core_stat_name in AgentStats.CORE_STATS]
+        core_stats += [CoreStat(core_stat_name, "INPUTS", 0) for core_stat_name in AgentStats.INPUT_STATS]
+        self.add_stats(core_stats)
 
         self.update_stat(AgentStats.INPUT_MAX_ENERGY, 200)
         self.update_stat(AgentStats.INPUT_MAX_AGE, 300)
@@ -351,14 +412,6 @@ class AgentStats(StatEngine):
         self.update_stat(AgentStats.INPUT_CURRENT_STATE, AgentStats.STATE_AWAKE)
 
         # Add derived game stats
-        self.add_stat(Age())
-        self.add_stat(Hunger())
-        self.add_stat(Thirst())
-        self.add_stat(Energy())
-        self.add_stat(Sleepiness())
-        self.add_stat(Temperature())
-        self.add_stat(NextState())
-        self.add_stat(ChangeState())
-
-        for attribute_name in AgentStats.OUTPUT_STATS:
-            self.add_stat(AttributePercent(attribute_name))
\ No newline at end of file
+        derived_stats = [Age(), Hunger(), Thirst(), Energy(), Sleepiness(), Temperature(), NextState(), ChangeState()]
+        derived_stats += [AttributePercent(attribute_name) for attribute_name in AgentStats.OUTPUT_STATS]
+        self.add_stats(derived_stats)
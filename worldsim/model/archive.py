@@ -0,0 +1,129 @@
+'''
+    This module contains the archive of agents that have died and been retired from a world:
+    - RetiredAgent - the final state and stat values of an agent that has been retired
+    - AgentArchive - all of the agents that have been retired from a world keyed by agent name
+
+    A dead agent never does anything again but it still gets ticked and checked for events every tick.  Retiring it
+    takes it out of the world's active agents and keeps just its final stat values.  The agent's stat engine and the
+    listeners that wire its stats together are thrown away.  Agents with the same stats share one tuple of stat names
+    so each retired agent costs little more than a tuple of values.
+'''
+
+import logging
+from .agent import Agent
+from .agent_stats import *
+
+
+class RetiredAgent:
+
+    __slots__ = ("name", "type", "state", "tick_count", "retire_tick", "stat_names", "stat_values")
+
+    def __init__(self, name: str, type: str, state: int, tick_count: int, retire_tick: int,
+                 stat_names: tuple, stat_values: tuple):
+        self.name = name
+        self.type = type
+        self.state = state
+        self.tick_count = tick_count
+
+        # The world tick when the agent was retired
+        self.retire_tick = retire_tick
+
+        self.stat_names = stat_names
+        self.stat_values = stat_values
+
+    # Get the final value of a stat or None if the agent didn't have the stat
+    def get_stat_value(self, stat_name: str):
+        try:
+            return self.stat_values[self.stat_names.index(stat_name)]
+        except ValueError:
+            return None
+
+    # Get the final values of all of the agent's stats keyed by stat name
+    def get_stat_values(self):
+        return dict(zip(self.stat_names, self.stat_values))
+
+    # Describe the agent in the same format as an Agent
+    def __str__(self):
+        _str = "{0} (type:{1} tick:{2} state:{3} retired:{4})".format(self.name,
+                                                                      self.type,
+                                                                      self.tick_count,
+                                                                      AgentStats.STATE_TO_STATE_NAME.get(self.state),
+                                                                      self.retire_tick)
+        for stat_name in AgentStats.OUTPUT_STATS:
+            value = self.get_stat_value(stat_name)
+            if value is not None:
+                _str += "\n\t{0}={1}".format(stat_name, value)
+
+        return _str
+
+
+class AgentArchive:
+    '''
+    The agents that have been retired from a world in the order that they were retired
+    '''
+
+    def __init__(self, name: str):
+        self.name = name
+
+        # The retired agents keyed by agent name
+        self._agents = {}
+
+        # Each different tuple of stat names keyed by itself so that agents with the same stats can share one
+        self._stat_names = {}
+
+    @property
+    def size(self):
+        return len(self._agents)
+
+    # Has the agent's death been announced by its Change State event so that it can be retired?
+    @staticmethod
+    def is_retirable(agent: Agent):
+        change_state = agent._stats._stats.get(ChangeState.NAME)
+        return change_state is not None and change_state._current_state == AgentStats.STATE_DEAD
+
+    # Add an agent to the archive from its state and final stat values
+    def add(self, name: str, type: str, state: int, tick_count: int, retire_tick: int, stat_values: dict):
+
+        stat_names = tuple(stat_values.keys())
+        stat_names = self._stat_names.setdefault(stat_names, stat_names)
+
+        self._agents[name] = RetiredAgent(name, type, state, tick_count, retire_tick,
+                                          stat_names, tuple(stat_values.values()))
+
+    # Add an agent to the archive and release its stat engine
+    # N.B. the agent can't be used after it has been archived
+    def add_agent(self, agent: Agent, retire_tick: int):
+
+        engine = agent._stats
+        engine.flush()
+
+        # Reading the value of a lazy stat brings it up to date
+        self.add(agent.name, agent.type, agent._state, agent._tick_count, retire_tick,
+                 {stat.name: stat.value for stat in engine._stats.values()})
+
+        engine.release()
+
+    # Add a list of agents to the archive
+    def add_agents(self, agents: list, retire_tick: int):
+
+        for agent in agents:
+            self.add_agent(agent, retire_tick)
+
+        logging.info("%s.add_agents(): Retired %i agents to %s at tick %i", __class__,
+                     len(agents), self.name, retire_tick)
+
+    # Get a named retired agent or None if there is no agent with that name in the archive
+    def get_agent(self, name: str):
+        return self._agents.get(name)
+
+    def get_agent_names(self):
+        return list(self._agents.keys())
+
+    # Get the final values of the specified stats for every retired agent keyed by agent name
+    def get_agent_summaries(self, stat_names: list):
+        return {name: {stat_name: agent.get_stat_value(stat_name) for stat_name in stat_names}
+                for name, agent in self._agents.items()}
+
+    def print(self):
+        for agent in self._agents.values():
+            print(str(agent))
@@ -0,0 +1,308 @@
+'''
+    This module saves a whole World to a compact binary checkpoint file and restores it again:
+    - WorldCheckpoint - writes and reads checkpoint files
+
+    A checkpoint holds the world's own stats, the map altitudes, the agent factory, the world's random number
+    streams, the events waiting in the world's EventQueue and the state of every agent.  Agents are saved by type
+    as columns of stat attribute values rather than as object graphs.  On restore each type's agents are cloned
+    from the agent prototype, which already has its listener graph wired up, and then the saved columns are written
+    back into the clones.  A column where every agent has the same value is saved as that one value and only
+    written back if it differs from the prototype.
+
+    Agents whose stats don't match their prototype any more e.g. they have had stats added or have time limited
+    stats pending are saved whole.  The columnar population is saved as its numpy arrays.  Agents that are being
+    ticked in a pool of worker processes are saved from copies and the restored world ticks them in this process.
+'''
+
+import gc
+import logging
+import os
+import pickle
+import struct
+import time
+from operator import attrgetter
+
+import numpy
+
+from .agent import Agent
+from .map import WorldMap
+from .rng import RandomStreams
+from .world import World
+
+
+class WorldCheckpoint:
+
+    # Every checkpoint file starts with the magic bytes and the format version
+    MAGIC = b"WSCK"
+    VERSION = 6
+    HEADER = struct.Struct("<4sH")
+
+    # Stat attributes that wire the stats together rather than hold state
+    # These come from the prototype when an agent is restored so they are never saved
+    WIRING_ATTRIBUTES = frozenset(("_listeners", "_baseStatNames", "_engine", "_baseStats", "_baseStatDefaults",
+                                   "_dependency_slots", "_dependency_names", "_dependency_stats", "_shared_stat"))
+
+    # Stat engine attributes that hold state for each agent
+    ENGINE_ATTRIBUTES = ("_tick_number", "_expiry_sequence")
+
+    # Agent attributes that are not saved as columns
+    AGENT_SKIP_ATTRIBUTES = frozenset(("_stats", "type"))
+
+    # Write a world to a checkpoint file
+    # The file is written alongside and then moved into place so a crash never leaves a half written checkpoint
+    @staticmethod
+    def save(world: World, filename: str):
+
+        start_time = time.perf_counter()
+
+        checkpoint = WorldCheckpoint.get_checkpoint(world)
+
+        temporary_filename = filename + ".tmp"
+        with open(temporary_filename, "wb") as checkpoint_file:
+            checkpoint_file.write(WorldCheckpoint.HEADER.pack(WorldCheckpoint.MAGIC, WorldCheckpoint.VERSION))
+            pickle.dump(checkpoint, checkpoint_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(temporary_filename, filename)
+
+        logging.info("%s.save(): Saved world %s at tick %i to %s in %.3fs", __class__,
+                     world.name, world._tick_count, filename, time.perf_counter() - start_time)
+
+    # Read a world back from a checkpoint file
+    @staticmethod
+    def load(filename: str):
+
+        start_time = time.perf_counter()
+
+        with open(filename, "rb") as checkpoint_file:
+
+            header = checkpoint_file.read(WorldCheckpoint.HEADER.size)
+            if len(header) < WorldCheckpoint.HEADER.size:
+                raise Exception("{0} is not a world checkpoint file.".format(filename))
+
+            magic, version = WorldCheckpoint.HEADER.unpack(header)
+            if magic != WorldCheckpoint.MAGIC:
+                raise Exception("{0} is not a world checkpoint file.".format(filename))
+            if version != WorldCheckpoint.VERSION:
+                raise Exception("Checkpoint {0} is version {1} but only version {2} is supported.".format(
+                    filename, version, WorldCheckpoint.VERSION))
+
+            # Loading lots of long lived objects sets off lots of garbage collections that find nothing
+            is_gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                checkpoint = pickle.load(checkpoint_file)
+                world = WorldCheckpoint.restore_checkpoint(checkpoint)
+            finally:
+                if is_gc_enabled is True:
+                    gc.enable()
+
+        logging.info("%s.load(): Loaded world %s at tick %i from %s in %.3fs", __class__,
+                     world.name, world._tick_count, filename, time.perf_counter() - start_time)
+
+        return world
+
+    # Get everything that needs to be saved for a world as a dictionary of plain values
+    @staticmethod
+    def get_checkpoint(world: World):
+
+        # Make sure that there are no changes waiting to be propagated
+        world._stats.flush()
+
+        world_map = world._map
+
+        checkpoint = {
+            "name": world.name,
+            "state": world._state,
+            "old_state": world._old_state,
+            "tick_count": world._tick_count,
+            "agent_propagation_mode": world._agent_propagation_mode,
+            "spawn_counts": dict(world._spawn_counts),
+            "random": world._random,
+            "stats": world._stats,
+            "agent_factory": world._agent_factory,
+            "population": world._population,
+            "archive": world._archive,
+            "agent_inputs": {stat_name: stat.value for stat_name, stat in world._agent_inputs.items()},
+            "events": list(world._event_queue.events),
+            "map": None if world_map is None else {"name": world_map.name,
+                                                    "width": world_map.width,
+                                                    "height": world_map.height,
+                                                    "altitudes": numpy.array(world_map.topo_model_pass2),
+                                                    "summit": world_map.summit,
+                                                    "abyss": world_map.abyss},
+            "agent_types": [],
+            "whole_agents": [],
+        }
+
+        world_agents = world.get_agents()
+
+        # Group the agents by type keeping the order that they are in within the world
+        agents_by_type = {}
+        for agent in world_agents.values():
+            agents_by_type.setdefault(agent.type, []).append(agent)
+
+        for type, agents in agents_by_type.items():
+
+            prototype = world.get_agent_prototype(type)._agent
+
+            columnar_agents = []
+            for agent in agents:
+                if WorldCheckpoint._matches_prototype(agent, prototype) is True:
+                    columnar_agents.append(agent)
+                else:
+                    checkpoint["whole_agents"].append(agent)
+
+            if len(columnar_agents) > 0:
+                checkpoint["agent_types"].append(WorldCheckpoint._get_agent_columns(type, columnar_agents, prototype))
+
+        # Remember the original order of the agents so that the restored world ticks them in the same order
+        checkpoint["agent_order"] = list(world_agents.keys()) \
+            if len(agents_by_type) > 1 or len(checkpoint["whole_agents"]) > 0 else None
+
+        return checkpoint
+
+    # Can an agent be restored by cloning its prototype and writing its saved columns back in?
+    @staticmethod
+    def _matches_prototype(agent: Agent, prototype: Agent):
+
+        engine = agent._stats
+        prototype_engine = prototype._stats
+
+        if engine._transaction_depth > 0 or len(engine._expiry_queue) > 0:
+            return False
+
+        if engine.propagation_mode != prototype_engine.propagation_mode:
+            return False
+
+        if len(engine._stats) != len(prototype_engine._stats):
+            return False
+
+        for stat, prototype_stat in zip(engine._stats.values(), prototype_engine._stats.values()):
+            if stat.name != prototype_stat.name or stat.__class__ is not prototype_stat.__class__:
+                return False
+
+        return True
+
+    # Turn a list of agents of the same type into columns of values
+    # A column is a single value if all of the agents have the same value or else a list of values in agent order
+    @staticmethod
+    def _get_agent_columns(type: str, agents: list, prototype: Agent):
+
+        for agent in agents:
+            agent._stats.flush()
+
+        def to_column(values: list):
+            first_value = values[0]
+            if values.count(first_value) == len(values):
+                return (first_value,)
+            return values
+
+        agent_attribute_names = [attribute_name for attribute_name in prototype.__dict__.keys()
+                                 if attribute_name not in WorldCheckpoint.AGENT_SKIP_ATTRIBUTES]
+        agent_columns = {attribute_name: to_column(list(map(attrgetter(attribute_name), agents)))
+                         for attribute_name in agent_attribute_names}
+
+        engines = [agent._stats for agent in agents]
+        engine_columns = {attribute_name: to_column(list(map(attrgetter(attribute_name), engines)))
+                          for attribute_name in WorldCheckpoint.ENGINE_ATTRIBUTES}
+
+        # One set of columns per stat in the order that the stats are in the engine
+        stat_columns = []
+        all_stats = [list(engine._stats.values()) for engine in engines]
+        for position, prototype_stat in enumerate(prototype._stats._stats.values()):
+            stats = [engine_stats[position] for engine_stats in all_stats]
+            attribute_names = [attribute_name for attribute_name in prototype_stat.get_slot_names()
+                               if attribute_name not in WorldCheckpoint.WIRING_ATTRIBUTES
+                               and hasattr(prototype_stat, attribute_name)]
+            stat_columns.append({attribute_name: to_column(list(map(attrgetter(attribute_name), stats)))
+                                 for attribute_name in attribute_names})
+
+        return {"type": type,
+                "count": len(agents),
+                "agent_columns": agent_columns,
+                "engine_columns": engine_columns,
+                "stat_columns": stat_columns}
+
+    # Build a world from a checkpoint dictionary
+    @staticmethod
+    def restore_checkpoint(checkpoint: dict):
+
+        world = World(checkpoint["name"], checkpoint["agent_propagation_mode"])
+        world._state = checkpoint["state"]
+        world._old_state = checkpoint["old_state"]
+        world._tick_count = checkpoint["tick_count"]
+        world._spawn_counts = checkpoint["spawn_counts"]
+        world._random = checkpoint.get("random")
+        world._stats = checkpoint["stats"]
+        world._agent_factory = checkpoint["agent_factory"]
+        world._population = checkpoint["population"]
+        world._archive = checkpoint["archive"]
+
+        # The agents' stats read the world inputs so they need the values that they had when the world was saved
+        for stat_name, value in checkpoint["agent_inputs"].items():
+            world._agent_inputs[stat_name].set_value(value)
+
+        saved_map = checkpoint["map"]
+        if saved_map is not None:
+            world._map = WorldMap(saved_map["name"], saved_map["width"], saved_map["height"],
+                                  None if world._random is None else world._random.get_stream(RandomStreams.MAP))
+            world._map.topo_model_pass2 = saved_map["altitudes"].tolist()
+            world._map.summit = saved_map["summit"]
+            world._map.abyss = saved_map["abyss"]
+
+        agents = {}
+        for agent_type in checkpoint["agent_types"]:
+            for agent in WorldCheckpoint._restore_agents(world, agent_type):
+                agents[agent.name] = agent
+
+        # Agents saved whole are still bound to the saved world's inputs
+        for agent in checkpoint["whole_agents"]:
+            agent.bind_world_inputs(world._agent_inputs.values())
+            agents[agent.name] = agent
+
+        agent_order = checkpoint["agent_order"]
+        if agent_order is not None:
+            agents = {name: agents[name] for name in agent_order}
+
+        world._agents = agents
+
+        world._event_queue.events.extend(checkpoint["events"])
+
+        return world
+
+    # Clone a type's agents from its prototype and write the saved columns back into the clones
+    @staticmethod
+    def _restore_agents(world: World, agent_type: dict):
+
+        prototype_wrapper = world.get_agent_prototype(agent_type["type"])
+        prototype = prototype_wrapper._agent
+
+        # Every agent has its own name so the names are always saved as a full column
+        agents = prototype_wrapper.create_agents(list(agent_type["agent_columns"]["name"]))
+
+        def write_column(objects: list, attribute_name: str, column, prototype_value):
+            if len(column) == 1:
+                value = column[0]
+                if value is prototype_value or value == prototype_value:
+                    return
+                for target in objects:
+                    setattr(target, attribute_name, value)
+            else:
+                for target, value in zip(objects, column):
+                    setattr(target, attribute_name, value)
+
+        for attribute_name, column in agent_type["agent_columns"].items():
+            if attribute_name != "name":
+                write_column(agents, attribute_name, column, getattr(prototype, attribute_name, None))
+
+        engines = [agent._stats for agent in agents]
+        for attribute_name, column in agent_type["engine_columns"].items():
+            write_column(engines, attribute_name, column, getattr(prototype._stats, attribute_name))
+
+        all_stats = [list(engine._stats.values()) for engine in engines]
+        for position, prototype_stat in enumerate(prototype._stats._stats.values()):
+            stats = [engine_stats[position] for engine_stats in all_stats]
+            for attribute_name, column in agent_type["stat_columns"][position].items():
+                write_column(stats, attribute_name, column, getattr(prototype_stat, attribute_name, None))
+
+        return agents
@@ -0,0 +1,105 @@
+'''
+    This module lets the class level constants that tune how a world behaves be changed for a run:
+    - ConstantOverrides - context manager that sets constants such as Temperature.TEMP_DELTA_RATE for the
+      duration of a run and then puts back their original values
+
+    Constants are named as "Class.CONSTANT" e.g. "NextState.SLEEP_THRESHOLD" or "DayOfYear.TICKS_PER_DAY".  The
+    world's ambient temperature stat is called AmbientTemperature here so that it doesn't clash with the agent's
+    Temperature stat.
+
+    N.B. the constants belong to the classes so while they are overridden they apply to every world in the process
+    and not just to the world being run.  Anything worked out from them while they are overridden such as a cached
+    calendar or an agent's stats can also outlive the overrides.  Worlds that need different constants must be run
+    in separate processes - SweepRunner refuses to run sweeps with overrides in its own process.
+'''
+
+import logging
+from . import agent_stats
+from . import world_stats
+
+
+class ConstantOverrides:
+
+    # The classes whose constants can be overridden keyed by the name that they are known by
+    CLASSES = {"Age": agent_stats.Age,
+               "Hunger": agent_stats.Hunger,
+               "Thirst": agent_stats.Thirst,
+               "Energy": agent_stats.Energy,
+               "Sleepiness": agent_stats.Sleepiness,
+               "Temperature": agent_stats.Temperature,
+               "NextState": agent_stats.NextState,
+               "CurrentYear": world_stats.CurrentYear,
+               "CurrentSeason": world_stats.CurrentSeason,
+               "DayOfYear": world_stats.DayOfYear,
+               "AmbientTemperature": world_stats.Temperature}
+
+    SEPARATOR = "."
+
+    def __init__(self, overrides: dict = None):
+
+        # The new value of each constant keyed by "Class.CONSTANT"
+        self.overrides = overrides if overrides is not None else {}
+
+        # The original value of each constant that has been overridden keyed by (class, constant name)
+        self._originals = {}
+
+    # Find the class and the name of a constant from its full name
+    @staticmethod
+    def get_constant(name: str):
+
+        class_name, separator, constant_name = name.partition(ConstantOverrides.SEPARATOR)
+
+        constant_class = ConstantOverrides.CLASSES.get(class_name)
+        if constant_class is None:
+            raise Exception("{0} is not a class with constants that can be overridden.".format(class_name))
+
+        if constant_name.isupper() is False or hasattr(constant_class, constant_name) is False:
+            raise Exception("{0} is not a constant of {1}.".format(constant_name, class_name))
+
+        return constant_class, constant_name
+
+    # Make a new value fit the constant's current value
+    # A dictionary only replaces the entries that it has and its keys are turned into the type of the existing keys
+    # so that e.g. a season number read from a JSON file as "1" still matches the season 1
+    @staticmethod
+    def get_new_value(old_value, new_value):
+
+        if isinstance(old_value, dict) is True and isinstance(new_value, dict) is True and len(old_value) > 0:
+            key_type = type(next(iter(old_value.keys())))
+            value = dict(old_value)
+            value.update({key_type(key): item for key, item in new_value.items()})
+            return value
+
+        return new_value
+
+    # Set all of the overrides remembering the original values
+    # Nothing is changed if any of the overrides is not valid
+    def apply(self):
+
+        constants = [(ConstantOverrides.get_constant(name), new_value) for name, new_value in self.overrides.items()]
+
+        for (constant_class, constant_name), new_value in constants:
+
+            old_value = getattr(constant_class, constant_name)
+            self._originals.setdefault((constant_class, constant_name), old_value)
+
+            setattr(constant_class, constant_name, ConstantOverrides.get_new_value(old_value, new_value))
+
+            logging.info("%s.apply(): Set %s.%s to %s", __class__, constant_class.__name__, constant_name,
+                         str(getattr(constant_class, constant_name)))
+
+    # Put back the original values of all of the overridden constants
+    def restore(self):
+
+        for (constant_class, constant_name), old_value in self._originals.items():
+            setattr(constant_class, constant_name, old_value)
+
+        self._originals = {}
+
+    def __enter__(self):
+        self.apply()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.restore()
+        return False
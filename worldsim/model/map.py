@@ -12,8 +12,10 @@ class WorldMap:
     ALTITUDE_OFFSET = 0.0
     MIN_ALTITUDE = 0.0  # Lowest Altitude
 
-    def __init__(self, name: str, width: int = 50, height: int = 50):
+    # The map gets its random numbers from its own stream so that the same seed always gives the same map
+    def __init__(self, name: str, width: int = 50, height: int = 50, rng: random.Random = None):
         self.name = name
+        self._random = rng if rng is not None else random.Random()
         self._width = width
         self._height = height
         self.map = []
@@ -42,21 +44,21 @@ class WorldMap:
         print("Pass 1: generate altitudes and slopes...")
 
         # Set the first square to be a random altitude with slopes in range
-        topo_model_pass1[0][0] = (random.uniform(WorldMap.MIN_ALTITUDE, WorldMap.MAX_ALTITUDE),
-                                  random.uniform(WorldMap.MIN_SLOPE, WorldMap.MAX_SLOPE),
-                                  random.uniform(WorldMap.MIN_SLOPE, WorldMap.MAX_SLOPE))
+        topo_model_pass1[0][0] = (self._random.uniform(WorldMap.MIN_ALTITUDE, WorldMap.MAX_ALTITUDE),
+                                  self._random.uniform(WorldMap.MIN_SLOPE, WorldMap.MAX_SLOPE),
+                                  self._random.uniform(WorldMap.MIN_SLOPE, WorldMap.MAX_SLOPE))
 
         for y in range(0, self._height):
             for x in range(0, self._width):
                 if y == 0:
-                    north_slope = random.uniform(WorldMap.MIN_SLOPE, WorldMap.MAX_SLOPE)
-                    north_altitude = random.uniform(WorldMap.MIN_ALTITUDE, WorldMap.MAX_ALTITUDE)
+                    north_slope = self._random.uniform(WorldMap.MIN_SLOPE, WorldMap.MAX_SLOPE)
+                    north_altitude = self._random.uniform(WorldMap.MIN_ALTITUDE, WorldMap.MAX_ALTITUDE)
                 else:
                     north_altitude, tmp, north_slope = topo_model_pass1[x][y - 1]
 
                 if x == 0:
-                    west_slope = random.uniform(WorldMap.MIN_SLOPE, WorldMap.MAX_SLOPE)
-                    west_altitude = random.uniform(WorldMap.MIN_ALTITUDE, WorldMap.MAX_ALTITUDE)
+                    west_slope = self._random.uniform(WorldMap.MIN_SLOPE, WorldMap.MAX_SLOPE)
+                    west_altitude = self._random.uniform(WorldMap.MIN_ALTITUDE, WorldMap.MAX_ALTITUDE)
                 else:
                     west_altitude, west_slope, tmp = topo_model_pass1[x - 1][y]
 
@@ -65,11 +67,11 @@ class WorldMap:
                 altitude = ((north_altitude + north_slope) + (west_altitude + west_slope)) / 2
                 altitude = clip(altitude, WorldMap.MIN_ALTITUDE, WorldMap.MAX_ALTITUDE)
 
-                east_slope = west_slope + ((random.random() * WorldMap.MAX_SLOPE_DELTA) - WorldMap.MAX_SLOPE_DELTA / 2)
+                east_slope = west_slope + ((self._random.random() * WorldMap.MAX_SLOPE_DELTA) - WorldMap.MAX_SLOPE_DELTA / 2)
                 east_slope = clip(east_slope, WorldMap.MIN_SLOPE, WorldMap.MAX_SLOPE)
 
                 south_slope = north_slope + (
-                            (random.random() * WorldMap.MAX_SLOPE_DELTA) - WorldMap.MAX_SLOPE_DELTA / 2)
+                            (self._random.random() * WorldMap.MAX_SLOPE_DELTA) - WorldMap.MAX_SLOPE_DELTA / 2)
                 south_slope = clip(south_slope, WorldMap.MIN_SLOPE, WorldMap.MAX_SLOPE)
 
                 topo_model_pass1[x][y] = (altitude, east_slope, south_slope)
@@ -0,0 +1,307 @@
+'''
+    This module contains a pool of worker processes that tick agents in parallel:
+    - AgentPool - splits the agents into shards with each shard owned by its own worker process
+
+    The agents are only sent to the workers once when the pool starts.  After that each tick just sends the
+    world inputs to the workers and gets back the names of the event stats that fired.
+'''
+
+import logging
+import multiprocessing
+import os
+import traceback
+from .agent_stats import *
+from .archive import AgentArchive
+
+
+# Run an agent shard in a worker process until the pool tells us to stop
+# The worker starts at the specified tick and each tick command must be for the next tick
+def _run_worker(connection, agents: list, tick_count: int):
+
+    agents = {agent.name: agent for agent in agents}
+
+    # The world inputs that the agents in this worker are bound to keyed by stat name
+    world_inputs = {}
+
+    while True:
+
+        command, arguments = connection.recv()
+
+        try:
+            if command == AgentPool.COMMAND_TICK:
+                world_input_values, new_tick_count = arguments
+
+                # Make sure that we are in step with the world and haven't missed or repeated a tick
+                if new_tick_count != tick_count + 1:
+                    raise Exception("Worker is at tick {0} and can't tick to tick {1}.".format(tick_count,
+                                                                                             new_tick_count))
+
+                # Set the world inputs once and the agents' stats read them as they tick
+                for stat_name, value in world_input_values:
+                    world_input = world_inputs.get(stat_name)
+                    if world_input is None:
+                        world_input = CoreStat(stat_name, "WORLD", value)
+                        world_inputs[stat_name] = world_input
+                        for agent in agents.values():
+                            agent.bind_world_inputs([world_input])
+                    else:
+                        world_input.set_value(value)
+
+                for agent in agents.values():
+                    agent.tick()
+
+                tick_count = new_tick_count
+
+                # See if any of the event stats fired as a result of the tick and which agents died...
+                events = []
+                died = []
+                for agent in agents.values():
+                    is_fired = False
+                    for event_stat_name in AgentStats.EVENT_STATS:
+                        stat = agent._stats.get_stat(event_stat_name)
+                        if stat is not None and stat.value is True:
+                            events.append(event_stat_name)
+                            is_fired = True
+                    if is_fired is True and AgentArchive.is_retirable(agent) is True:
+                        died.append(agent.name)
+
+                result = (events, died)
+
+            elif command == AgentPool.COMMAND_SKIP:
+                # The world has moved on without ticking the agents so just catch up with it
+                new_tick_count = arguments
+                if new_tick_count < tick_count:
+                    raise Exception("Worker is at tick {0} and can't skip back to tick {1}.".format(tick_count,
+                                                                                                 new_tick_count))
+                tick_count = new_tick_count
+                result = None
+
+            elif command == AgentPool.COMMAND_APPLY:
+                function, function_arguments, names = arguments
+                if names is None:
+                    names = list(agents.keys())
+                result = {name: function(agents[name], *function_arguments) for name in names if name in agents}
+
+            elif command == AgentPool.COMMAND_ADD_AGENTS:
+                for agent in arguments:
+                    agent.bind_world_inputs(world_inputs.values())
+                    agents[agent.name] = agent
+                result = None
+
+            elif command == AgentPool.COMMAND_REMOVE_AGENTS:
+                result = [agents.pop(name) for name in arguments if name in agents]
+
+            elif command == AgentPool.COMMAND_STOP:
+                connection.send((AgentPool.RESULT_OK, list(agents.values())))
+                break
+
+            else:
+                raise Exception("{0} is not a valid command.".format(command))
+
+        except Exception:
+            connection.send((AgentPool.RESULT_ERROR, traceback.format_exc()))
+            continue
+
+        connection.send((AgentPool.RESULT_OK, result))
+
+    connection.close()
+
+
+# Functions that can be applied to the agents in the pool
+def get_agent(agent):
+    return agent
+
+
+def get_agent_stat_values(agent, stat_names: list):
+    values = {}
+    for stat_name in stat_names:
+        stat = agent._stats.get_stat(stat_name)
+        values[stat_name] = stat.value if stat is not None else None
+    return values
+
+
+def is_agent_retirable(agent):
+    return AgentArchive.is_retirable(agent)
+
+
+def set_agent_profiling(agent, is_enabled: bool):
+    agent._stats.profiling_enabled = is_enabled
+
+
+def get_agent_profiler(agent):
+    return agent._stats.get_profiler()
+
+
+class AgentPool:
+    '''
+    A pool of worker processes that each own a shard of the agents in a world and tick them
+    '''
+
+    COMMAND_TICK = "tick"
+    COMMAND_SKIP = "skip"
+    COMMAND_APPLY = "apply"
+    COMMAND_ADD_AGENTS = "add agents"
+    COMMAND_REMOVE_AGENTS = "remove agents"
+    COMMAND_STOP = "stop"
+
+    RESULT_OK = "ok"
+    RESULT_ERROR = "error"
+
+    def __init__(self, name: str, processes: int = None):
+        self.name = name
+        self.processes = processes if processes is not None else os.cpu_count()
+
+        # The worker processes and the connection that we use to talk to each one
+        self._workers = []
+        self._connections = []
+
+        # Which worker each agent is in keyed by agent name in the order that the agents were added
+        self._agent_workers = {}
+
+    @property
+    def is_running(self):
+        return len(self._workers) > 0
+
+    # Split the agents into contiguous shards and start a worker process for each shard
+    # Keeping each shard contiguous means that events come back in the same order as ticking the agents in turn
+    # The workers start at the specified tick count so that they can check that they are sent every tick after it
+    def start(self, agents: list, tick_count: int = 0):
+
+        if self.is_running is True:
+            raise Exception("Agent pool {0} is already running.".format(self.name))
+
+        worker_count = max(1, min(self.processes, len(agents)))
+        shard_size = -(-len(agents) // worker_count)
+
+        logging.info("%s.start(): Starting %i workers for %i agents in pool %s", __class__,
+                     worker_count, len(agents), self.name)
+
+        for worker_number in range(worker_count):
+
+            shard = agents[worker_number * shard_size:(worker_number + 1) * shard_size]
+
+            parent_connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_run_worker,
+                                             args=(worker_connection, shard, tick_count),
+                                             name="{0} worker {1}".format(self.name, worker_number),
+                                             daemon=True)
+            worker.start()
+            worker_connection.close()
+
+            self._workers.append(worker)
+            self._connections.append(parent_connection)
+
+            for agent in shard:
+                self._agent_workers[agent.name] = worker_number
+
+    # Send a command to some of the workers and wait for all of them to reply
+    # Returns the result from each worker in worker order
+    def _send(self, command: str, arguments=None, worker_numbers=None):
+
+        if self.is_running is False:
+            raise Exception("Agent pool {0} is not running.".format(self.name))
+
+        if worker_numbers is None:
+            worker_numbers = range(len(self._workers))
+
+        # Send the command to all of the workers first so that they all work on it at the same time
+        for worker_number in worker_numbers:
+            self._connections[worker_number].send((command, arguments))
+
+        results = []
+        errors = []
+        for worker_number in worker_numbers:
+            status, result = self._connections[worker_number].recv()
+            if status == AgentPool.RESULT_ERROR:
+                errors.append(result)
+            else:
+                results.append(result)
+
+        if len(errors) > 0:
+            raise Exception("Agent pool {0} worker failed running {1}:\n{2}".format(self.name, command, errors[0]))
+
+        return results
+
+    # Tick every agent in the pool using the specified world input values
+    # The tick count must be the one after the last tick sent to the pool or the workers refuse to tick
+    # Returns the names of the event stats that fired in agent order and the names of the agents that died
+    def tick(self, world_input_values: list, tick_count: int):
+
+        events = []
+        died = []
+        for worker_events, worker_died in self._send(AgentPool.COMMAND_TICK, (world_input_values, tick_count)):
+            events += worker_events
+            died += worker_died
+
+        return events, died
+
+    # Move the workers on to the specified tick count without ticking any of the agents
+    # e.g. when the world skips ticks without ticking its agents
+    def skip(self, tick_count: int):
+        self._send(AgentPool.COMMAND_SKIP, tick_count)
+
+    # Call a function on each of the named agents or on all agents if no names are specified
+    # The function must be defined at the top level of a module so that it can be sent to the workers
+    # Returns the result for each agent keyed by agent name in agent order
+    def apply(self, function, *arguments, names: list = None):
+
+        worker_numbers = None
+        if names is not None:
+            worker_numbers = sorted({self._agent_workers[name] for name in names if name in self._agent_workers})
+
+        results = {}
+        for worker_results in self._send(AgentPool.COMMAND_APPLY, (function, arguments, names), worker_numbers):
+            results.update(worker_results)
+
+        return {name: results[name] for name in self._agent_workers.keys() if name in results}
+
+    # Get copies of the named agents or all agents if no names are specified
+    # N.B. changes made to the copies don't get sent back to the workers
+    def get_agents(self, names: list = None):
+        return self.apply(get_agent, names=names)
+
+    # Add new agents to the last worker so that the agents stay in the order that they were added
+    def add_agents(self, agents: list):
+
+        worker_number = len(self._workers) - 1
+
+        self._send(AgentPool.COMMAND_ADD_AGENTS, agents, [worker_number])
+
+        for agent in agents:
+            self._agent_workers[agent.name] = worker_number
+
+    # Take the named agents out of the pool and return them
+    def remove_agents(self, names: list):
+
+        worker_numbers = sorted({self._agent_workers[name] for name in names if name in self._agent_workers})
+
+        removed_agents = []
+        for worker_agents in self._send(AgentPool.COMMAND_REMOVE_AGENTS, names, worker_numbers):
+            removed_agents += worker_agents
+
+        for agent in removed_agents:
+            del self._agent_workers[agent.name]
+
+        return removed_agents
+
+    def get_agent_names(self):
+        return list(self._agent_workers.keys())
+
+    # Stop all of the workers and return the agents that they own keyed by agent name in agent order
+    def stop(self):
+
+        agents = {}
+        for worker_agents in self._send(AgentPool.COMMAND_STOP):
+            for agent in worker_agents:
+                agents[agent.name] = agent
+
+        for worker in self._workers:
+            worker.join()
+
+        logging.info("%s.stop(): Stopped %i workers in pool %s", __class__, len(self._workers), self.name)
+
+        self._workers = []
+        self._connections = []
+        self._agent_workers = {}
+
+        return agents
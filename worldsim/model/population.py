@@ -0,0 +1,264 @@
+'''
+    This module contains a columnar version of the agent stat engine:
+    - PopulationStats - holds every AgentStats stat for a whole population of agents as numpy columns and
+      advances them all with vectorised array operations
+
+    The Agent/AgentStats stat graph remains the reference implementation.  Each tick is calculated in the same way
+    as an AgentStats running in StatEngine.PROPAGATE_BATCH mode i.e. every derived stat is calculated once per tick
+    in dependency order.
+'''
+
+import logging
+import numpy
+from .agent import Agent
+from .agent_stats import *
+
+
+class PopulationStats:
+
+    # Stats that hold true/false values rather than numbers
+    BOOLEAN_STATS = (ChangeState.NAME,)
+
+    def __init__(self, name: str):
+        self.name = name
+
+        # The name and type of each agent in the population indexed by row
+        self.names = []
+        self.types = []
+
+        # The value of every stat for every agent in a column keyed by stat name
+        self._columns = {}
+
+        # The current state of each agent and the state that the Change State stat last saw
+        self._state = numpy.zeros(0)
+        self._last_state = numpy.zeros(0)
+
+    @property
+    def size(self):
+        return len(self.names)
+
+    # Add a number of agents of the same type to the population
+    # The starting value of every stat comes from a reference agent of that type
+    def add_agents(self, type: str, names: list, stat_list: list = None):
+
+        count = len(names)
+
+        if count == 0:
+            return
+
+        logging.info("%s.add_agents(): Adding %i agents of type %s to %s", __class__, count, type, self.name)
+
+        # Build a reference agent to get the starting values for every stat
+        prototype = Agent(type, type, StatEngine.PROPAGATE_BATCH)
+        prototype.add_stats(stat_list)
+
+        values = {}
+        for stat in prototype._stats.get_all_stats():
+            values[stat.name] = stat.value
+
+        # Make sure that there is a column for every stat that either the existing agents or the new agents have
+        old_size = self.size
+        for stat_name in values.keys():
+            if stat_name not in self._columns:
+                self._columns[stat_name] = self._new_column(stat_name, old_size)
+
+        # Fill in the new rows of every column
+        for stat_name, column in self._columns.items():
+            new_rows = self._new_column(stat_name, count, values.get(stat_name))
+            self._columns[stat_name] = numpy.concatenate((column, new_rows))
+
+        self._state = numpy.concatenate((self._state, numpy.full(count, prototype._state, dtype=float)))
+        self._last_state = numpy.concatenate((self._last_state,
+                                              numpy.full(count,
+                                                         prototype._stats.get_stat(ChangeState.NAME)._current_state,
+                                                         dtype=float)))
+
+        self.names += list(names)
+        self.types += [type] * count
+
+    # Create a column of the specified size filled with a value or with a blank if there is no value
+    def _new_column(self, stat_name: str, size: int, value=None):
+
+        if stat_name in PopulationStats.BOOLEAN_STATS:
+            return numpy.full(size, bool(value), dtype=bool)
+        elif value is None or isinstance(value, (int, float)) is False:
+            return numpy.full(size, numpy.nan)
+        else:
+            return numpy.full(size, value, dtype=float)
+
+    # Get the index of a named agent
+    def get_index(self, name: str):
+        return self.names.index(name)
+
+    # Get the value of a stat for the agent at the specified index
+    def get_stat_value(self, index: int, stat_name: str):
+        column = self._columns.get(stat_name)
+        if column is None:
+            return None
+        return column[index].item()
+
+    # Get the values of all of the stats for the agent at the specified index keyed by stat name
+    def get_stat_values(self, index: int):
+        return {stat_name: column[index].item() for stat_name, column in self._columns.items()}
+
+    # Get the indexes of the agents whose Change State stat has seen them die
+    # Only the specified indexes are checked if any are specified
+    def get_dead_indexes(self, indexes=None):
+
+        if indexes is None:
+            return numpy.flatnonzero(self._last_state == AgentStats.STATE_DEAD)
+
+        indexes = numpy.asarray(indexes, dtype=int)
+        return indexes[self._last_state[indexes] == AgentStats.STATE_DEAD]
+
+    # Take the agents at the specified indexes out of the population
+    # The rows of the remaining agents are moved up so the indexes of the agents after them change
+    def remove_agents(self, indexes):
+
+        if len(indexes) == 0:
+            return
+
+        is_kept = numpy.ones(self.size, dtype=bool)
+        is_kept[indexes] = False
+
+        for stat_name, column in self._columns.items():
+            self._columns[stat_name] = column[is_kept]
+
+        self._state = self._state[is_kept]
+        self._last_state = self._last_state[is_kept]
+
+        self.names = [name for name, is_agent_kept in zip(self.names, is_kept) if is_agent_kept]
+        self.types = [type for type, is_agent_kept in zip(self.types, is_kept) if is_agent_kept]
+
+    # Get the column of values of a stat for the whole population
+    def get_column(self, stat_name: str):
+        return self._columns.get(stat_name)
+
+    # Set an input stat for the agents at the specified indexes ready for the next tick
+    def set_input(self, stat_name: str, value, indexes=None):
+
+        column = self._columns.get(stat_name)
+        if column is None:
+            logging.warning("%s.set_input(): Couldn't find stat %s in %s", __class__, stat_name, self.name)
+            return
+
+        if indexes is None:
+            column[:] = value
+        else:
+            column[indexes] = value
+
+    #
+    # Do a tick on every agent in the population
+    # Returns the indexes of the agents whose Change State event stat fired
+    #
+    def tick(self, ambient_temperature: float, hour_of_day: int):
+
+        columns = self._columns
+
+        if self.size == 0:
+            return numpy.zeros(0, dtype=int)
+
+        # Update the inputs
+        state = self._state
+        columns[AgentStats.INPUT_TICK_COUNT] += 1
+        columns[AgentStats.INPUT_CURRENT_STATE][:] = state
+        columns[AgentStats.INPUT_AMBIENT_TEMPERATURE][:] = ambient_temperature
+        columns[AgentStats.INPUT_HOUR_OF_DAY][:] = hour_of_day
+
+        is_asleep = (state == AgentStats.STATE_ASLEEP)
+        food = columns[AgentStats.INPUT_FOOD_CONSUMED]
+        fluid = columns[AgentStats.INPUT_FLUID_CONSUMED]
+        energy_gained = columns[AgentStats.INPUT_ENERGY_GAINED]
+
+        # Age goes up by one every tick
+        columns[Age.NAME] += 1
+
+        # Hunger and thirst go up by one unless you have eaten or drunk something
+        hunger = columns[Hunger.NAME]
+        max_hunger = columns[AgentStats.INPUT_MAX_HUNGER]
+        columns[Hunger.NAME] = hunger = numpy.where((food == 0) & (hunger < max_hunger),
+                                                    hunger + 1,
+                                                    numpy.maximum(Hunger.MIN_HUNGER, hunger - food))
+
+        thirst = columns[Thirst.NAME]
+        max_thirst = columns[AgentStats.INPUT_MAX_THIRST]
+        columns[Thirst.NAME] = numpy.where((fluid == 0) & (thirst < max_thirst),
+                                           thirst + 1,
+                                           numpy.maximum(Thirst.MIN_THIRST, thirst - fluid))
+
+        # Temperature moves towards the ambient temperature
+        temperature = columns[Temperature.NAME]
+        temp_diff = numpy.abs(temperature - ambient_temperature)
+        temp_delta = temp_diff * Temperature.TEMP_DELTA_RATE
+        temp_delta = numpy.where((temp_delta < Temperature.MINIMUM_TEMP_DELTA) & (temp_delta > 0),
+                                 numpy.minimum(Temperature.MINIMUM_TEMP_DELTA, temp_diff),
+                                 temp_delta)
+        columns[Temperature.NAME] = numpy.where(temperature < ambient_temperature,
+                                                temperature + temp_delta,
+                                                temperature - temp_delta)
+
+        # Energy gets used up faster when you are hungry and slower when you are asleep
+        energy_delta = numpy.where(hunger > 30, 2.0, numpy.where(hunger > 60, 3.0, 1.0))
+        energy_delta = numpy.where(is_asleep, energy_delta * Energy.SLEEP_ENERGY_REDUCTION_FACTOR, energy_delta)
+        columns[Energy.NAME] = energy = numpy.maximum(Energy.MIN_ENERGY,
+                                                      numpy.minimum(columns[Energy.NAME] + energy_gained - energy_delta,
+                                                                    Energy.MAX_ENERGY))
+
+        # Sleepiness goes down when you are asleep and up faster when you are low on energy
+        sleep_delta = numpy.where(is_asleep, -1, numpy.where(energy <= Sleepiness.ENERGY_LEVEL_THRESHOLD, 3, 1))
+        columns[Sleepiness.NAME] = numpy.maximum(Sleepiness.MIN_SLEEPINESS,
+                                                 numpy.minimum(columns[Sleepiness.NAME] + sleep_delta,
+                                                               columns[AgentStats.INPUT_MAX_SLEEPINESS]))
+
+        # See which agents have changed state since the last tick
+        columns[ChangeState.NAME] = is_changed = (self._last_state != state)
+        self._last_state = state.copy()
+
+        # Calculate the percentage stats leaving the old value if the maximum is zero or missing
+        for attribute_name in AgentStats.OUTPUT_STATS:
+            percent_column = columns.get("{0} Percent".format(attribute_name))
+            max_column = columns.get("Maximum {0}".format(attribute_name))
+            if percent_column is None or max_column is None:
+                continue
+            is_valid = (max_column != 0) & (numpy.isnan(max_column) == False)
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                percent = columns[attribute_name] * 100 / max_column
+            columns["{0} Percent".format(attribute_name)] = numpy.where(is_valid, percent, percent_column)
+
+        # Work out the next state of each agent
+        is_dead = (columns["{0} Percent".format(Hunger.NAME)] >= 100) | \
+                  (columns["{0} Percent".format(Thirst.NAME)] >= 100) | \
+                  (columns[Temperature.NAME] >= NextState.TEMPERATURE_THRESHOLD) | \
+                  (columns["{0} Percent".format(Energy.NAME)] <= 0) | \
+                  (columns["{0} Percent".format(Age.NAME)] > 100)
+
+        sleepiness_percent = columns["{0} Percent".format(Sleepiness.NAME)]
+
+        next_state = numpy.where(is_dead, AgentStats.STATE_DEAD,
+                                 numpy.where(sleepiness_percent >= NextState.SLEEP_THRESHOLD, AgentStats.STATE_ASLEEP,
+                                             numpy.where(sleepiness_percent <= Sleepiness.MIN_SLEEPINESS,
+                                                         AgentStats.STATE_AWAKE,
+                                                         state))).astype(float)
+
+        columns[NextState.NAME] = next_state
+        self._state = next_state
+
+        return numpy.flatnonzero(is_changed)
+
+    # Get a description of the agent at the specified index in the same format as an Agent
+    def get_agent_str(self, index: int):
+
+        _str = "{0} (type:{1} tick:{2} state:{3})".format(self.names[index],
+                                                          self.types[index],
+                                                          int(self._columns[AgentStats.INPUT_TICK_COUNT][index]),
+                                                          AgentStats.STATE_TO_STATE_NAME[int(self._state[index])])
+        for stat_name in AgentStats.OUTPUT_STATS:
+            value = self.get_stat_value(index, stat_name)
+            if value is not None:
+                _str += "\n\t{0}={1}".format(stat_name, value)
+
+        return _str
+
+    def print(self):
+        for index in range(self.size):
+            print(self.get_agent_str(index))
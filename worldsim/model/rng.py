@@ -0,0 +1,58 @@
+'''
+    This module contains the seeded random number generators for a world:
+    - RandomStreams - a tree of independent random number streams that all come from a single world seed
+
+    Each subsystem gets its own named stream so that using random numbers in one subsystem never changes the numbers
+    that another subsystem gets.  The seed of each stream comes from hashing the world seed and the stream's path so
+    the same seed always gives the same numbers whatever order the streams are created in and whichever process
+    creates them.  Streams can be split into child streams e.g. one per subsystem that needs several streams.
+
+    N.B. anything that is sharded across worker processes should take its stream from something that doesn't depend
+    on the sharding (such as the agent's name) so that serial and parallel runs of the same seed give the same output.
+'''
+
+import hashlib
+import logging
+import random
+
+
+class RandomStreams:
+
+    # The streams used by each subsystem
+    MAP = "map"
+
+    SEPARATOR = "/"
+
+    def __init__(self, seed: int = None, path: str = ""):
+
+        # If we are not given a seed then pick one and log it so that the run can be reproduced
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+            logging.info("%s.__init__(): No seed given so using seed %i", __class__, seed)
+
+        self.seed = seed
+        self.path = path
+
+        # The streams that have been handed out so far keyed by name
+        self._streams = {}
+
+    # Work out the seed for a stream from the world seed and the stream's path
+    def get_stream_seed(self, name: str):
+        key = "{0}{1}{2}{3}".format(self.seed, self.path, RandomStreams.SEPARATOR, name)
+        return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "little")
+
+    # Get the named stream creating it the first time it is asked for
+    # Asking for the same stream again carries on from where it got to
+    def get_stream(self, name: str):
+
+        stream = self._streams.get(name)
+
+        if stream is None:
+            stream = random.Random(self.get_stream_seed(name))
+            self._streams[name] = stream
+
+        return stream
+
+    # Get a new set of streams that are independent of this set and of each other
+    def split(self, name: str):
+        return RandomStreams(self.seed, self.path + RandomStreams.SEPARATOR + name)
@@ -0,0 +1,486 @@
+'''
+    This module contains a scheduler that stops a world ticking agents that are asleep or dead:
+    - DormantAgent - the state of an agent's stats as plain numbers that can be moved on a tick at a time
+      without going through the agent's stat engine
+    - AgentScheduler - a priority queue of dormant agents keyed by the next tick that each one needs attention
+
+    When an agent is asleep or dead and nothing is being fed to it its stats just count up or down and the only
+    input that changes is the world's calendar.  The scheduler works out how many ticks the agent can go before its
+    state changes and takes it out of the tick loop until then.  When the agent is due, or somebody looks at it,
+    its stats are moved on in one go.  No events get lost as an agent only fires events when its state changes.
+
+    Each tick is worked out with the same static helpers that the stats use, in the same order as an AgentStats
+    running in StatEngine.PROPAGATE_BATCH mode.  The scheduler is only used with batch mode agents whose stats are
+    the standard AgentStats set and whose stat classes have only the methods that the replay is written against.
+'''
+
+import heapq
+import logging
+from copy import copy
+from .agent import Agent
+from .agent_stats import *
+from .world_stats import WorldCalendar
+
+
+# Is a class attribute a method or a static or class method?
+def _is_method(attribute):
+    return callable(attribute) is True or isinstance(attribute, (staticmethod, classmethod)) is True
+
+
+# Get the names of the methods that a derived stat class and its parents below DerivedStat define
+def _get_stat_method_names(stat_class):
+
+    method_names = set()
+
+    for klass in stat_class.__mro__[:stat_class.__mro__.index(DerivedStat)]:
+        method_names.update(attribute_name for attribute_name, attribute in vars(klass).items()
+                            if _is_method(attribute) is True)
+
+    return method_names
+
+
+# Take a snapshot of each derived stat class and its parents below DerivedStat that is quick to check against later
+# Each class gets its number of attributes and the methods that it defines keyed by name
+# None if any of the derived stat classes has a method that isn't one of its expected methods
+def _get_class_snapshots(stat_method_names: dict):
+
+    snapshots = {}
+
+    for stat_class, method_names in stat_method_names.items():
+
+        if _get_stat_method_names(stat_class) != set(method_names):
+            return None
+
+        for klass in stat_class.__mro__[:stat_class.__mro__.index(DerivedStat)]:
+            attributes = vars(klass)
+            snapshots[klass] = (len(attributes), {attribute_name: attribute
+                                                  for attribute_name, attribute in attributes.items()
+                                                  if _is_method(attribute) is True})
+
+    return snapshots
+
+
+class DormantAgent:
+
+    # The derived stats that an agent must have and nothing else for us to be able to work out its ticks
+    STAT_CLASSES = {Age.NAME: Age, Hunger.NAME: Hunger, Thirst.NAME: Thirst, Energy.NAME: Energy,
+                    Sleepiness.NAME: Sleepiness, Temperature.NAME: Temperature, ChangeState.NAME: ChangeState,
+                    NextState.NAME: NextState}
+
+    # The methods of each stat class that run() is written against
+    # A stat class that gains a method or has one of these replaced might do something that run() doesn't do
+    MODELLED_METHODS = {Age: ("__init__", "calculate", "tick_calculate", "get_age"),
+                        Hunger: ("__init__", "calculate", "tick_calculate", "get_hunger"),
+                        Thirst: ("__init__", "calculate", "tick_calculate", "get_thirst"),
+                        Energy: ("__init__", "calculate", "tick_calculate", "get_energy"),
+                        Sleepiness: ("__init__", "calculate", "tick_calculate", "get_sleepiness"),
+                        Temperature: ("__init__", "calculate", "tick_calculate", "get_temperature"),
+                        ChangeState: ("__init__", "calculate", "tick_calculate", "is_changed"),
+                        NextState: ("__init__", "calculate", "get_next_state"),
+                        AttributePercent: ("__init__", "calculate", "get_percent")}
+
+    # The stat classes as they were when this module was loaded or None if they had methods that run() doesn't model
+    _class_snapshots = _get_class_snapshots(MODELLED_METHODS)
+
+    # The attribute percentage stats keyed by the attribute that they are a percentage of
+    PERCENT_STATS = {attribute_name: "{0} Percent".format(attribute_name) for attribute_name in AgentStats.OUTPUT_STATS}
+
+    # The stats whose value, old value and update tick can change while the agent is dormant
+    TRACKED_STATS = (AgentStats.INPUT_TICK_COUNT, Age.NAME, Hunger.NAME, Thirst.NAME, Energy.NAME, Sleepiness.NAME, Temperature.NAME) + \
+                    tuple(PERCENT_STATS.values())
+
+    # The stats that have their own internal state and the name of the attribute holding it
+    INTERNAL_ATTRIBUTES = {Age.NAME: "_age", Hunger.NAME: "_hunger", Thirst.NAME: "_thirst", Energy.NAME: "_energy",
+                           Sleepiness.NAME: "_sleepiness", Temperature.NAME: "_temperature"}
+
+    TICKING_STATS = (Age.NAME, Hunger.NAME, Thirst.NAME, Energy.NAME, Sleepiness.NAME, Temperature.NAME,
+                     ChangeState.NAME)
+
+    __slots__ = ("tick_count", "tick_number", "state", "food", "fluid", "energy_gained", "ambient_temperature",
+                 "maximums", "stats", "internals")
+
+    def __init__(self, agent: Agent):
+
+        engine = agent._stats
+
+        self.tick_count = agent._tick_count
+        self.tick_number = engine._tick_number
+        self.state = agent._state
+
+        self.food = engine.get_stat(AgentStats.INPUT_FOOD_CONSUMED).value
+        self.fluid = engine.get_stat(AgentStats.INPUT_FLUID_CONSUMED).value
+        self.energy_gained = engine.get_stat(AgentStats.INPUT_ENERGY_GAINED).value
+
+        # The ambient temperature is usually a world input that the agent is bound to
+        self.ambient_temperature = engine.get_stat(AgentStats.INPUT_AMBIENT_TEMPERATURE).value
+
+        self.maximums = {attribute_name: engine.get_stat("Maximum {0}".format(attribute_name)).value
+                         for attribute_name in AgentStats.OUTPUT_STATS}
+
+        # [value, old value, update tick] of each tracked stat
+        self.stats = {}
+        for stat_name in DormantAgent.TRACKED_STATS:
+            stat = engine.get_stat(stat_name)
+            self.stats[stat_name] = [stat._value, stat._old_value, stat.update_tick]
+
+        self.internals = {stat_name: getattr(engine.get_stat(stat_name), attribute_name)
+                          for stat_name, attribute_name in DormantAgent.INTERNAL_ATTRIBUTES.items()}
+
+    # Do the stat classes still have just the methods that run() is written against?
+    @staticmethod
+    def is_modelled():
+
+        snapshots = DormantAgent._class_snapshots
+        if snapshots is None:
+            return False
+
+        # A method that is added, removed or replaced shows up as a different number of attributes or method
+        for klass, (attribute_count, methods) in snapshots.items():
+            attributes = vars(klass)
+            if len(attributes) != attribute_count:
+                return False
+            for method_name, method in methods.items():
+                if attributes.get(method_name) is not method:
+                    return False
+
+        return True
+
+    # Can we work out the ticks of this agent without going through its stats?
+    @staticmethod
+    def is_supported(agent: Agent):
+
+        if DormantAgent.is_modelled() is False:
+            return False
+
+        engine = agent._stats
+
+        if engine.propagation_mode != StatEngine.PROPAGATE_BATCH or engine._transaction_depth > 0:
+            return False
+
+        if engine._profiler is not None or engine._journal is not None or len(engine._expiry_queue) > 0:
+            return False
+
+        engine.flush()
+
+        derived_stat_count = 0
+        for stat in engine._stats.values():
+            if isinstance(stat, DerivedStat) is False:
+                continue
+            derived_stat_count += 1
+            if stat._missing_count > 0:
+                return False
+            if stat.__class__ is not DormantAgent.STAT_CLASSES.get(stat.name, AttributePercent):
+                return False
+            if stat.__class__ is AttributePercent and DormantAgent.PERCENT_STATS.get(stat.attribute_name) != stat.name:
+                return False
+
+        if derived_stat_count != len(DormantAgent.STAT_CLASSES) + len(DormantAgent.PERCENT_STATS):
+            return False
+
+        # A maximum of zero would make the percentage stats fail to calculate
+        for attribute_name in AgentStats.OUTPUT_STATS:
+            maximum = engine.get_stat("Maximum {0}".format(attribute_name))
+            if maximum is None or maximum.value == 0:
+                return False
+
+        return True
+
+    # Is the agent in a state where nothing is happening to it apart from the passing of time?
+    @staticmethod
+    def is_idle(agent: Agent):
+
+        if agent._state not in (AgentStats.STATE_ASLEEP, AgentStats.STATE_DEAD):
+            return False
+
+        engine = agent._stats
+
+        # The change of state event must have already fired
+        change_state = engine.get_stat(ChangeState.NAME)
+        if change_state is None or change_state.value is not False or change_state._current_state != agent._state:
+            return False
+
+        # And nothing is being fed to the agent
+        for stat_name in (AgentStats.INPUT_FOOD_CONSUMED, AgentStats.INPUT_FLUID_CONSUMED,
+                          AgentStats.INPUT_ENERGY_GAINED):
+            stat = engine.get_stat(stat_name)
+            if stat is None or stat.value != 0:
+                return False
+
+        return True
+
+    def copy(self):
+        new_agent = copy(self)
+        new_agent.stats = {stat_name: list(values) for stat_name, values in self.stats.items()}
+        new_agent.internals = dict(self.internals)
+        return new_agent
+
+    #
+    # Move the agent on by up to the specified number of ticks after the specified world tick
+    # The world's ambient temperature for each tick comes from the calendar
+    # If there is no calendar then the ambient temperature stays as it is and the world tick is not used
+    # Stops before any tick that would change the agent's state and returns how many ticks were done
+    #
+    def run(self, calendar: WorldCalendar, world_tick: int, ticks: int):
+
+        state = self.state
+        food = self.food
+        fluid = self.fluid
+        energy_gained = self.energy_gained
+
+        # The helpers that the stats use to work out each tick
+        get_age = Age.get_age
+        get_hunger = Hunger.get_hunger
+        get_thirst = Thirst.get_thirst
+        get_temperature = Temperature.get_temperature
+        get_energy = Energy.get_energy
+        get_sleepiness = Sleepiness.get_sleepiness
+        get_percent = AttributePercent.get_percent
+        get_next_state = NextState.get_next_state
+
+        maximums = self.maximums
+        max_age = maximums[Age.NAME]
+        max_hunger = maximums[Hunger.NAME]
+        max_thirst = maximums[Thirst.NAME]
+        max_energy = maximums[Energy.NAME]
+        max_sleepiness = maximums[Sleepiness.NAME]
+        max_temperature = maximums[Temperature.NAME]
+
+        internals = self.internals
+        age = internals[Age.NAME]
+        hunger = internals[Hunger.NAME]
+        thirst = internals[Thirst.NAME]
+        energy = internals[Energy.NAME]
+        sleepiness = internals[Sleepiness.NAME]
+        temperature = internals[Temperature.NAME]
+
+        # The [value, old value, update tick] of each of the stats that can change
+        stats = self.stats
+        tick_count_stat = stats[AgentStats.INPUT_TICK_COUNT]
+        age_stat = stats[Age.NAME]
+        hunger_stat = stats[Hunger.NAME]
+        thirst_stat = stats[Thirst.NAME]
+        energy_stat = stats[Energy.NAME]
+        sleepiness_stat = stats[Sleepiness.NAME]
+        temperature_stat = stats[Temperature.NAME]
+        percent_stats = DormantAgent.PERCENT_STATS
+        age_percent_stat = stats[percent_stats[Age.NAME]]
+        hunger_percent_stat = stats[percent_stats[Hunger.NAME]]
+        thirst_percent_stat = stats[percent_stats[Thirst.NAME]]
+        energy_percent_stat = stats[percent_stats[Energy.NAME]]
+        sleepiness_percent_stat = stats[percent_stats[Sleepiness.NAME]]
+        temperature_percent_stat = stats[percent_stats[Temperature.NAME]]
+
+        tick_count = self.tick_count
+        tick_number = self.tick_number
+
+        if calendar is not None:
+            temperatures = calendar._temperatures
+            ticks_per_year = calendar.ticks_per_year
+        else:
+            temperatures = [self.ambient_temperature]
+            ticks_per_year = 1
+
+        ticks_done = 0
+
+        for calendar_tick in range(world_tick + 1, world_tick + ticks + 1):
+
+            calendar_tick %= ticks_per_year
+            ambient_temperature = temperatures[calendar_tick]
+
+            # Work out the new values with the same helpers that the stats use in dependency order
+            new_age = get_age(age)
+            new_hunger = get_hunger(hunger, food, max_hunger)
+            new_thirst = get_thirst(thirst, fluid, max_thirst)
+            new_temperature = get_temperature(temperature, ambient_temperature)
+            new_energy = get_energy(energy, energy_gained, state, new_hunger)
+            new_sleepiness = get_sleepiness(sleepiness, state, new_energy, max_sleepiness)
+
+            # The percentage stats only get calculated when their attribute's value changes
+            age_percent = get_percent(new_age, max_age) if new_age != age_stat[0] else age_percent_stat[0]
+            hunger_percent = get_percent(new_hunger, max_hunger) \
+                if new_hunger != hunger_stat[0] else hunger_percent_stat[0]
+            thirst_percent = get_percent(new_thirst, max_thirst) \
+                if new_thirst != thirst_stat[0] else thirst_percent_stat[0]
+            energy_percent = get_percent(new_energy, max_energy) \
+                if new_energy != energy_stat[0] else energy_percent_stat[0]
+            sleepiness_percent = get_percent(new_sleepiness, max_sleepiness) \
+                if new_sleepiness != sleepiness_stat[0] else sleepiness_percent_stat[0]
+            temperature_percent = get_percent(new_temperature, max_temperature) \
+                if new_temperature != temperature_stat[0] else temperature_percent_stat[0]
+
+            # Stop before the tick if the Next State stat would change the agent's state
+            # The Change State stat stays False for as long as the state doesn't change
+            next_state = get_next_state(state, sleepiness_percent, hunger_percent, thirst_percent, energy_percent,
+                                        new_temperature, age_percent)
+
+            if next_state != state:
+                break
+
+            tick_number += 1
+            tick_count += 1
+            tick_count_stat[1] = tick_count_stat[0]
+            tick_count_stat[0] = tick_count
+            tick_count_stat[2] = tick_number
+
+            # Every stat that has changed keeps its old value and the tick that it changed on
+            for stat, new_value in ((age_stat, new_age), (hunger_stat, new_hunger), (thirst_stat, new_thirst),
+                                    (energy_stat, new_energy), (sleepiness_stat, new_sleepiness),
+                                    (temperature_stat, new_temperature),
+                                    (age_percent_stat, age_percent), (hunger_percent_stat, hunger_percent),
+                                    (thirst_percent_stat, thirst_percent), (energy_percent_stat, energy_percent),
+                                    (sleepiness_percent_stat, sleepiness_percent),
+                                    (temperature_percent_stat, temperature_percent)):
+                if new_value != stat[0]:
+                    stat[1] = stat[0]
+                    stat[0] = new_value
+                    stat[2] = tick_number
+
+            age = new_age
+            hunger = new_hunger
+            thirst = new_thirst
+            energy = new_energy
+            sleepiness = new_sleepiness
+            temperature = new_temperature
+
+            ticks_done += 1
+
+        self.tick_count = tick_count
+        self.tick_number = tick_number
+
+        internals[Age.NAME] = age
+        internals[Hunger.NAME] = hunger
+        internals[Thirst.NAME] = thirst
+        internals[Energy.NAME] = energy
+        internals[Sleepiness.NAME] = sleepiness
+        internals[Temperature.NAME] = temperature
+
+        return ticks_done
+
+    # Write the state back into the agent's stats
+    def write(self, agent: Agent):
+
+        engine = agent._stats
+
+        agent._tick_count = self.tick_count
+        engine._tick_number = self.tick_number
+
+        for stat_name, (value, old_value, update_tick) in self.stats.items():
+            stat = engine.get_stat(stat_name)
+            stat._value = value
+            stat._old_value = old_value
+            stat.update_tick = update_tick
+
+        for stat_name, attribute_name in DormantAgent.INTERNAL_ATTRIBUTES.items():
+            setattr(engine.get_stat(stat_name), attribute_name, self.internals[stat_name])
+
+        for stat_name in DormantAgent.TICKING_STATS:
+            engine.get_stat(stat_name)._last_tick = self.tick_count
+
+
+class AgentScheduler:
+    '''
+    Keeps track of the agents that are dormant and the world tick when each one next needs to be looked at
+    '''
+
+    # Don't bother taking an agent out of the tick loop unless it can stay out for at least this many ticks
+    MIN_DORMANT_TICKS = 2
+
+    # How far ahead to work out an agent's ticks when it first goes dormant
+    # Each time it stays dormant for all of those ticks the next look ahead is twice as far up to the maximum
+    FIRST_DORMANT_TICKS = 16
+    MAX_DORMANT_TICKS = 1024
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calendar = WorldCalendar.get_calendar()
+
+        # The dormant agents keyed by agent name
+        # Each entry is [agent, state at start tick, start tick, state at end tick, end tick, is state changing,
+        # ticks looked ahead]
+        self._dormant = {}
+
+        # Min-heap of (end tick, sequence, agent name) for the dormant agents
+        self._queue = []
+        self._sequence = 0
+
+    @property
+    def dormant_count(self):
+        return len(self._dormant)
+
+    def is_dormant(self, name: str):
+        return name in self._dormant
+
+    # Get the names of the dormant agents so that the tick loop can skip them
+    def get_dormant_names(self):
+        return self._dormant.keys()
+
+    # See if an agent that has just been ticked can be taken out of the tick loop
+    def try_dormant(self, agent: Agent, world_tick: int):
+
+        if DormantAgent.is_idle(agent) is False or DormantAgent.is_supported(agent) is False:
+            return False
+
+        return self._schedule(agent, DormantAgent(agent), world_tick, AgentScheduler.FIRST_DORMANT_TICKS)
+
+    # Work out how long an agent can stay dormant from the specified state and queue it up
+    def _schedule(self, agent: Agent, start_state: DormantAgent, start_tick: int, ticks: int):
+
+        end_state = start_state.copy()
+        ticks_done = end_state.run(self._calendar, start_tick, ticks)
+
+        if ticks_done < AgentScheduler.MIN_DORMANT_TICKS:
+            return False
+
+        end_tick = start_tick + ticks_done
+        self._dormant[agent.name] = [agent, start_state, start_tick, end_state, end_tick, ticks_done < ticks, ticks]
+
+        heapq.heappush(self._queue, (end_tick, self._sequence, agent.name))
+        self._sequence += 1
+
+        return True
+
+    # Bring the agents that are due back into the tick loop before the specified world tick is done
+    # Agents that could stay dormant for longer just get queued up again from where they got to
+    def wake_due(self, world_tick: int):
+
+        while len(self._queue) > 0 and self._queue[0][0] < world_tick:
+
+            end_tick, sequence, name = heapq.heappop(self._queue)
+
+            entry = self._dormant.get(name)
+            if entry is None or entry[4] != end_tick:
+                continue
+
+            del self._dormant[name]
+
+            agent, start_state, start_tick, end_state, end_tick, is_changing, ticks = entry
+
+            if is_changing is True or self._schedule(agent, end_state, end_tick,
+                                                     min(ticks * 2, AgentScheduler.MAX_DORMANT_TICKS)) is False:
+                end_state.write(agent)
+
+    # Bring a dormant agent up to date with the world and put it back in the tick loop
+    def wake(self, name: str, world_tick: int):
+
+        entry = self._dormant.pop(name, None)
+        if entry is None:
+            return
+
+        agent, start_state, start_tick, end_state, end_tick, is_changing, ticks = entry
+
+        if world_tick >= end_tick:
+            end_state.write(agent)
+        else:
+            state = start_state.copy()
+            state.run(self._calendar, start_tick, world_tick - start_tick)
+            state.write(agent)
+
+    # Bring all of the dormant agents up to date and put them back in the tick loop
+    def wake_all(self, world_tick: int):
+
+        logging.info("%s.wake_all(): Waking %i dormant agents in %s", __class__, len(self._dormant), self.name)
+
+        for name in list(self._dormant.keys()):
+            self.wake(name, world_tick)
+
+        self._queue = []
@@ -6,34 +6,37 @@ class Event():
     STATE = "state"
     GAME = "game"
 
-    def __init__(self, name: str, description: str = None, type: str = DEFAULT):
+    def __init__(self, name: str, description: str = None, type: str = DEFAULT, tick_count: int = None):
         self.name = name
         self.description = description
         self.type = type
 
+        # The tick that the event happened on if it is known
+        self.tick_count = tick_count
+
     def __str__(self):
         return "{0}:{1} ({2})".format(self.name, self.description, self.type)
 
 
 class EventQueue():
+    '''
+    The events raised by a world waiting to be read - each world has its own queue
+    '''
 
-    events = collections.deque()
+    def __init__(self):
+        self.events = collections.deque()
 
-    @staticmethod
-    def add_event(new_event: Event):
-        EventQueue.events.append(new_event)
+    def add_event(self, new_event: Event):
+        self.events.append(new_event)
 
-    @staticmethod
-    def pop_event():
-        return EventQueue.events.popleft()
+    def pop_event(self):
+        return self.events.popleft()
 
-    @staticmethod
-    def size():
-        return len(EventQueue.events)
+    def size(self):
+        return len(self.events)
 
-    @staticmethod
-    def print():
-        for event in EventQueue.events:
+    def print(self):
+        for event in self.events:
             print(event)
 
 def is_numeric(s):
@@ -1,12 +1,21 @@
 from .utils import EventQueue
 from .utils import Event
-from .agent import Agent
-from .agent_stats import AgentStats
+from .agent import Agent, AgentPrototype
+from .agent_stats import AgentStats, NextState
+from .archive import AgentArchive
+from .population import PopulationStats
+from .parallel import AgentPool, get_agent_stat_values, set_agent_profiling, get_agent_profiler, \
+    is_agent_retirable
 from .world_stats import *
 from .map import *
+from .rng import RandomStreams
+from .scheduler import AgentScheduler
 
+import gc
+import logging
 import math
 import os
+import time
 
 class World():
 
@@ -16,20 +25,79 @@ class World():
     STATE_PAUSED = "PAUSED"
     STATE_DESTROYED = "DESTROYED"
 
-    GAME_DATA_DIR = ".\\data\\"
+    GAME_DATA_DIR = "data"
 
     EVENT_TICK = "TICK"
 
-    def __init__(self, name : str = "Default"):
+    # The world stats that are inputs to every agent
+    AGENT_INPUTS = (Temperature.NAME, HourOfDay.NAME)
+
+    # How many agents of each type get loaded if we are not told otherwise
+    DEFAULT_AGENT_COUNT = 2
+
+    MAP_WIDTH = 50
+    MAP_HEIGHT = 50
+
+    # The phases of a tick that get timed when phase timing is switched on
+    PHASE_WORLD_STATS = "World Stats"
+    PHASE_WORLD_EVENTS = "World Events"
+    PHASE_AGENTS = "Agents"
+    PHASES = (PHASE_WORLD_STATS, PHASE_WORLD_EVENTS, PHASE_AGENTS)
+
+    def __init__(self, name : str = "Default",
+                 agent_propagation_mode : str = StatEngine.PROPAGATE_IMMEDIATE,
+                 use_columnar_engine : bool = False):
         self.name = name
         self._state = self._old_state = World.STATE_LOADED
         self._tick_count = 0
         self._stats = WorldStats(name)
+
+        # The events that the world has raised waiting to be read
+        self._event_queue = EventQueue()
+
         self._agents = {}
         self._map = None
 
+        # The seeded random number streams that every part of the world gets its random numbers from
+        self._random = None
+
+        # How stat changes are propagated inside each agent's stat engine
+        self._agent_propagation_mode = agent_propagation_mode
+
+        # If we are using the columnar engine then the agents that get loaded are held as columns in the population
+        self._population = None
+        if use_columnar_engine is True:
+            self._population = PopulationStats(name)
+
         self._agent_factory = None
 
+        # The prototype for each type of agent that new agents get cloned from
+        self._agent_prototypes = {}
+
+        # The world inputs that every agent is bound to keyed by stat name
+        # These are set once per tick and the agents' stats read the new values when they are next calculated
+        self._agent_inputs = {stat_name: CoreStat(stat_name, "WORLD", None) for stat_name in World.AGENT_INPUTS}
+
+        # If we are ticking agents in parallel then the agents are owned by the worker processes in this pool
+        self._agent_pool = None
+
+        # If we are scheduling agents then idle agents are left out of the tick loop until they are next needed
+        self._scheduler = None
+
+        # If retirement is switched on then agents that die are moved out of the active agents into the archive
+        self._archive = AgentArchive(name)
+        self._is_retiring = False
+
+        # How many agents have been removed from the active agents since the dictionary of them was last rebuilt
+        self._removed_count = 0
+
+        # How many agents of each type have been spawned and how many agents per second the last spawn managed
+        self._spawn_counts = {}
+        self.spawn_rate = None
+
+        # How long each phase of a tick has taken in total if phase timing is switched on
+        self._phase_times = None
+
     @property
     def state(self):
         return self._state
@@ -41,10 +109,18 @@ class World():
             self._old_state = self.state
             self._state = new_state
 
-            EventQueue.add_event(Event(self._state,
-                                       "Game state change from {0} to {1}".format(self._old_state, self._state),
-                                       Event.STATE))
+            self._event_queue.add_event(Event(self._state,
+                                              "Game state change from {0} to {1}".format(self._old_state, self._state),
+                                              Event.STATE, self._tick_count))
+
 
+    @property
+    def seed(self):
+        return self._random.seed if self._random is not None else None
+
+    @property
+    def random_streams(self):
+        return self._random
 
     @property
     def year(self):
@@ -93,7 +169,16 @@ class World():
         return str
 
 
-    def initialise(self, name : str = "Default World"):
+    #
+    # Create the world, its map and its agents
+    # agent_counts is how many agents of each type to load keyed by agent type
+    # The same seed always creates the same world and a random seed is picked if one is not specified
+    #
+    def initialise(self, name : str = "Default World",
+                   agent_counts : dict = None,
+                   map_width : int = MAP_WIDTH,
+                   map_height : int = MAP_HEIGHT,
+                   seed : int = None):
 
         if self.state != World.STATE_LOADED:
             return
@@ -104,18 +189,19 @@ class World():
         self.state = World.STATE_INITIALISED
         self.name = name
         self._stats.initialise()
-        self._map = WorldMap(self.name)
+        self._random = RandomStreams(seed)
+        self._map = WorldMap(self.name, map_width, map_height, self._random.get_stream(RandomStreams.MAP))
         self._map.initialise()
 
         filename= os.path.join(os.path.dirname(__file__),World.GAME_DATA_DIR, "agents.csv")
         self._agent_factory = CSVStatFactory("Agents", filename)
         self._agent_factory.load()
 
-        self.load_agents()
+        self.load_agents(agent_counts)
 
-        EventQueue.add_event(Event(World.STATE_INITIALISED,
-                                   "The world of '{0}' has been created!".format(self.name),
-                                   Event.STATE))
+        self._event_queue.add_event(Event(World.STATE_INITIALISED,
+                                          "The world of '{0}' has been created!".format(self.name),
+                                          Event.STATE, self._tick_count))
 
     def run(self):
         if self.state == World.STATE_LOADED:
@@ -123,28 +209,351 @@ class World():
 
         self.pause(is_paused=False)
 
-    def load_agents(self):
+    # Load the specified number of agents of each type or a few of every type if no counts are specified
+    def load_agents(self, agent_counts : dict = None):
+
+        if agent_counts is None:
+            agent_counts = {type: World.DEFAULT_AGENT_COUNT for type in self._agent_factory.get_object_names()}
+
+        for type, count in agent_counts.items():
+            self.spawn(type, count)
+
+    #
+    # Create a number of agents of the specified type in one go and add them to the world
+    # If no names are specified then the agents are numbered on from the agents of that type already spawned
+    # Every name must be different from the names of all of the other agents including the retired ones
+    # and numbered names that are already used are skipped
+    # Returns the names of the new agents
+    #
+    def spawn(self, type : str, count : int, names : list = None):
+
+        if type not in self._agent_factory.get_object_names():
+            raise Exception("Agent type {0} is not a known type of agent.".format(type))
+
+        spawn_count = self._spawn_counts.get(type, 0)
+
+        # A name can't be used for more than one agent whether it is alive or retired
+        used_names = set(self.get_agent_names())
+        used_names.update(self._archive.get_agent_names())
+
+        if names is None:
+            # Skip over any numbered names that have already been used
+            prefix = type + " "
+            names = []
+            while len(names) < count:
+                name = prefix + str(spawn_count)
+                spawn_count += 1
+                if name not in used_names:
+                    names.append(name)
+        else:
+            if len(names) != count:
+                raise Exception("Asked to spawn {0} agents but was given {1} names.".format(count, len(names)))
+
+            duplicate_names = []
+            for name in names:
+                if name in used_names:
+                    duplicate_names.append(name)
+                used_names.add(name)
+            if len(duplicate_names) > 0:
+                raise Exception("Can't spawn agents with names that are already used {0}.".format(duplicate_names))
+
+            spawn_count += count
+
+        self._spawn_counts[type] = spawn_count
+
+        start_time = time.perf_counter()
+
+        # Creating lots of long lived objects in one go sets off lots of garbage collections that find nothing
+        # so switch off the garbage collector until we are done
+        is_gc_enabled = gc.isenabled()
+        gc.disable()
 
-        types = self._agent_factory.get_object_names()
+        try:
+            # If we are using the columnar engine then add the agents to the population
+            if self._population is not None:
+                self._population.add_agents(type, names, self._agent_factory.get_stats_by_name(type))
+            else:
+                new_agents = self.get_agent_prototype(type).create_agents(names)
+                if self._agent_pool is not None:
+                    self._agent_pool.add_agents(new_agents)
+                else:
+                    self._agents.update(zip(names, new_agents))
+
+        finally:
+            if is_gc_enabled is True:
+                gc.enable()
+
+        elapsed = time.perf_counter() - start_time
+        self.spawn_rate = count / elapsed if elapsed > 0 else None
+
+        logging.info("%s.spawn(): Spawned %i agents of type %s in %.3fs (%s agents/s)", __class__,
+                     count, type, elapsed, "{0:.0f}".format(self.spawn_rate) if self.spawn_rate else "n/a")
+
+        return names
 
-        for type in types:
-            for i in range(0,2):
-                new_agent = Agent("{0} {1}".format(type, i), type)
-                stats = self._agent_factory.get_stats_by_name(type)
-                new_agent.add_stats(stats)
-                self.add_agent(new_agent)
+    # Get the prototype for a type of agent creating it from the agent factory the first time it is needed
+    def get_agent_prototype(self, type : str):
+
+        prototype = self._agent_prototypes.get(type)
+
+        if prototype is None:
+            stats = self._agent_factory.get_stats_by_name(type)
+            if stats is None:
+                raise Exception("Agent type {0} is not a known type of agent.".format(type))
+            prototype = AgentPrototype(type, stats, self._agent_propagation_mode)
+            # Agents cloned from the prototype are bound to the world inputs as well
+            prototype._agent.bind_world_inputs(self._agent_inputs.values())
+            self._agent_prototypes[type] = prototype
+
+        return prototype
 
     def add_agent(self, new_agent : Agent):
-        self._agents[new_agent.name] = new_agent
+        new_agent.bind_world_inputs(self._agent_inputs.values())
+        if self._agent_pool is not None:
+            self._agent_pool.add_agents([new_agent])
+        else:
+            self._agents[new_agent.name] = new_agent
 
+    # Get a named agent
+    # N.B. if we are ticking in parallel then this is a copy of the agent and changes to it are not kept
     def get_agent(self, name : str):
-        if name in self._agents.keys():
+        if self._agent_pool is not None:
+            return self._agent_pool.get_agents([name]).get(name)
+        elif name in self._agents.keys():
+            if self._scheduler is not None:
+                self._scheduler.wake(name, self._tick_count)
             return self._agents[name]
         else:
             return None
 
+    # Get all of the agents keyed by agent name (copies if we are ticking in parallel)
+    def get_agents(self):
+        if self._agent_pool is not None:
+            return self._agent_pool.get_agents()
+        self.wake_agents()
+        return self._agents
+
     def get_agent_names(self):
-        return list(self._agents.keys())
+        if self._agent_pool is not None:
+            names = self._agent_pool.get_agent_names()
+        else:
+            names = list(self._agents.keys())
+        if self._population is not None:
+            names += self._population.names
+        return names
+
+    # Get the values of the specified stats for every agent keyed by agent name
+    def get_agent_summaries(self, stat_names : list):
+
+        if self._agent_pool is not None:
+            return self._agent_pool.apply(get_agent_stat_values, stat_names)
+
+        self.wake_agents()
+
+        return {name: get_agent_stat_values(agent, stat_names) for name, agent in self._agents.items()}
+
+    @property
+    def is_parallel(self):
+        return self._agent_pool is not None
+
+    # Start ticking the agents in parallel in a pool of worker processes that take over the agents
+    # The columnar population is already ticked in one go so it stays in this process
+    def start_parallel(self, processes : int = None):
+
+        if self._agent_pool is not None:
+            return
+
+        self.wake_agents()
+
+        self._agent_pool = AgentPool(self.name, processes)
+        self._agent_pool.start(list(self._agents.values()), self._tick_count)
+        self._agents = {}
+
+    # Stop ticking in parallel and take the agents back from the worker processes
+    def stop_parallel(self):
+
+        if self._agent_pool is None:
+            return
+
+        self._agents = self._agent_pool.stop()
+        self._agent_pool = None
+
+        # The agents come back bound to the world inputs in the worker processes
+        for agent in self._agents.values():
+            agent.bind_world_inputs(self._agent_inputs.values())
+
+    @property
+    def use_columnar_engine(self):
+        return self._population is not None
+
+    @property
+    def scheduling_enabled(self):
+        return self._scheduler is not None
+
+    # Switch the scheduling of idle agents on or off
+    # Only agents that propagate their stats in batch mode can be scheduled
+    # N.B. agents that are ticked in parallel or in the columnar population are always ticked
+    @scheduling_enabled.setter
+    def scheduling_enabled(self, is_enabled : bool):
+
+        if is_enabled is True:
+            if self._agent_propagation_mode != StatEngine.PROPAGATE_BATCH:
+                raise Exception("Agents can only be scheduled in {0} mode not {1} mode.".format(
+                    StatEngine.PROPAGATE_BATCH, self._agent_propagation_mode))
+            if self._scheduler is None:
+                self._scheduler = AgentScheduler(self.name)
+        else:
+            self.wake_agents()
+            self._scheduler = None
+
+    # Bring any dormant agents up to date and put them back in the tick loop
+    def wake_agents(self):
+        if self._scheduler is not None:
+            self._scheduler.wake_all(self._tick_count)
+
+    @property
+    def retirement_enabled(self):
+        return self._is_retiring
+
+    # Switch the retirement of dead agents on or off
+    # Switching it on straight away retires any agents that have already died
+    @retirement_enabled.setter
+    def retirement_enabled(self, is_enabled : bool):
+
+        self._is_retiring = is_enabled
+
+        if is_enabled is True:
+            self.retire_dead_agents()
+
+    # Get the archive of the agents that have been retired
+    @property
+    def archive(self):
+        return self._archive
+
+    #
+    # Retire all of the agents whose death has been announced by their Change State event
+    # Each agent's final stats are kept in the archive and the agent is no longer ticked
+    #
+    def retire_dead_agents(self):
+
+        if self._population is not None:
+            self._retire_population(self._population.get_dead_indexes())
+
+        if self._agent_pool is not None:
+            names = [name for name, is_retirable in self._agent_pool.apply(is_agent_retirable).items()
+                     if is_retirable is True]
+            if len(names) > 0:
+                self._archive.add_agents(self._agent_pool.remove_agents(names), self._tick_count)
+
+        dead_agents = [agent for agent in self._agents.values() if AgentArchive.is_retirable(agent) is True]
+
+        # Dormant agents need to be brought up to date so that the archive gets their final stats
+        if self._scheduler is not None:
+            for agent in dead_agents:
+                self._scheduler.wake(agent.name, self._tick_count)
+
+        if len(dead_agents) > 0:
+            self._retire_agents(dead_agents)
+
+    # Move some agents out of the active agents and into the archive
+    def _retire_agents(self, agents : list):
+
+        for agent in agents:
+            del self._agents[agent.name]
+
+        self._archive.add_agents(agents, self._tick_count)
+
+        # Removing agents leaves gaps in the dictionary that still get stepped over every time that the agents are
+        # ticked so rebuild it once there are more gaps than agents
+        self._removed_count += len(agents)
+        if self._removed_count > len(self._agents):
+            self._agents = dict(self._agents)
+            self._removed_count = 0
+
+    # Move the agents at the specified indexes out of the columnar population and into the archive
+    def _retire_population(self, indexes):
+
+        if len(indexes) == 0:
+            return
+
+        population = self._population
+
+        for index in indexes:
+            self._archive.add(population.names[index],
+                              population.types[index],
+                              int(population.get_stat_value(index, NextState.NAME)),
+                              int(population.get_stat_value(index, AgentStats.INPUT_TICK_COUNT)),
+                              self._tick_count,
+                              population.get_stat_values(index))
+
+        population.remove_agents(indexes)
+
+        logging.info("%s._retire_population(): Retired %i agents from the population at tick %i", __class__,
+                     len(indexes), self._tick_count)
+
+    @property
+    def profiling_enabled(self):
+        return self._stats.profiling_enabled
+
+    # Switch profiling of the world's stats and every agent's stats on or off
+    # Agent prototypes are included so that any agents spawned later get profiled too
+    # N.B. agents in the columnar population are not made of stats so they are not profiled
+    @profiling_enabled.setter
+    def profiling_enabled(self, is_enabled : bool):
+
+        self._stats.profiling_enabled = is_enabled
+
+        # Profiled agents can't be scheduled so bring any dormant agents up to date first
+        self.wake_agents()
+
+        for prototype in self._agent_prototypes.values():
+            prototype._agent._stats.profiling_enabled = is_enabled
+
+        for agent in self._agents.values():
+            agent._stats.profiling_enabled = is_enabled
+
+        if self._agent_pool is not None:
+            self._agent_pool.apply(set_agent_profiling, is_enabled)
+
+    # Get the profile of the world's own stats
+    def get_world_profile(self):
+        return self._stats.get_profiler()
+
+    # Get the profiles of all of the agents added together into a single profile
+    def get_agent_profile(self):
+
+        agent_profile = StatProfiler("{0} agents".format(self.name))
+
+        if self._agent_pool is not None:
+            profilers = self._agent_pool.apply(get_agent_profiler).values()
+        else:
+            profilers = [agent._stats.get_profiler() for agent in self._agents.values()]
+
+        for profiler in profilers:
+            if profiler is not None:
+                agent_profile.merge(profiler)
+
+        return agent_profile
+
+    @property
+    def timing_enabled(self):
+        return self._phase_times is not None
+
+    # Switch timing of each phase of a tick on or off
+    # Switching it on starts the timings again from zero
+    @timing_enabled.setter
+    def timing_enabled(self, is_enabled : bool):
+        self._phase_times = {phase: 0.0 for phase in World.PHASES} if is_enabled is True else None
+
+    # Get the total time in seconds spent in each phase of a tick keyed by phase
+    def get_phase_times(self):
+        return dict(self._phase_times) if self._phase_times is not None else None
+
+    # Add the time since the phase started to the phase total and return the time now for the next phase
+    def _end_phase(self, phase : str, phase_start : float):
+        phase_end = time.perf_counter()
+        self._phase_times[phase] += phase_end - phase_start
+        return phase_end
 
     def set_temperature(self, new_temperature : float):
 
@@ -157,45 +566,190 @@ class World():
 
         self._tick_count += 1
 
+        is_timed = self._phase_times is not None
+        if is_timed is True:
+            phase_start = time.perf_counter()
+
         # Tick the Stat Engine
+        self._stats.tick()
         self._stats.update_stat(WorldStats.INPUT_TICK_COUNT, self._tick_count)
+        world_inputs = self.get_world_inputs()
+
+        if is_timed is True:
+            phase_start = self._end_phase(World.PHASE_WORLD_STATS, phase_start)
 
         # See if any of the event stats fired as a result if the tick...
         for event_stat_name in WorldStats.EVENTS:
             stat = self._stats.get_stat(event_stat_name)
             if stat.value is True:
-                EventQueue.add_event(Event(stat.name,
-                                           "Event stat fired: {0}={1}".format(stat.name, stat.value),
-                                           "EVENT"))
+                self._event_queue.add_event(Event(stat.name,
+                                                  "Event stat fired: {0}={1}".format(stat.name, stat.value),
+                                                  "EVENT", self._tick_count))
 
-        for agent in self._agents.values():
-            self.update_world_inputs(agent)
+        if is_timed is True:
+            phase_start = self._end_phase(World.PHASE_WORLD_EVENTS, phase_start)
+
+        self.tick_agents(world_inputs)
+
+        if is_timed is True:
+            self._end_phase(World.PHASE_AGENTS, phase_start)
+
+    #
+    # Fast forward the world by a number of ticks
+    # The calendar for each tick comes from lookup tables rather than from the world stats and the world stats
+    # are brought up to date once at the end.  The day, season and year change events of the skipped ticks
+    # are still fired.  If tick_agents is False then the agents are left as they are and the skip is almost free.
+    #
+    def advance(self, ticks : int, tick_agents : bool = True):
+
+        if self.state != World.STATE_PLAYING or ticks <= 0:
+            return
+
+        calendar = WorldCalendar.get_calendar()
+
+        start_tick = self._tick_count
+        end_tick = start_tick + ticks
+
+        has_agents = len(self._agents) > 0 or self._agent_pool is not None or self._population is not None
+
+        if tick_agents is True and has_agents is True:
+
+            for tick_count in range(start_tick + 1, end_tick + 1):
+                self._tick_count = tick_count
+
+                for event_name in calendar.get_events(tick_count):
+                    self._event_queue.add_event(Event(event_name,
+                                                      "Event stat fired: {0}={1}".format(event_name, True),
+                                                      "EVENT", self._tick_count))
+
+                time = calendar.get_time(tick_count)
+                self.tick_agents([CoreStat(stat_name, "WORLD", time[stat_name]) for stat_name in World.AGENT_INPUTS])
+
+        else:
+            # The agents are not ticked through the skip so bring any dormant ones up to date before the skip
+            self.wake_agents()
+
+            # And the worker processes need to know that the agents are not being ticked to the end of the skip
+            if self._agent_pool is not None:
+                self._agent_pool.skip(end_tick)
+
+            for tick_count, event_name in calendar.get_events_between(start_tick, end_tick):
+                self._event_queue.add_event(Event(event_name,
+                                                  "Event stat fired: {0}={1}".format(event_name, True),
+                                                  "EVENT", tick_count))
+
+        self._tick_count = end_tick
+        self._stats.tick(ticks)
+        self._stats.fast_forward(end_tick)
+
+    # Tick all of the agents using the specified world input stats
+    def tick_agents(self, world_inputs : list):
+
+        # Tick all of the agents in the columnar population in one go
+        if self._population is not None:
+            self.tick_population(world_inputs)
+
+        # If we are ticking in parallel then the workers just need the world inputs
+        if self._agent_pool is not None:
+            world_input_values = [(stat.name, stat.value) for stat in world_inputs]
+            events, died = self._agent_pool.tick(world_input_values, self._tick_count)
+            for event_stat_name in events:
+                self._event_queue.add_event(Event(event_stat_name,
+                                                  "Event stat fired: {0}={1}".format(event_stat_name, True),
+                                                  "EVENT", self._tick_count))
+
+            # The agents that died get taken back from the workers to be retired
+            if self._is_retiring is True and len(died) > 0:
+                self._archive.add_agents(self._agent_pool.remove_agents(died), self._tick_count)
+
+        # If we are scheduling agents then only tick the agents that are not dormant
+        scheduler = self._scheduler
+        if scheduler is None:
+            agents = self._agents.values()
+        else:
+            scheduler.wake_due(self._tick_count)
+            dormant_names = scheduler.get_dormant_names()
+            agents = [agent for name, agent in self._agents.items() if name not in dormant_names]
+
+        # Set the world inputs once and the agents' stats read them as they tick
+        for stat in world_inputs:
+            agent_input = self._agent_inputs.get(stat.name)
+            if agent_input is not None:
+                agent_input.set_value(stat.value)
+
+        for agent in agents:
             agent.tick()
 
-        for agent in self._agents.values():
+        dead_agents = []
+
+        for agent in agents:
+            is_fired = False
             # See if any of the event stats fired as a result if the tick...
             for event_stat_name in AgentStats.EVENT_STATS:
                 stat = agent._stats.get_stat(event_stat_name)
                 #print(str(stat))
                 if stat is not None and stat.value is True:
-                    EventQueue.add_event(Event(stat.name,
-                                               "Event stat fired: {0}={1}".format(stat.name, stat.value),
-                                               "EVENT"))
+                    self._event_queue.add_event(Event(stat.name,
+                                                      "Event stat fired: {0}={1}".format(stat.name, stat.value),
+                                                      "EVENT", self._tick_count))
+                    is_fired = True
+
+            # Once an agent's death has been announced it can be retired
+            if is_fired is True and self._is_retiring is True and AgentArchive.is_retirable(agent) is True:
+                dead_agents.append(agent)
+
+        if len(dead_agents) > 0:
+            self._retire_agents(dead_agents)
+            agents = [agent for agent in agents if agent.name in self._agents]
 
-        # EventQueue.add_event(Event(World.EVENT_TICK,
+        # See if any of the agents that were ticked can be left out of the tick loop for a while
+        if scheduler is not None:
+            for agent in agents:
+                scheduler.try_dormant(agent, self._tick_count)
+
+        # self._event_queue.add_event(Event(World.EVENT_TICK,
         #                             "World '{0}' ticked to {1}".format(self.name, self._tick_count),
         #                             World.EVENT_TICK))
 
 
+    def tick_population(self, world_inputs : list = None):
+
+        if world_inputs is None:
+            world_inputs = self.get_world_inputs()
+
+        world_input_values = {stat.name: stat.value for stat in world_inputs}
+
+        fired = self._population.tick(world_input_values[Temperature.NAME], world_input_values[HourOfDay.NAME])
+
+        # See if any of the event stats fired for the agents that changed state
+        for index in fired:
+            for event_stat_name in AgentStats.EVENT_STATS:
+                if self._population.get_stat_value(index, event_stat_name) is True:
+                    self._event_queue.add_event(Event(event_stat_name,
+                                                      "Event stat fired: {0}={1}".format(event_stat_name, True),
+                                                      "EVENT", self._tick_count))
+
+        # Once an agent's death has been announced it can be retired
+        if self._is_retiring is True and len(fired) > 0:
+            self._retire_population(self._population.get_dead_indexes(fired))
+
     def update_world_inputs(self, agent : Agent):
 
-        AGENT_STATS = {Temperature.NAME, HourOfDay.NAME}
+        # Push all of the world inputs into the agent as one change
+        agent.update_stats(self.get_world_inputs())
+
+    # Get the world stats that are inputs to every agent
+    def get_world_inputs(self):
 
-        for stat_name in AGENT_STATS:
+        world_inputs = []
+
+        for stat_name in World.AGENT_INPUTS:
             stat = self._stats.get_stat(stat_name)
             if stat is not None:
                 #print(str(stat))
-                agent.update_stat(stat)
+                world_inputs.append(stat)
+
+        return world_inputs
 
 
     def pause(self, is_paused: bool = True):
@@ -209,11 +763,13 @@ class World():
 
     def end(self):
 
+        self.stop_parallel()
+
         self.state = World.STATE_DESTROYED
 
-        EventQueue.add_event(Event(World.STATE_DESTROYED,
-                                   "The world of '{0}' has ended!".format(self.name),
-                                   Event.STATE))
+        self._event_queue.add_event(Event(World.STATE_DESTROYED,
+                                          "The world of '{0}' has ended!".format(self.name),
+                                          Event.STATE, self._tick_count))
 
     def print(self):
 
@@ -224,15 +780,19 @@ class World():
         print(self.time_str)
         self._stats.print()
 
-        if len(self._agents) > 0:
-            for agent in self._agents.values():
+        agents = self.get_agents()
+        if len(agents) > 0:
+            for agent in agents.values():
                 print(str(agent))
 
+        if self._population is not None:
+            self._population.print()
+
     def get_next_event(self):
 
         next_event = None
-        if EventQueue.size() > 0:
-            next_event = EventQueue.pop_event()
+        if self._event_queue.size() > 0:
+            next_event = self._event_queue.pop_event()
 
         return next_event
 
@@ -6,6 +6,8 @@ class CurrentYear(DerivedStat):
 
     DAYS_PER_YEAR = 30
 
+    __slots__ = ()
+
     def __init__(self):
         super(CurrentYear, self).__init__(CurrentYear.NAME, "WORLD")
 
@@ -14,6 +16,10 @@ class CurrentYear(DerivedStat):
     def calculate(self):
         tick_count = self.get_dependency_value(WorldStats.INPUT_TICK_COUNT)
 
+        return CurrentYear.get_year(tick_count)
+
+    @staticmethod
+    def get_year(tick_count: int):
         return (tick_count // (CurrentYear.DAYS_PER_YEAR * DayOfYear.TICKS_PER_DAY)) + 1
 
 
@@ -36,6 +42,8 @@ class CurrentSeason(DerivedStat):
 
     SEASONS_PER_YEAR = 4
 
+    __slots__ = ()
+
     def __init__(self):
         super(CurrentSeason, self).__init__(CurrentSeason.NAME, "WORLD")
 
@@ -43,6 +51,10 @@ class CurrentSeason(DerivedStat):
 
     def calculate(self):
         current_day = self.get_dependency_value(DayOfYear.NAME)
+        return CurrentSeason.get_season(current_day)
+
+    @staticmethod
+    def get_season(current_day: int):
         current_season = int(((current_day-1) * CurrentSeason.SEASONS_PER_YEAR) // CurrentYear.DAYS_PER_YEAR) + 1
         return current_season
 
@@ -52,6 +64,8 @@ class DayOfYear(DerivedStat):
 
     TICKS_PER_DAY = 8
 
+    __slots__ = ()
+
     def __init__(self):
         super(DayOfYear, self).__init__(DayOfYear.NAME, "WORLD")
 
@@ -60,12 +74,18 @@ class DayOfYear(DerivedStat):
     def calculate(self):
         tick_count = self.get_dependency_value(WorldStats.INPUT_TICK_COUNT)
 
+        return DayOfYear.get_day(tick_count)
+
+    @staticmethod
+    def get_day(tick_count: int):
         return ((tick_count) // DayOfYear.TICKS_PER_DAY % CurrentYear.DAYS_PER_YEAR) + 1
 
 
 class HourOfDay(DerivedStat):
     NAME = "Hour of Day"
 
+    __slots__ = ()
+
     def __init__(self):
         super(HourOfDay, self).__init__(HourOfDay.NAME, "WORLD")
 
@@ -74,11 +94,18 @@ class HourOfDay(DerivedStat):
     def calculate(self):
         tick_count = self.get_dependency_value(WorldStats.INPUT_TICK_COUNT)
 
+        return HourOfDay.get_hour(tick_count)
+
+    @staticmethod
+    def get_hour(tick_count: int):
         return (tick_count % DayOfYear.TICKS_PER_DAY) + 1
 
 
 class DayChanged(DerivedStat):
     NAME = "Day Change"
+    IS_STATEFUL = True
+
+    __slots__ = ("_last_day", "_current_day", "_current_tick")
 
     def __init__(self):
         super(DayChanged, self).__init__(DayChanged.NAME, "GAME")
@@ -86,17 +113,28 @@ class DayChanged(DerivedStat):
         self.add_dependency(WorldStats.INPUT_TICK_COUNT)
         self.add_dependency(DayOfYear.NAME)
         self._last_day = -999
+        self._current_day = -999
+        self._current_tick = None
 
+    # The stat gets recalculated when the tick count changes and again when the day changes in whichever order
+    # the listeners get told so the last day only moves on when the tick does and both give the same answer
     def calculate(self):
+        tick_count = self.get_dependency_value(WorldStats.INPUT_TICK_COUNT)
         current_day = self.get_dependency_value(DayOfYear.NAME)
-        is_changed = (current_day != self._last_day)
 
-        self._last_day = current_day
+        if tick_count != self._current_tick:
+            self._current_tick = tick_count
+            self._last_day = self._current_day
+
+        self._current_day = current_day
 
-        return is_changed
+        return current_day != self._last_day
 
 class SeasonChanged(DerivedStat):
     NAME = "Season Change"
+    IS_STATEFUL = True
+
+    __slots__ = ("_last_season", "_current_season", "_current_tick")
 
     def __init__(self):
         super(SeasonChanged, self).__init__(SeasonChanged.NAME, "GAME")
@@ -104,18 +142,27 @@ class SeasonChanged(DerivedStat):
         self.add_dependency(WorldStats.INPUT_TICK_COUNT)
         self.add_dependency(CurrentSeason.NAME)
         self._last_season = 1
+        self._current_season = 1
+        self._current_tick = None
 
     def calculate(self):
+        tick_count = self.get_dependency_value(WorldStats.INPUT_TICK_COUNT)
         current_season = self.get_dependency_value(CurrentSeason.NAME)
-        is_changed = (current_season != self._last_season)
 
-        self._last_season = current_season
+        if tick_count != self._current_tick:
+            self._current_tick = tick_count
+            self._last_season = self._current_season
+
+        self._current_season = current_season
 
-        return is_changed
+        return current_season != self._last_season
 
 
 class YearChanged(DerivedStat):
     NAME = "Year Change"
+    IS_STATEFUL = True
+
+    __slots__ = ("_last_year", "_current_year", "_current_tick")
 
     def __init__(self):
         super(YearChanged, self).__init__(YearChanged.NAME, "GAME")
@@ -123,14 +170,20 @@ class YearChanged(DerivedStat):
         self.add_dependency(WorldStats.INPUT_TICK_COUNT)
         self.add_dependency(CurrentYear.NAME)
         self._last_year = 1
+        self._current_year = 1
+        self._current_tick = None
 
     def calculate(self):
+        tick_count = self.get_dependency_value(WorldStats.INPUT_TICK_COUNT)
         current_year = self.get_dependency_value(CurrentYear.NAME)
-        is_changed = (current_year != self._last_year)
 
-        self._last_year = current_year
+        if tick_count != self._current_tick:
+            self._current_tick = tick_count
+            self._last_year = self._current_year
+
+        self._current_year = current_year
 
-        return is_changed
+        return current_year != self._last_year
 
 
 class Temperature(DerivedStat):
@@ -146,6 +199,8 @@ class Temperature(DerivedStat):
                                   CurrentSeason.SUMMER : 15,
                                   CurrentSeason.WINTER : 20}
 
+    __slots__ = ()
+
     def __init__(self):
         super(Temperature, self).__init__(Temperature.NAME, "WORLD")
 
@@ -157,6 +212,11 @@ class Temperature(DerivedStat):
         season = self.get_dependency_value(CurrentSeason.NAME)
         hour = self.get_dependency_value(HourOfDay.NAME)
 
+        return Temperature.get_temperature(season, hour)
+
+    @staticmethod
+    def get_temperature(season: int, hour: int):
+
         # Get the maximum temperature for the current season
         temperature = Temperature.SEASON_TO_MAX_TEMPERATURE[season]
 
@@ -170,6 +230,98 @@ class Temperature(DerivedStat):
 
         return temperature
 
+class WorldCalendar:
+    '''
+    Lookup tables of the calendar stats and change events for every tick in a year
+    so that the calendar can be worked out for any tick without going through the world stats
+    '''
+
+    # Calendars that have been built keyed by the calendar settings that they were built with
+    _calendars = {}
+
+    def __init__(self):
+
+        self.ticks_per_year = CurrentYear.DAYS_PER_YEAR * DayOfYear.TICKS_PER_DAY
+
+        self._hours = []
+        self._days = []
+        self._seasons = []
+        self._temperatures = []
+
+        # The names of the change events that fire on each tick of the year
+        self._events = []
+
+        # Work out the tables from the second year so that every tick has a tick before it
+        for tick_count in range(self.ticks_per_year, self.ticks_per_year * 2):
+
+            hour = HourOfDay.get_hour(tick_count)
+            day = DayOfYear.get_day(tick_count)
+            season = CurrentSeason.get_season(day)
+
+            self._hours.append(hour)
+            self._days.append(day)
+            self._seasons.append(season)
+            self._temperatures.append(Temperature.get_temperature(season, hour))
+
+            last_day = DayOfYear.get_day(tick_count - 1)
+            is_changed = {DayChanged.NAME: day != last_day,
+                          SeasonChanged.NAME: season != CurrentSeason.get_season(last_day),
+                          YearChanged.NAME: CurrentYear.get_year(tick_count) != CurrentYear.get_year(tick_count - 1)}
+
+            self._events.append(tuple(event_name for event_name in WorldStats.EVENTS if is_changed[event_name]))
+
+        # The ticks in the year that have events
+        self._event_ticks = [tick for tick in range(self.ticks_per_year) if len(self._events[tick]) > 0]
+
+    # Get the calendar for the current calendar settings building it the first time that it is needed
+    @staticmethod
+    def get_calendar():
+
+        settings = (DayOfYear.TICKS_PER_DAY, CurrentYear.DAYS_PER_YEAR, CurrentSeason.SEASONS_PER_YEAR,
+                    tuple(sorted(Temperature.SEASON_TO_MAX_TEMPERATURE.items())),
+                    tuple(sorted(Temperature.SEASON_TO_TEMPERATURE_RANGE.items())))
+
+        calendar = WorldCalendar._calendars.get(settings)
+
+        if calendar is None:
+            calendar = WorldCalendar()
+            WorldCalendar._calendars[settings] = calendar
+
+        return calendar
+
+    # Get the value of each calendar stat on the specified tick keyed by stat name
+    def get_time(self, tick_count: int):
+
+        tick = tick_count % self.ticks_per_year
+
+        return {HourOfDay.NAME: self._hours[tick],
+                DayOfYear.NAME: self._days[tick],
+                CurrentSeason.NAME: self._seasons[tick],
+                CurrentYear.NAME: CurrentYear.get_year(tick_count),
+                Temperature.NAME: self._temperatures[tick]}
+
+    # Get the names of the change events that fire on the specified tick
+    def get_events(self, tick_count: int):
+
+        if tick_count <= 0:
+            return ()
+
+        return self._events[tick_count % self.ticks_per_year]
+
+    # Get the (tick count, event name) of every change event that fires after the start tick up to the end tick
+    def get_events_between(self, start_tick: int, end_tick: int):
+
+        year_start = max(start_tick + 1, 1) // self.ticks_per_year * self.ticks_per_year
+
+        while year_start <= end_tick:
+            for tick in self._event_ticks:
+                tick_count = year_start + tick
+                if start_tick < tick_count <= end_tick and tick_count > 0:
+                    for event_name in self._events[tick]:
+                        yield tick_count, event_name
+            year_start += self.ticks_per_year
+
+
 class WorldStats(StatEngine):
     # World level inputs
     INPUT_TICK_COUNT = "Tick Count"
@@ -180,20 +332,30 @@ class WorldStats(StatEngine):
     # Event stats - order determines which gets fired first
     EVENTS = (DayChanged.NAME, SeasonChanged.NAME, YearChanged.NAME)
 
-    def __init__(self, name: str):
-        super(WorldStats, self).__init__(name)
+    def __init__(self, name: str, propagation_mode: str = StatEngine.PROPAGATE_IMMEDIATE):
+        super(WorldStats, self).__init__(name, propagation_mode)
 
     def initialise(self):
         # Add the core input stats
-        for core_stat_name in WorldStats.INPUTS:
-            self.add_stat(CoreStat(core_stat_name, "INPUTS", 0))
+        self.add_stats([CoreStat(core_stat_name, "INPUTS", 0) for core_stat_name in WorldStats.INPUTS])
 
         # Add derived game stats
-        self.add_stat(DayOfYear())
-        self.add_stat(HourOfDay())
-        self.add_stat(CurrentYear())
-        self.add_stat(CurrentSeason())
-        self.add_stat(DayChanged())
-        self.add_stat(SeasonChanged())
-        self.add_stat(YearChanged())
-        self.add_stat(Temperature())
+        self.add_stats([DayOfYear(),
+                        HourOfDay(),
+                        CurrentYear(),
+                        CurrentSeason(),
+                        DayChanged(),
+                        SeasonChanged(),
+                        YearChanged(),
+                        Temperature()])
+
+    # Jump the world stats straight to the specified tick count
+    # The tick before is done first so that the change event stats are left as they would be after a normal tick
+    def fast_forward(self, tick_count: int):
+
+        if tick_count > 0:
+            self.update_stat(WorldStats.INPUT_TICK_COUNT, tick_count - 1)
+            self.flush()
+
+        self.update_stat(WorldStats.INPUT_TICK_COUNT, tick_count)
+        self.flush()
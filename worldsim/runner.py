@@ -0,0 +1,241 @@
+'''
+    Headless runner that builds a world from a config file and runs it for a number of ticks as fast as possible:
+    - RunConfig - the settings for a run loaded from a JSON config file
+    - Runner - builds the world, ticks it, streams the events to a file and times each phase of a tick
+
+    The config file is JSON with any of these keys e.g.
+    {
+        "name": "Production",
+        "seed": 42,
+        "ticks": 10000,
+        "agents": {"Human": 1000, "Cow": 200},
+        "map_width": 50,
+        "map_height": 50,
+        "propagation_mode": "batch",
+        "columnar": false,
+        "processes": null,
+        "retire_dead": true
+    }
+
+    python -m worldsim.runner --config production.json --events events.log --profile
+'''
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import time
+
+import worldsim.model as model
+from worldsim.model.StatEngine import StatEngine
+
+
+class RunConfig:
+
+    DEFAULT_NAME = "Headless"
+    DEFAULT_SEED = 1
+    DEFAULT_TICKS = 1000
+
+    def __init__(self, name: str = DEFAULT_NAME,
+                 seed: int = DEFAULT_SEED,
+                 ticks: int = DEFAULT_TICKS,
+                 agents: dict = None,
+                 map_width: int = model.World.MAP_WIDTH,
+                 map_height: int = model.World.MAP_HEIGHT,
+                 propagation_mode: str = StatEngine.PROPAGATE_IMMEDIATE,
+                 columnar: bool = False,
+                 processes: int = None,
+                 retire_dead: bool = False):
+
+        if propagation_mode not in StatEngine.PROPAGATION_MODES:
+            raise Exception("{0} is not a valid propagation mode.".format(propagation_mode))
+
+        self.name = name
+        self.seed = seed
+        self.ticks = ticks
+
+        # How many agents of each type to load keyed by agent type or None for a few of every type
+        self.agents = agents
+        self.map_width = map_width
+        self.map_height = map_height
+        self.propagation_mode = propagation_mode
+        self.columnar = columnar
+
+        # How many worker processes to tick the agents in or None to tick them in this process
+        self.processes = processes
+
+        # Move agents out of the world into the archive once they have died
+        self.retire_dead = retire_dead
+
+    # Load a config from a JSON file
+    @staticmethod
+    def load(filename: str):
+
+        with open(filename, "r") as config_file:
+            settings = json.load(config_file)
+
+        try:
+            config = RunConfig(**settings)
+        except TypeError as err:
+            raise Exception("Config file {0} is not valid ({1}).".format(filename, err))
+
+        logging.info("%s.load(): Loaded config %s from %s", __class__, config.name, filename)
+
+        return config
+
+
+class Runner:
+
+    # The phases of a run that get timed on top of the phases of each world tick
+    PHASE_SETUP = "Setup"
+    PHASE_EVENT_OUTPUT = "Event Output"
+
+    def __init__(self, config: RunConfig, events_file=None, profile: bool = False):
+        self.config = config
+
+        # Where to write the events out to or None if they are just thrown away
+        self.events_file = events_file
+        self.profile = profile
+
+        self.world = None
+        self.event_count = 0
+
+        # How many of each type of event there have been keyed by event name
+        self.event_counts = {}
+        self.elapsed = None
+        self.phase_times = {}
+
+    # Build the world from the config
+    def setup(self):
+
+        start_time = time.perf_counter()
+
+        self.world = model.World(self.config.name, self.config.propagation_mode, self.config.columnar)
+
+        # The map prints a summary of itself when it gets created which we don't want in the output
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.world.initialise(self.config.name, self.config.agents, self.config.map_width, self.config.map_height,
+                                  self.config.seed)
+
+        if self.config.processes is not None:
+            self.world.start_parallel(self.config.processes)
+
+        self.world.retirement_enabled = self.config.retire_dead
+        self.world.timing_enabled = True
+        self.world.profiling_enabled = self.profile
+        self.world.run()
+
+        self.phase_times[Runner.PHASE_SETUP] = time.perf_counter() - start_time
+
+        logging.info("%s.setup(): Created world %s with %i agents in %.3fs", __class__,
+                     self.config.name, len(self.world.get_agent_names()), self.phase_times[Runner.PHASE_SETUP])
+
+    # Write out any events that are waiting in the queue
+    def write_events(self):
+
+        while True:
+            event = self.world.get_next_event()
+            if event is None:
+                break
+            self.event_count += 1
+            self.event_counts[event.name] = self.event_counts.get(event.name, 0) + 1
+            if self.events_file is not None:
+                self.events_file.write("{0}\t{1}\n".format(self.world._tick_count, str(event)))
+
+    # Tick the world for the number of ticks in the config
+    def run(self):
+
+        if self.world is None:
+            self.setup()
+
+        # Write out the events from setting up the world before we start ticking
+        self.write_events()
+
+        event_output_time = 0.0
+
+        start_time = time.perf_counter()
+
+        for i in range(self.config.ticks):
+            self.world.tick()
+
+            event_start = time.perf_counter()
+            self.write_events()
+            event_output_time += time.perf_counter() - event_start
+
+        self.elapsed = time.perf_counter() - start_time
+
+        self.phase_times.update(self.world.get_phase_times())
+        self.phase_times[Runner.PHASE_EVENT_OUTPUT] = event_output_time
+
+        self.world.end()
+        self.write_events()
+
+    @property
+    def ticks_per_second(self):
+        return self.config.ticks / self.elapsed if self.elapsed else None
+
+    # Print out how fast the run went and where the time went
+    def print(self):
+
+        output_width = 70
+
+        agent_count = len(self.world.get_agent_names())
+        ticks_per_second = self.ticks_per_second
+
+        print((" Run of " + self.config.name + " ").center(output_width, "-"))
+        print("{0:<30}{1:>16}".format("Agents", agent_count))
+        if self.config.retire_dead is True:
+            print("{0:<30}{1:>16}".format("Retired agents", self.world.archive.size))
+        print("{0:<30}{1:>16}".format("Ticks", self.config.ticks))
+        print("{0:<30}{1:>16}".format("Events", self.event_count))
+        print("{0:<30}{1:>16.3f}".format("Elapsed s", self.elapsed))
+        if ticks_per_second is not None:
+            print("{0:<30}{1:>16.1f}".format("Ticks/s", ticks_per_second))
+            print("{0:<30}{1:>16.1f}".format("Agent ticks/s", ticks_per_second * agent_count))
+
+        print(" Phase timings ".center(output_width, "-"))
+        print("{0:<30}{1:>12}{2:>14}{3:>10}".format("Phase", "Total s", "ms/tick", "% run"))
+        ticks = max(self.config.ticks, 1)
+        for phase, phase_time in self.phase_times.items():
+            # Setup happens once so it isn't part of the time per tick
+            if phase == Runner.PHASE_SETUP:
+                print("{0:<30}{1:>12.3f}".format(phase, phase_time))
+            else:
+                print("{0:<30}{1:>12.3f}{2:>14.3f}{3:>10.1f}".format(phase, phase_time, phase_time * 1000 / ticks,
+                                                                    phase_time * 100 / self.elapsed))
+
+        if self.profile is True:
+            self.world.get_world_profile().print()
+            self.world.get_agent_profile().print()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Run a World Sim world without the interactive interface.")
+    parser.add_argument("--config", help="JSON file with the settings for the run")
+    parser.add_argument("--ticks", type=int, help="number of ticks to run for (overrides the config)")
+    parser.add_argument("--seed", type=int, help="random seed (overrides the config)")
+    parser.add_argument("--events", help="file to stream the events to (default is to throw them away)")
+    parser.add_argument("--profile", action="store_true", help="profile the world and agent stats")
+    args = parser.parse_args()
+
+    # Stats warn about missing dependencies while agents are being built so only show errors
+    logging.basicConfig(level=logging.ERROR)
+
+    config = RunConfig.load(args.config) if args.config is not None else RunConfig()
+    if args.ticks is not None:
+        config.ticks = args.ticks
+    if args.seed is not None:
+        config.seed = args.seed
+
+    with open(args.events, "w") if args.events is not None else contextlib.nullcontext() as events_file:
+        runner = Runner(config, events_file, args.profile)
+        runner.setup()
+        runner.run()
+
+    runner.print()
+
+
+if __name__ == "__main__":
+    main()
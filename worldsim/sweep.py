@@ -0,0 +1,274 @@
+'''
+    Runs lots of independent worlds with different seeds, agent mixes and constants and collects a table of
+    summary metrics for them:
+    - SweepConfig - the settings that every run shares and the lists of settings to sweep over
+    - SweepRunner - runs every combination of settings in a pool of worker processes and collects the results
+
+    The sweep file is JSON with any of these keys and every combination of seed, agent mix and constants is a run e.g.
+    {
+        "name": "Cold snap",
+        "base": {"ticks": 5000, "propagation_mode": "batch", "retire_dead": true},
+        "seeds": [1, 2, 3],
+        "agents": [{"Human": 100}, {"Human": 50, "Cow": 50}],
+        "constants": [{}, {"Temperature.TEMP_DELTA_RATE": 0.3, "NextState.SLEEP_THRESHOLD": 70},
+                      {"DayOfYear.TICKS_PER_DAY": 24}]
+    }
+
+    The base settings are the same as the headless runner's config file.  The constants are changed for each run
+    with ConstantOverrides and every run gets a new worker process so that they never leak from one run into another.
+    The constants are shared by everything in a process so a sweep that overrides any can't be run with one process.
+
+    python -m worldsim.sweep --config sweep.json --processes 4 --output results.csv
+'''
+
+import argparse
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import time
+
+from worldsim.model.agent_stats import AgentStats, ChangeState, NextState
+from worldsim.model.constants import ConstantOverrides
+from worldsim.runner import RunConfig, Runner
+
+
+class SweepConfig:
+
+    DEFAULT_NAME = "Sweep"
+
+    def __init__(self, name: str = DEFAULT_NAME,
+                 base: dict = None,
+                 seeds: list = None,
+                 agents: list = None,
+                 constants: list = None):
+
+        self.name = name
+
+        # The run config settings that every run shares
+        self.base = base if base is not None else {}
+
+        try:
+            base_config = RunConfig(**self.base)
+        except TypeError as err:
+            raise Exception("Sweep {0} base settings are not valid ({1}).".format(name, err))
+
+        # The worker processes of a sweep can't start worker processes of their own
+        if base_config.processes is not None:
+            raise Exception("Runs in sweep {0} can't tick their agents in parallel.".format(name))
+
+        # The values to sweep over - anything not swept over comes from the base settings
+        self.seeds = seeds if seeds is not None else [base_config.seed]
+        self.agents = agents if agents is not None else [base_config.agents]
+        self.constants = constants if constants is not None else [{}]
+
+        # Check the names of the constants now rather than part way through the sweep
+        for overrides in self.constants:
+            for constant_name in overrides.keys():
+                ConstantOverrides.get_constant(constant_name)
+
+    # Do any of the runs change the constants?
+    @property
+    def has_overrides(self):
+        return any(len(overrides) > 0 for overrides in self.constants)
+
+    # Load a sweep from a JSON file
+    @staticmethod
+    def load(filename: str):
+
+        with open(filename, "r") as sweep_file:
+            settings = json.load(sweep_file)
+
+        try:
+            config = SweepConfig(**settings)
+        except TypeError as err:
+            raise Exception("Sweep file {0} is not valid ({1}).".format(filename, err))
+
+        logging.info("%s.load(): Loaded sweep %s from %s", __class__, config.name, filename)
+
+        return config
+
+    # Get every run in the sweep as (run number, run config settings, constant overrides)
+    def get_runs(self):
+
+        runs = []
+
+        for run_number, (overrides, agents, seed) in enumerate(itertools.product(self.constants,
+                                                                                 self.agents,
+                                                                                 self.seeds)):
+            settings = dict(self.base)
+            settings["name"] = "{0} {1}".format(self.name, run_number)
+            settings["seed"] = seed
+            settings["agents"] = agents
+            runs.append((run_number, settings, overrides))
+
+        return runs
+
+
+# Do one run of a sweep with its constants overridden and get its summary metrics
+# This is defined at the top level of the module so that it can be sent to the worker processes
+def run_sweep_run(run: tuple):
+
+    run_number, settings, overrides = run
+
+    with ConstantOverrides(overrides):
+
+        config = RunConfig(**settings)
+
+        runner = Runner(config)
+        runner.setup()
+        runner.run()
+
+        state_counts = SweepRunner.get_state_counts(runner.world)
+
+    return {SweepRunner.COLUMN_RUN: run_number,
+            SweepRunner.COLUMN_SEED: config.seed,
+            SweepRunner.COLUMN_AGENTS: " ".join("{0}:{1}".format(type, count)
+                                                for type, count in (config.agents or {}).items()),
+            SweepRunner.COLUMN_CONSTANTS: " ".join("{0}={1}".format(name, value)
+                                                   for name, value in overrides.items()),
+            SweepRunner.COLUMN_TICKS: config.ticks,
+            SweepRunner.COLUMN_ELAPSED: runner.elapsed,
+            SweepRunner.COLUMN_TICKS_PER_SECOND: runner.ticks_per_second,
+            SweepRunner.COLUMN_EVENTS: runner.event_count,
+            SweepRunner.COLUMN_STATE_CHANGES: runner.event_counts.get(ChangeState.NAME, 0),
+            SweepRunner.COLUMN_AWAKE: state_counts[AgentStats.STATE_AWAKE],
+            SweepRunner.COLUMN_ASLEEP: state_counts[AgentStats.STATE_ASLEEP],
+            SweepRunner.COLUMN_DEAD: state_counts[AgentStats.STATE_DEAD]}
+
+
+class SweepRunner:
+
+    # The columns of the results table
+    COLUMN_RUN = "Run"
+    COLUMN_SEED = "Seed"
+    COLUMN_AGENTS = "Agents"
+    COLUMN_CONSTANTS = "Constants"
+    COLUMN_TICKS = "Ticks"
+    COLUMN_ELAPSED = "Elapsed s"
+    COLUMN_TICKS_PER_SECOND = "Ticks/s"
+    COLUMN_EVENTS = "Events"
+    COLUMN_STATE_CHANGES = "State changes"
+    COLUMN_AWAKE = "Awake"
+    COLUMN_ASLEEP = "Asleep"
+    COLUMN_DEAD = "Dead"
+
+    COLUMNS = (COLUMN_RUN, COLUMN_SEED, COLUMN_AGENTS, COLUMN_CONSTANTS, COLUMN_TICKS, COLUMN_ELAPSED,
+               COLUMN_TICKS_PER_SECOND, COLUMN_EVENTS, COLUMN_STATE_CHANGES, COLUMN_AWAKE, COLUMN_ASLEEP, COLUMN_DEAD)
+
+    def __init__(self, config: SweepConfig, processes: int = None):
+        self.config = config
+
+        # How many runs to do at the same time or None for one per CPU
+        # With one process the runs are done in this process rather than in worker processes
+        self.processes = processes
+
+        self.results = []
+        self.elapsed = None
+
+    # Count how many agents are in each state at the end of a run including the agents that have been retired
+    @staticmethod
+    def get_state_counts(world):
+
+        state_counts = {state: 0 for state in AgentStats.STATE_TO_STATE_NAME.keys()}
+
+        for values in world.get_agent_summaries([NextState.NAME]).values():
+            state = values[NextState.NAME]
+            if state in state_counts:
+                state_counts[state] += 1
+
+        population = world._population
+        if population is not None:
+            states = population.get_column(NextState.NAME)
+            for state in state_counts.keys():
+                state_counts[state] += int((states == state).sum())
+
+        state_counts[AgentStats.STATE_DEAD] += world.archive.size
+
+        return state_counts
+
+    # Do every run in the sweep and collect the results in run order
+    def run(self):
+
+        # Overridden constants would apply to everything in this process and not just to the runs
+        if self.processes == 1 and self.config.has_overrides is True:
+            raise Exception("Sweep {0} overrides constants so its runs can't be done in this process.".format(
+                self.config.name))
+
+        runs = self.config.get_runs()
+
+        logging.info("%s.run(): Starting %i runs of sweep %s", __class__, len(runs), self.config.name)
+
+        start_time = time.perf_counter()
+
+        if self.processes == 1:
+            results = [run_sweep_run(run) for run in runs]
+        else:
+            # Each run gets a new worker process so that nothing that a run changes can leak into the next run
+            with multiprocessing.Pool(self.processes, maxtasksperchild=1) as pool:
+                results = []
+                for result in pool.imap_unordered(run_sweep_run, runs):
+                    results.append(result)
+                    logging.info("%s.run(): Finished run %i of %i", __class__, len(results), len(runs))
+
+        self.results = sorted(results, key=lambda result: result[SweepRunner.COLUMN_RUN])
+        self.elapsed = time.perf_counter() - start_time
+
+    # Write the results out to a CSV file
+    def write_csv(self, filename: str):
+
+        with open(filename, "w", newline="") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=SweepRunner.COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.results)
+
+    # Print out the results as a table
+    def print(self):
+
+        def to_text(value):
+            if isinstance(value, float):
+                return "{0:.3f}".format(value)
+            return str(value)
+
+        rows = [[to_text(result[column]) for column in SweepRunner.COLUMNS] for result in self.results]
+        widths = [max([len(column)] + [len(row[i]) for row in rows]) for i, column in enumerate(SweepRunner.COLUMNS)]
+
+        output_width = max(70, sum(widths) + 2 * (len(widths) - 1))
+
+        print((" Sweep " + self.config.name + " ").center(output_width, "-"))
+        print("  ".join(column.ljust(width) for column, width in zip(SweepRunner.COLUMNS, widths)))
+        for row in rows:
+            print("  ".join(text.ljust(width) for text, width in zip(row, widths)))
+        if self.elapsed is not None:
+            print("{0} runs in {1:.3f}s".format(len(self.results), self.elapsed))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Run a sweep of World Sim worlds in parallel.")
+    parser.add_argument("--config", help="JSON file with the settings for the sweep")
+    parser.add_argument("--processes", type=int, help="number of runs to do at the same time (default is one per CPU) "
+                                                      "- 1 does the runs in this process and can't override constants")
+    parser.add_argument("--ticks", type=int, help="number of ticks for every run (overrides the config)")
+    parser.add_argument("--output", help="CSV file to write the results to")
+    args = parser.parse_args()
+
+    # Stats warn about missing dependencies while agents are being built so only show errors
+    logging.basicConfig(level=logging.ERROR)
+
+    config = SweepConfig.load(args.config) if args.config is not None else SweepConfig()
+    if args.ticks is not None:
+        config.base["ticks"] = args.ticks
+
+    runner = SweepRunner(config, args.processes)
+    runner.run()
+
+    if args.output is not None:
+        runner.write_csv(args.output)
+
+    runner.print()
+
+
+if __name__ == "__main__":
+    main()